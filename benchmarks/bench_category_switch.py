@@ -0,0 +1,67 @@
+"""Switch menu categories N times and report time plus Tcl object counts.
+
+Needs a display (or Xvfb). Usage:
+    python benchmarks/bench_category_switch.py -n 2000
+
+The app runs against a throwaway order store and cart journal, and its background
+services (DB health monitor, sync, live events, menu and stock watchers) are never
+started, so the numbers only cover the Tk work and nothing touches the real till data.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def load_app_module():
+    spec = importlib.util.spec_from_file_location("cafe_aura_app", os.path.join(ROOT, "cafe-Aura.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+def tcl_counts(app):
+    return {
+        "widgets": count_widgets(app),
+        "tcl_vars": len(app.tk.splitlist(app.tk.call("info", "globals"))),
+        "tcl_commands": len(app.tk.splitlist(app.tk.call("info", "commands"))),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=1000, help="number of category switches")
+    args = parser.parse_args()
+
+    module = load_app_module()
+    with tempfile.TemporaryDirectory() as tmp:
+        module.LOCAL_DB_PATH = os.path.join(tmp, "bench.db")
+        journal_class = module.CartJournal
+        module.CartJournal = lambda: journal_class(os.path.join(tmp, "bench.journal"))
+        module.CafeAuraApp._start_background = lambda self: None
+        app = module.CafeAuraApp()
+        app.withdraw()
+        categories = app.catalog.categories()
+        app.update()
+        before = tcl_counts(app)
+
+        start = time.perf_counter()
+        for i in range(args.n):
+            app.show_items(categories[i % len(categories)])
+            app.update_idletasks()
+        elapsed = time.perf_counter() - start
+
+        after = tcl_counts(app)
+        app._on_close()
+
+    print(f"{args.n} switches in {elapsed:.3f}s ({elapsed / args.n * 1000:.3f} ms/switch)")
+    for key in before:
+        print(f"{key:13} before={before[key]:6} after={after[key]:6} delta={after[key] - before[key]:+}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Headless benchmark / load test of the order pipeline against synthetic order histories.
+
+Fills a throwaway database with N synthetic orders (random carts from MENU, spread
+over --days) and measures checkout latency/throughput (local store, then the Mongo
+sync), history page loads, searches, order lookups and report generation. It grows
+the same history through each size in --sizes, so one run covers 10k..1M orders.
+
+Runs against a local mongod (pymongo) or in memory with mongomock. Results go to a
+JSON file; pass an earlier one as --compare to flag regressions between versions.
+
+    python benchmarks/bench_orders.py --backend mongod --sizes 10k,100k,1m --out bench.json
+    python benchmarks/bench_orders.py --backend mongomock --sizes 10k --compare bench.json
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cafe_aura import db
+from cafe_aura.analytics import fetch_daily_report, rebuild_rollups, update_rollups
+from cafe_aura.catalog import Catalog
+from cafe_aura.config import MENU, SYNC_BATCH_SIZE
+from cafe_aura.core import Cart, Order
+from cafe_aura.ids import encode_id
+from cafe_aura.metrics import Histogram
+from cafe_aura.pricing import TaxPolicy
+from cafe_aura.service import OrderService
+from cafe_aura.store import LocalOrderStore
+
+SCHEMA = 1
+BENCH_DB = "cafe_aura_bench"
+INSERT_BATCH = 5000
+FIRST_NAMES = ["Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Neha", "Priya", "Rahul",
+               "Riya", "Rohan", "Saanvi", "Sahil", "Sneha", "Tanvi", "Vihaan", "Vikram", "Yash", "Zoya"]
+LAST_NAMES = ["Agarwal", "Bose", "Chopra", "Das", "Gupta", "Iyer", "Jain", "Kapoor", "Khan", "Mehta",
+              "Nair", "Patel", "Rao", "Reddy", "Shah", "Sharma", "Singh", "Verma"]
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+def connect(backend, uri):
+    """Point the db module at an empty benchmark database; returns a description of the backend."""
+    db.load_pymongo()  # UpdateOne for the sync path
+    if backend == "mongomock":
+        import mongomock
+        client, name = mongomock.MongoClient(), f"mongomock {mongomock.__version__}"
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+        name = f"mongod {client.server_info()['version']}"
+    client.drop_database(BENCH_DB)
+    database = client[BENCH_DB]
+    db.mongo_client = client
+    db.mongo_collection = database[db.COLLECTION_NAME]
+    db.mongo_rollups = database[db.ROLLUP_COLLECTION_NAME]
+    db.mongo_archive = database[db.ARCHIVE_COLLECTION_NAME]
+    db.mongo_connected = True
+    db.ensure_indexes(db.mongo_collection)
+    db.ensure_archive_indexes(db.mongo_archive)
+    db.mongo_rollups.create_index("start", name="start")
+    return name
+
+class OrderGenerator:
+    """Deterministic stream of order docs; every prefix is a uniform sample of the date range,
+    so growing the history from 10k to 1M keeps the same shape at each size."""
+
+    def __init__(self, seed, end, days):
+        self.rng = random.Random(seed)
+        self.tax = TaxPolicy()
+        self.catalog = Catalog.from_menu(MENU)
+        self.table = self.tax.table(self.catalog)
+        self.items = list(self.catalog.by_id.values())
+        self.end = end
+        self.span_ms = days * 86400 * 1000
+        self.customers = [(f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                           f"{self.rng.choice('6789')}{self.rng.randrange(10 ** 9):09d}") for _ in range(5000)]
+        self.seq = 0
+
+    def order(self):
+        rng = self.rng
+        millis = int(self.end.timestamp() * 1000) - rng.randrange(self.span_ms)
+        cart = Cart(self.tax, self.table)
+        for item in rng.sample(self.items, rng.randint(1, 5)):
+            cart.add(item, rng.choice((1, 1, 1, 2, 3)))
+        name, phone = rng.choice(self.customers) if rng.random() < 0.8 else ("Guest", "-")
+        self.seq = (self.seq + 1) % 65536
+        order_id = encode_id(millis, rng.randrange(1, 9), self.seq)
+        when = dt.datetime.fromtimestamp(millis / 1000)
+        return Order(order_id, when, name, phone, [dict(i) for i in cart], cart.bill()).to_doc()
+
+def grow(generator, count, sample_ids):
+    """Insert ``count`` more orders (and their rollups); keeps a sample of IDs for lookups."""
+    while count > 0:
+        batch = [generator.order() for _ in range(min(INSERT_BATCH, count))]
+        db.mongo_collection.insert_many(batch, ordered=False)
+        update_rollups(batch)
+        sample_ids.extend(doc["order_id"] for doc in batch[:20])
+        count -= len(batch)
+
+def measure(results, name, func, repeat):
+    hist = Histogram()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        hist.observe((time.perf_counter() - start) * 1000)
+        if not db.mongo_connected:
+            raise RuntimeError(f"{name} failed: {db.mongo_stats['last_error']}")
+    results[name] = hist.summary()
+
+def bench_reads(results, generator, sample_ids, args):
+    rng = random.Random(args.seed + 1)
+    repeat = args.repeat
+    measure(results, "history.first_page", lambda: db.fetch_orders_page(), repeat)
+
+    def page_through():
+        after = None
+        for _ in range(args.pages):
+            docs, after = db.fetch_orders_page(after)
+            if after is None:
+                break
+    measure(results, f"history.{args.pages}_pages", page_through, max(1, repeat // 4))
+
+    def customer():
+        return rng.choice(generator.customers)
+
+    def week():
+        day = (generator.end - dt.timedelta(days=rng.randrange(args.days))).date()
+        return db.build_order_query(date_from=day, date_to=day + dt.timedelta(days=6))
+    searches = {
+        "search.name_prefix": lambda: db.build_order_query(name=customer()[0][:3]),
+        "search.phone_prefix": lambda: db.build_order_query(phone=customer()[1][:5]),
+        "search.date_week": week,
+        "search.min_total": lambda: db.build_order_query(min_total=rng.randrange(500, 3000)),
+    }
+    for name, make_query in searches.items():
+        measure(results, name, lambda: db.fetch_orders_page(query=make_query()), repeat)
+    measure(results, "order.lookup", lambda: db.fetch_order_from_mongo(rng.choice(sample_ids)), repeat)
+
+    def random_day():
+        return (generator.end - dt.timedelta(days=rng.randrange(args.days))).date()
+    measure(results, "report.daily", lambda: fetch_daily_report(random_day()), repeat)
+    try:
+        measure(results, "report.rebuild_day", lambda: rebuild_rollups(*[random_day()] * 2), max(1, repeat // 4))
+    except Exception as e:  # mongomock lacks some aggregation operators
+        results["report.rebuild_day"] = {"error": str(e)}
+        db.mongo_connected = True
+
+def bench_checkout(results, generator, args):
+    """``--tills`` threads check out carts concurrently through OrderService, then the
+    sync path (upsert + rollups) pushes them to the database as OrderSync would."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalOrderStore(os.path.join(tmp, "bench.db"))
+        service = OrderService(store, tax=generator.tax, catalog=generator.catalog)
+        hist = Histogram()
+        per_till = max(1, args.checkouts // args.tills)
+
+        def till(seed):
+            rng = random.Random(seed)
+            for _ in range(per_till):
+                order_id = service.create_cart()
+                for item in rng.sample(generator.items, rng.randint(1, 5)):
+                    service.add_item(order_id, item["id"], rng.randint(1, 3))
+                start = time.perf_counter()
+                service.checkout(order_id, "Bench", "9000000000")
+                hist.observe((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=till, args=(args.seed + n,)) for n in range(args.tills)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        results["checkout.place_order"] = {**hist.summary(), "per_min": hist.count / elapsed * 60}
+
+        hist = Histogram()
+        start = time.perf_counter()
+        while True:
+            batch = store.unsynced(SYNC_BATCH_SIZE)
+            if not batch:
+                break
+            t0 = time.perf_counter()
+            inserted = db.upsert_orders_to_mongo(batch)
+            if inserted is None:
+                raise RuntimeError(f"sync failed: {db.mongo_stats['last_error']}")
+            update_rollups(inserted)
+            store.mark_synced([doc["order_id"] for doc in batch])
+            hist.observe((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - start
+        results["sync.batch"] = {**hist.summary(), "per_min": per_till * args.tills / elapsed * 60}
+        store.close()
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, threshold):
+    """Print p50/p95 against a baseline report; returns the number of regressions."""
+    old_runs = {run["orders"]: run["metrics"] for run in baseline["runs"]}
+    regressions = 0
+    print(f"\n{'orders':>8}  {'metric':<22}{'p50 old':>10}{'p50 new':>10}{'p95 old':>10}{'p95 new':>10}")
+    for run in report["runs"]:
+        for name, new in run["metrics"].items():
+            old = old_runs.get(run["orders"], {}).get(name)
+            if not old or "p95_ms" not in old or "p95_ms" not in new:
+                continue
+            flag = ""
+            if new["p95_ms"] > old["p95_ms"] * (1 + threshold):
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{run['orders']:>8}  {name:<22}{old['p50_ms']:>10.2f}{new['p50_ms']:>10.2f}"
+                  f"{old['p95_ms']:>10.2f}{new['p95_ms']:>10.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help=f"mongod to use (database {BENCH_DB} is dropped)")
+    parser.add_argument("--sizes", default="10k,100k", help="history sizes to measure, e.g. 10k,100k,1m")
+    parser.add_argument("--days", type=int, default=365, help="days of history the orders are spread over")
+    parser.add_argument("--end", type=dt.date.fromisoformat, default=dt.date(2025, 8, 31), help="last day of history")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=50, help="samples per read metric")
+    parser.add_argument("--pages", type=int, default=10, help="history pages walked by the deep-paging metric")
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--tills", type=int, default=4, help="concurrent checkout threads")
+    parser.add_argument("--label", default=None, help="free-form label stored in the results")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    sizes = sorted(parse_size(s) for s in args.sizes.split(","))
+    backend = connect(args.backend, args.uri)
+    end = dt.datetime.combine(args.end, dt.time.max)
+    generator = OrderGenerator(args.seed, end, args.days)
+    report = {
+        "schema": SCHEMA, "label": args.label, "version": git_version(), "backend": backend,
+        "python": platform.python_version(), "platform": platform.platform(),
+        "started": dt.datetime.now().isoformat(timespec="seconds"),
+        "params": {k: (str(v) if isinstance(v, dt.date) else v)
+                   for k, v in vars(args).items() if k not in ("out", "compare", "label", "uri")},
+        "runs": [],
+    }
+    sample_ids, stored = [], 0
+    try:
+        for size in sizes:
+            start = time.perf_counter()
+            grow(generator, size - stored, sample_ids)
+            generate_s = time.perf_counter() - start
+            stored = size
+            metrics = {}
+            bench_reads(metrics, generator, sample_ids, args)
+            bench_checkout(metrics, generator, args)
+            stored += args.checkouts // args.tills * args.tills
+            report["runs"].append({"orders": size, "generate_s": round(generate_s, 3), "metrics": metrics})
+            print(f"{size} orders (generated in {generate_s:.1f}s)")
+            for name, m in metrics.items():
+                if "error" in m:
+                    print(f"  {name:<22} skipped: {m['error']}")
+                else:
+                    rate = f"  {m['per_min']:,.0f}/min" if "per_min" in m else ""
+                    print(f"  {name:<22} p50 {m['p50_ms']:8.2f} ms  p95 {m['p95_ms']:8.2f} ms  p99 {m['p99_ms']:8.2f} ms{rate}")
+    finally:
+        db.mongo_client.drop_database(BENCH_DB)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
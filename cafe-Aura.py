@@ -1,154 +1,102 @@
+import time
+_STARTED = time.perf_counter()  # for --startup-timing; everything below counts as "imports"
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import datetime as dt
-import uuid
-import os
-
-# Try to import pymongo; handle gracefully if not installed
-try:
-    from pymongo import MongoClient
-    PYMONGO_AVAILABLE = True
-except Exception:
-    PYMONGO_AVAILABLE = False
-
-# ---------------------------- CONFIG ---------------------------- #
-TAX_SGST = 0.09  # 9%
-TAX_CGST = 0.09  # 9%
-CURRENCY = "₹"
-RESTAURANT_NAME = "Café Aura"
-
-# Replace with your MongoDB URI if using Atlas or remote DB
-MONGO_URI = "mongodb://localhost:27017"
-DB_NAME = "cafe_aura"
-COLLECTION_NAME = "orders"
-
-# Extended Menu
-MENU = {
-    "Pizza": [
-        ("Volcano Pizza", 200),
-        ("Corn Pizza", 150),
-        ("Onion Pizza", 180),
-        ("Cheese Pizza", 250),
-        ("Veg Pizza", 120),
-    ],
-    "Maggie": [
-        ("Masala Maggie", 50),
-        ("Cheese Maggie", 70),
-        ("Veg Maggie", 60),
-        ("Special Maggie", 80),
-        ("Spicy Maggie", 90),
-    ],
-    "Burger": [
-        ("Veg Burger", 99),
-        ("Cheese Burger", 220),
-        ("Chicken Burger", 250),
-        ("Spicy Burger", 180),
-        ("Double Cheese Burger", 300),
-    ],
-    "Sandwich": [
-        ("Veg Sandwich", 120),
-        ("Cheese Sandwich", 199),
-        ("Grilled Sandwich", 150),
-        ("Club Sandwich", 180),
-        ("Special Sandwich", 250),
-    ],
-    "Drinks": [
-        ("Cold Coffee", 120),
-        ("Masala Chaas", 60),
-        ("Fresh Lime Soda", 80),
-        ("Iced Tea", 110),
-        ("Mineral Water", 30),
-    ],
-    "Desserts": [
-        ("Brownie", 140),
-        ("Gulab Jamun", 90),
-        ("Ice Cream", 100),
-        ("Cheesecake", 220),
-        ("Fruit Salad", 120),
-    ],
-    "Coffee & Shakes": [
-        ("Espresso", 80),
-        ("Cold Coffee (Large)", 160),
-        ("Cappuccino", 130),
-        ("Vanilla Shake", 140),
-        ("Chocolate Shake", 150),
-    ],
-    "Fries & Sides": [
-        ("Classic Fries", 90),
-        ("Cheese Fries", 140),
-        ("Garlic Bread", 80),
-        ("Onion Rings", 100),
-    ],
-    "Pasta": [
-        ("White Sauce Pasta", 180),
-        ("Red Sauce Pasta", 160),
-        ("Pesto Pasta", 200),
-    ],
-}
-
-# ---------------------------- DB HELPERS ---------------------------- #
-mongo_client = None
-mongo_collection = None
-mongo_connected = False
-
-def connect_mongo():
-    global mongo_client, mongo_collection, mongo_connected
-    if not PYMONGO_AVAILABLE:
-        mongo_connected = False
-        return
-    try:
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
-        mongo_client.server_info()  # force connection check
-        db = mongo_client[DB_NAME]
-        mongo_collection = db[COLLECTION_NAME]
-        mongo_connected = True
-    except Exception:
-        mongo_client = None
-        mongo_collection = None
-        mongo_connected = False
-
-def save_order_to_mongo(order_doc):
-    """Return True if saved, False otherwise."""
-    if not mongo_connected or mongo_collection is None:
-        return False
-    try:
-        mongo_collection.insert_one(order_doc)
-        return True
-    except Exception:
-        return False
-
-def fetch_orders_from_mongo(limit=200):
-    """Fetch recent orders sorted by datetime desc. Returns list of dicts."""
-    if not mongo_connected or mongo_collection is None:
-        return []
-    try:
-        cursor = mongo_collection.find().sort("datetime", -1).limit(limit)
-        return list(cursor)
-    except Exception:
-        return []
-
-# initial attempt to connect
-connect_mongo()
+import queue
+import threading
+import sqlite3
+import sys
+
+from cafe_aura import db
+from cafe_aura.analytics import fetch_daily_report, rebuild_rollups
+from cafe_aura.archive import fetch_history_page, fetch_order
+from cafe_aura.catalog import MenuWatcher, load_catalog
+from cafe_aura.config import (CURRENCY, RESTAURANT_NAME, MONGO_URI, LOCAL_DB_PATH, SEARCH_DEBOUNCE_MS, PRINTER_DEVICE,
+                              METRICS_DUMP_ENABLED, METRICS_DUMP_PATH, PROFILE_MODE, PROFILE_PATH, TERMINAL_ID)
+from cafe_aura.core import Cart, Order, format_dt, new_order_id
+from cafe_aura.customers import CustomerCache, fetch_customers
+from cafe_aura.inventory import OUT, StockLevels, StockMonitor
+from cafe_aura.journal import CartJournal
+from cafe_aura.pricing import TaxPolicy, format_rate, from_paise
+from cafe_aura.receipts import get_renderer, print_escpos
+from cafe_aura.search import MenuSearchIndex, QUICK_CODE_LENGTH
+from cafe_aura.events import (ORDER_CREATED, ORDER_STATUS, ORDER_UPDATED, STOCK_UPDATED, EventPublisher,
+                              make_subscriber, status_event)
+from cafe_aura.metrics import MetricsDumper, PhaseTimer, SessionProfiler, registry as metrics, timed
+from cafe_aura.db import PYMONGO_AVAILABLE, build_order_query
+from cafe_aura.ids import terminal_number_warning
+from cafe_aura.service import OrderConflict, OrderService
+from cafe_aura.store import LocalOrderStore, OrderSync
+
+RECEIPT_FORMATS = {"txt": "text", "html": "html", "htm": "html", "pdf": "pdf", "bin": "escpos"}
 
 # ---------------------------- APP ---------------------------- #
 class CafeAuraApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup=None, exit_after_startup=False):
+        # Startup only builds what the order screen needs; the DB connection, sync and
+        # live feeds start once it is on screen (_start_background), and other windows
+        # are built when first opened.
+        self.startup = startup or PhaseTimer("startup")
+        self._exit_after_startup = exit_after_startup
+        self.profiler = None
+        if PROFILE_MODE:
+            self.profiler = SessionProfiler(PROFILE_MODE, PROFILE_PATH)
+            self.profiler.start()
         super().__init__()
+        apply_style(self)
         self.title(f"{RESTAURANT_NAME} - POS")
         self.geometry("1150x720")
         self.minsize(1024, 640)
-
-        self.order_id = self._new_order_id()
-        self.cart = []  # list of dicts {name, price, qty}
+        self.startup.mark("tk")
+
+        self.tax = TaxPolicy()
+        self.catalog = load_catalog()
+        self.cart = Cart(self.tax, self.tax.table(self.catalog))
+        self.search_index = MenuSearchIndex(self.catalog)
+        self.current_category = None
+        self.startup.mark("catalog")
+
+        self.order_store = LocalOrderStore(LOCAL_DB_PATH)
+        self.cart_journal = CartJournal()
+        self.event_publisher = EventPublisher()
+        self.order_sync = OrderSync(self.order_store, self.event_publisher)
+        self.customers = CustomerCache()
+        self.stock = StockLevels()
+        self.order_service = OrderService(self.order_store, self.order_sync, self.tax, self.catalog, self.event_publisher,
+                                          self.customers, self.stock)
+        self.order_id = new_order_id()  # after OrderService, which resumes IDs after the stored ones
+        self.stock_monitor = StockMonitor(self.stock, self.order_store)
+        self._stock_flags = {}  # item_id -> (OUT/LOW, portions left), see _apply_stock_flags
+        self._add_buttons = {}  # item_id -> its Add button in a built category panel
+        # one live feed per till; open windows (history, kitchen) register listeners on it
+        self.event_subscriber = make_subscriber(replay=False)
+        self._event_listeners = []
+        self.menu_watcher = MenuWatcher(self.catalog)
+        self.metrics_dumper = MetricsDumper(METRICS_DUMP_PATH) if METRICS_DUMP_ENABLED else None
+        self._metrics_overlay = None
+        self.startup.mark("local_store")
 
         self._build_header()
         self._build_left()
         self._build_middle()
         self._build_right()
 
-        first_cat = list(MENU.keys())[0]
+        first_cat = self.catalog.categories()[0]
         self.show_items(first_cat)
         self.category_list.selection_set(0)
+        self._restore_cart()
+        self.startup.mark("widgets")
+
+        self._set_db_status()
+        self.after_idle(self._start_background)
+        self.after(500, self._poll_order_sync)
+        self.after(500, self._poll_menu_watcher)
+        self.after(500, self._poll_stock_monitor)
+        self.after(100, self._poll_events)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.bind("<F12>", lambda e: self._toggle_metrics_overlay())
 
     # ---------- UI BUILDERS ----------
     def _build_header(self):
@@ -167,10 +115,410 @@ class CafeAuraApp(tk.Tk):
         self.customer_phone = ttk.Entry(right, width=16)
         self.customer_phone.grid(row=0, column=3)
 
-        # Mongo status indicator
-        self.mongo_status = ttk.Label(right, text=("DB: Connected" if mongo_connected else "DB: Not connected"),
-                                      foreground=("green" if mongo_connected else "red"))
+        # Mongo status indicator (refreshed by _set_db_status; click for health counters)
+        self.mongo_status = ttk.Label(right, text="DB: Connecting...", foreground="gray", cursor="hand2")
         self.mongo_status.grid(row=0, column=4, padx=8)
+        self.mongo_status.bind("<Button-1>", lambda e: self._show_db_health())
+        self.live_status = ttk.Label(right, text="Live: off", foreground="gray")
+        self.live_status.grid(row=0, column=5, padx=4)
+
+        # Customer autocomplete: cached regulars at once, then the customers collection
+        # (debounced); picking one fills the header and offers their last order again.
+        self.customer_info = ttk.Label(right, text="", foreground="gray")
+        self.customer_info.grid(row=1, column=0, columnspan=4, sticky="e", pady=(4, 0))
+        self.repeat_btn = ttk.Button(right, text="Repeat Last Order", command=self._repeat_last_order, state="disabled")
+        self.repeat_btn.grid(row=1, column=4, columnspan=2, pady=(4, 0))
+        self.customer_suggestions = tk.Listbox(self, height=6, width=44, activestyle="dotbox")
+        self.customer_suggestions.bind("<ButtonRelease-1>", lambda e: self._pick_customer())
+        self._customer_hits = []
+        self._customer_lookup = None
+        self._selected_customer = None
+        for entry in (self.customer_name, self.customer_phone):
+            entry.bind("<KeyRelease>", lambda e, entry=entry: self._on_customer_typed(e, entry))
+            entry.bind("<Down>", lambda e: self._move_customer_selection(1))
+            entry.bind("<Up>", lambda e: self._move_customer_selection(-1))
+            entry.bind("<Return>", lambda e: self._pick_customer())
+            entry.bind("<Escape>", lambda e: self._hide_customer_suggestions())
+            entry.bind("<FocusOut>", lambda e: self.after(200, self._hide_customer_suggestions))
+            entry.bind("<FocusOut>", lambda e: self._journal_customer(), add="+")
+
+    # ---------- Customer autocomplete ----------
+    def _on_customer_typed(self, event, entry):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        self._set_selected_customer(None)
+        text = entry.get().strip()
+        if self._customer_lookup is not None:
+            self.after_cancel(self._customer_lookup)
+            self._customer_lookup = None
+        if len(text) < 2:
+            self._hide_customer_suggestions()
+            return
+        self._show_customer_suggestions(entry, self.customers.search(text))
+        self._customer_lookup = self.after(SEARCH_DEBOUNCE_MS, lambda: self._lookup_customers(entry, text))
+
+    def _lookup_customers(self, entry, text):
+        self._customer_lookup = None
+        if not db.mongo_connected:
+            return
+
+        def on_rows(rows):
+            for row in rows:
+                self.customers.add(row)
+            if entry.get().strip() == text:  # still what the cashier is typing
+                self._show_customer_suggestions(entry, self.customers.search(text))
+
+        self._run_async(lambda: fetch_customers(text), on_rows)
+
+    def _show_customer_suggestions(self, entry, hits):
+        self._customer_hits = hits
+        box = self.customer_suggestions
+        box.delete(0, tk.END)
+        for c in hits:
+            box.insert(tk.END, f"{c['name']}  {c['phone']}  ({c['visits']} visits)")
+        if hits:
+            box.selection_set(0)
+            box.place(in_=entry, relx=0, rely=1.0, anchor="nw")
+            box.lift()
+        else:
+            box.place_forget()
+
+    def _hide_customer_suggestions(self):
+        self._customer_hits = []
+        self.customer_suggestions.place_forget()
+
+    def _move_customer_selection(self, step):
+        if not self._customer_hits:
+            return
+        box = self.customer_suggestions
+        sel = box.curselection()
+        idx = min(max((sel[0] if sel else 0) + step, 0), len(self._customer_hits) - 1)
+        box.selection_clear(0, tk.END)
+        box.selection_set(idx)
+        box.see(idx)
+
+    def _pick_customer(self):
+        sel = self.customer_suggestions.curselection()
+        if not self._customer_hits or not sel:
+            return
+        customer = self._customer_hits[sel[0]]
+        self._hide_customer_suggestions()
+        self.customer_name.delete(0, tk.END)
+        self.customer_name.insert(0, customer["name"])
+        self.customer_phone.delete(0, tk.END)
+        self.customer_phone.insert(0, customer["phone"])
+        self._set_selected_customer(customer)
+        self._journal_customer()
+
+    def _set_selected_customer(self, customer):
+        self._selected_customer = customer
+        if customer is None:
+            self.customer_info.config(text="")
+            self.repeat_btn.config(state="disabled")
+            return
+        last = customer.get("last_items") or []
+        self.customer_info.config(text=f"{customer['visits']} visits · {CURRENCY} {from_paise(customer['spend_paise']):.2f} spent"
+                                       + (f" · last: {', '.join(i['name'] for i in last)}" if last else ""))
+        self.repeat_btn.config(state="normal" if last else "disabled")
+
+    def _repeat_last_order(self):
+        """Add the selected customer's last order to the cart, at today's menu prices."""
+        if self._selected_customer is None:
+            return
+        missing = []
+        for line in self._selected_customer.get("last_items") or []:
+            item = self.catalog.get(line.get("item_id")) or self.catalog.by_name.get(line["name"])
+            if item is None or not item["available"] or self.stock.is_out(item):
+                missing.append(line["name"])
+                continue
+            self._refresh_cart_row(self.cart.add(item, line["qty"]))
+            self.cart_journal.add(item, line["qty"])
+        self._update_totals()
+        if missing:
+            messagebox.showwarning("Repeat Order", "Not available today:\n" + "\n".join(missing))
+
+    def _restore_cart(self):
+        """Bring back the order that was open when the till crashed or was closed (see journal.py)."""
+        saved = self.cart_journal.recover()
+        if saved is None or self.order_store.get(saved["order_id"]) is not None:
+            self.cart_journal.begin(self.order_id)  # nothing open, or it was checked out after all
+            return
+        self.order_id = saved["order_id"]
+        new_order_id.resume_after(self.order_id)  # issued before the restart, maybe on a clock since set back
+        self.cart_journal.begin(self.order_id)  # rewritten compactly, without any torn last line
+        for item, qty in saved["lines"]:
+            self.cart.add(item, qty)
+            self.cart_journal.add(item, qty)
+        self.cart_journal.customer(saved["customer_name"], saved["phone"])
+        self._refresh_cart_table()
+        self._update_totals()
+        self.customer_name.insert(0, saved["customer_name"])
+        self.customer_phone.insert(0, saved["phone"])
+        self.customer_info.config(text=f"Restored unfinished order {self.order_id}")
+
+    def _journal_customer(self):
+        self.cart_journal.customer(self.customer_name.get().strip(), self.customer_phone.get().strip())
+
+    def _start_background(self):
+        """Runs once the order screen has been drawn: connect and start the background threads."""
+        self.update_idletasks()
+        self.startup.mark("first_paint")
+        db.start_health_monitor()  # imports pymongo and connects off the Tk thread
+        # regulars from this till's own history autocomplete even before the DB is up
+        self._run_async(lambda: self.order_store.recent(1000), lambda docs: self.customers.load(reversed(docs)))
+        self.order_sync.start()
+        self.event_publisher.start()
+        self.event_subscriber.start()
+        self.menu_watcher.start()
+        self.stock_monitor.start()
+        if self.metrics_dumper is not None:
+            self.metrics_dumper.start()
+        self.startup.mark("background")
+        if self._exit_after_startup:
+            print(self.startup.report(), file=sys.stderr)
+            self._on_close()
+
+    def _set_db_status(self):
+        backlog = self.order_sync.backlog()
+        latency = db.mongo_stats["last_latency_ms"]
+        if not PYMONGO_AVAILABLE:
+            text = f"DB: pymongo missing ({backlog} queued)" if backlog else "DB: pymongo missing"
+            self.mongo_status.config(text=text, foreground="red")
+        elif db.mongo_connected and not backlog:
+            self.mongo_status.config(text=f"DB: Connected ({latency:.0f} ms)", foreground="green")
+        elif db.mongo_connected:
+            self.mongo_status.config(text=f"DB: Syncing ({backlog} queued)", foreground="orange")
+        elif PYMONGO_AVAILABLE and not db.mongo_stats["pings"]:
+            self.mongo_status.config(text="DB: Connecting...", foreground="gray")
+        else:
+            text = f"DB: Not connected ({backlog} queued)" if backlog else "DB: Not connected"
+            self.mongo_status.config(text=text, foreground="red")
+
+    def _show_db_health(self):
+        s = db.mongo_stats
+        fmt_ms = lambda v: "-" if v is None else f"{v:.1f} ms"
+        messagebox.showinfo("DB Health", "\n".join([
+            f"Server: {MONGO_URI}",
+            f"Connected: {'yes' if db.mongo_connected else 'no'}",
+            f"Last latency: {fmt_ms(s['last_latency_ms'])}",
+            f"Avg latency: {fmt_ms(s['avg_latency_ms'])}",
+            f"Pings: {s['pings']} ({s['ping_failures']} failed, {s['consecutive_failures']} in a row)",
+            f"Operation errors: {s['op_errors']}",
+            f"Last error: {s['last_error'] or '-'}",
+            f"Orders waiting to sync: {self.order_sync.backlog()}",
+            "Order ID index: " + {True: "unique", False: "NOT unique (run: python -m cafe_aura migrate-ids)",
+                                  None: "-"}[db.order_id_index_unique],
+        ]))
+
+    def _poll_order_sync(self):
+        try:
+            while True:
+                synced, _ = self.order_sync.results.get_nowait()
+                if synced:
+                    self.stock_monitor.wake()  # their stock has just been taken off the inventory
+        except queue.Empty:
+            pass
+        self._set_db_status()
+        self.after(500, self._poll_order_sync)
+
+    def _poll_events(self):
+        try:
+            while True:
+                event = self.event_subscriber.results.get_nowait()
+                if event["type"] == "connection":
+                    self.live_status.config(text="Live: on" if event["connected"] else "Live: off",
+                                            foreground="green" if event["connected"] else "gray")
+                elif event["type"] == ORDER_STATUS and event["status"] == "ready":
+                    self.live_status.config(text=f"Order {event['order_id']} ready", foreground="blue")
+                elif event["type"] == STOCK_UPDATED and event["terminal"] != TERMINAL_ID:
+                    self.stock_monitor.wake()  # this till's own writes already woke it via order sync
+                for listener in list(self._event_listeners):
+                    listener(event)
+        except queue.Empty:
+            pass
+        self.after(100, self._poll_events)
+
+    def _listen(self, win, listener):
+        """Feed live order events to ``listener`` until ``win`` is destroyed."""
+        self._event_listeners.append(listener)
+
+        def on_destroy(event):
+            if event.widget is win and listener in self._event_listeners:
+                self._event_listeners.remove(listener)
+
+        win.bind("<Destroy>", on_destroy, add="+")
+
+    def _poll_menu_watcher(self):
+        try:
+            while True:
+                catalog, changed = self.menu_watcher.results.get_nowait()
+                self._apply_catalog(catalog, changed)
+        except queue.Empty:
+            pass
+        self.after(500, self._poll_menu_watcher)
+
+    def _poll_stock_monitor(self):
+        try:
+            while True:
+                self.stock_monitor.results.get_nowait()
+                self._apply_stock_flags()
+        except queue.Empty:
+            pass
+        self.after(500, self._poll_stock_monitor)
+
+    def _apply_stock_flags(self):
+        """Re-flag the Add buttons of items whose stock state changed (panels not built yet pick it up when built)."""
+        flags = self.stock.flags(self.catalog)
+        changed = {item_id for item_id in set(flags) | set(self._stock_flags)
+                   if flags.get(item_id) != self._stock_flags.get(item_id)}
+        self._stock_flags = flags
+        for item_id in changed:
+            btn, item = self._add_buttons.get(item_id), self.catalog.get(item_id)
+            if btn is not None and item is not None and btn.winfo_exists():
+                self._flag_add_button(btn, item)
+        if changed:
+            self._on_search_change()
+
+    def _flag_add_button(self, btn, item):
+        state, left = self._stock_flags.get(item["id"], (None, None))
+        if not item["available"]:
+            btn.config(text="Sold out", state="disabled")
+        elif state == OUT:
+            btn.config(text="Out of stock", state="disabled")
+        elif state is not None:
+            btn.config(text=f"Add ({left} left)" if left is not None else "Add (low)", state="normal")
+        else:
+            btn.config(text="Add", state="normal")
+
+    def _apply_catalog(self, catalog, changed):
+        """Swap in a reloaded menu, rebuilding only the category panels that changed."""
+        categories_changed = catalog.categories() != self.catalog.categories()
+        self.catalog = catalog
+        self.order_service.catalog = catalog
+        self.cart.use_table(self.tax.table(catalog))  # new offers apply to the open cart
+        self._update_totals()
+        self._stock_flags = self.stock.flags(catalog)  # recipes may have changed; panels below are rebuilt
+        self.search_index.update(catalog, changed)
+        self._on_search_change()
+        for category in changed:
+            panel = self._category_panels.pop(category, None)
+            if panel is not None:
+                if panel[0] is self._current_panel:
+                    self._current_panel = None
+                panel[0].destroy()
+        if categories_changed:
+            self.category_list.delete(0, tk.END)
+            for cat in catalog.categories():
+                self.category_list.insert(tk.END, cat)
+        if self.current_category not in catalog.by_category:
+            self.current_category = catalog.categories()[0]
+        if categories_changed or self.current_category in changed:
+            self.show_items(self.current_category)
+            idx = catalog.categories().index(self.current_category)
+            self.category_list.selection_clear(0, tk.END)
+            self.category_list.selection_set(idx)
+
+    def _run_async(self, func, callback, on_error=None):
+        """Run func() on a worker thread and hand its result to callback on the Tk thread.
+
+        If func raises, on_error(exc) is called instead (default: an error box), so the
+        caller never waits forever on a result that is not coming.
+        """
+        results = queue.Queue(maxsize=1)
+
+        def work():
+            try:
+                results.put((True, func()))
+            except Exception as e:
+                results.put((False, e))
+
+        threading.Thread(target=work, daemon=True).start()
+
+        def poll():
+            try:
+                ok, value = results.get_nowait()
+            except queue.Empty:
+                self.after(30, poll)
+                return
+            if ok:
+                callback(value)
+            elif on_error is not None:
+                on_error(value)
+            else:
+                messagebox.showerror("Error", str(value))
+
+        self.after(30, poll)
+
+    # ---------- Performance overlay (F12) ----------
+    def _toggle_metrics_overlay(self):
+        """Small always-on-top window with live timings of the instrumented hot paths."""
+        if self._metrics_overlay is not None:
+            self._metrics_overlay.destroy()
+            self._metrics_overlay = None
+            return
+        win = self._metrics_overlay = tk.Toplevel(self)
+        win.title("Performance")
+        win.geometry("560x300")
+        win.attributes("-topmost", True)
+        win.protocol("WM_DELETE_WINDOW", self._toggle_metrics_overlay)
+
+        txt = tk.Text(win, font=("Consolas", 10), height=12)
+        txt.pack(fill=tk.BOTH, expand=True)
+        btns = ttk.Frame(win)
+        btns.pack(fill=tk.X)
+        profile_btn = ttk.Button(btns, command=lambda: [self._toggle_profiler(), refresh_button()])
+        profile_btn.pack(side=tk.LEFT, padx=6, pady=4)
+        ttk.Button(btns, text="Dump Now", command=self._dump_metrics).pack(side=tk.LEFT, padx=6)
+
+        def refresh_button():
+            running = self.profiler is not None and self.profiler.running
+            profile_btn.config(text="Stop Profile" if running else "Start Profile")
+
+        def refresh():
+            if self._metrics_overlay is not win:
+                return
+            lines = [f"{'operation':<22}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+            for name, s in metrics.snapshot().items():
+                if s["count"]:
+                    lines.append(f"{name:<22}{s['count']:>7}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}"
+                                 f"{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+            txt.config(state="normal")
+            txt.delete("1.0", tk.END)
+            txt.insert("1.0", "\n".join(lines))
+            txt.config(state="disabled")
+            win.after(1000, refresh)
+
+        refresh_button()
+        refresh()
+
+    def _toggle_profiler(self):
+        if self.profiler is not None and self.profiler.running:
+            path = self.profiler.stop()
+            messagebox.showinfo("Profile", f"Profile saved to:\n{path}")
+        else:
+            self.profiler = SessionProfiler(PROFILE_MODE or "sampling", PROFILE_PATH)
+            self.profiler.start()
+
+    def _dump_metrics(self):
+        try:
+            metrics.dump(METRICS_DUMP_PATH)
+        except OSError as e:
+            messagebox.showerror("Metrics", f"Could not write metrics.\n{e}")
+            return
+        messagebox.showinfo("Metrics", f"Metrics saved to:\n{METRICS_DUMP_PATH}.json\n{METRICS_DUMP_PATH}.prom")
+
+    def _on_close(self):
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+        if self.metrics_dumper is not None:
+            self.metrics_dumper.stop()
+        self.menu_watcher.stop()
+        self.stock_monitor.stop()
+        self.event_subscriber.stop()
+        self.event_publisher.stop()
+        self.order_sync.stop()
+        self.cart_journal.close()  # the open cart is kept and comes back on the next start
+        self.destroy()
 
     def _build_left(self):
         left = ttk.Frame(self, padding=(10,0,10,10))
@@ -178,7 +526,7 @@ class CafeAuraApp(tk.Tk):
 
         ttk.Label(left, text="Categories", font=("Segoe UI", 12, "bold")).pack(anchor="w")
         self.category_list = tk.Listbox(left, height=18)
-        for cat in MENU.keys():
+        for cat in self.catalog.categories():
             self.category_list.insert(tk.END, cat)
         self.category_list.pack(fill=tk.Y, pady=6)
         self.category_list.bind("<<ListboxSelect>>", self.on_category_select)
@@ -189,6 +537,8 @@ class CafeAuraApp(tk.Tk):
         ttk.Button(actions, text="Clear Cart", command=self.clear_cart).pack(fill=tk.X, pady=3)
         ttk.Button(actions, text="Checkout / Save Bill", command=self.checkout).pack(fill=tk.X, pady=3)
         ttk.Button(actions, text="View Old Orders", command=self.view_old_orders).pack(fill=tk.X, pady=6)
+        ttk.Button(actions, text="Reports", command=self.view_reports).pack(fill=tk.X, pady=3)
+        ttk.Button(actions, text="Kitchen Display", command=self.view_kitchen).pack(fill=tk.X, pady=3)
 
     def _build_middle(self):
         middle_wrap = ttk.Frame(self, padding=(0,0,10,10))
@@ -196,8 +546,28 @@ class CafeAuraApp(tk.Tk):
 
         ttk.Label(middle_wrap, text="Items", font=("Segoe UI", 12, "bold")).pack(anchor="w")
 
+        # Quick search: type a name or a quick code; Enter adds the highlighted result,
+        # a complete quick code adds its item immediately. Ctrl+F focuses the box.
+        search_row = ttk.Frame(middle_wrap)
+        search_row.pack(fill=tk.X, pady=(2, 4))
+        ttk.Label(search_row, text="Search / Code:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_row, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=4)
+        self.search_results = tk.Listbox(middle_wrap, height=6, activestyle="dotbox")
+        self._search_hits = []
+        self.search_var.trace_add("write", self._on_search_change)
+        self.search_entry.bind("<Return>", self._add_search_selection)
+        self.search_entry.bind("<Down>", lambda e: self._move_search_selection(1))
+        self.search_entry.bind("<Up>", lambda e: self._move_search_selection(-1))
+        self.search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.search_results.bind("<Double-1>", self._add_search_selection)
+        self.bind_all("<Control-f>", lambda e: self.search_entry.focus_set())
+
         self.middle_canvas = tk.Canvas(middle_wrap, borderwidth=0)
         self.items_frame = ttk.Frame(self.middle_canvas)
+        self._category_panels = {}  # category -> (frame, qty_vars), built on first view
+        self._current_panel = None
         vsb = ttk.Scrollbar(middle_wrap, orient="vertical", command=self.middle_canvas.yview)
         self.middle_canvas.configure(yscrollcommand=vsb.set)
 
@@ -236,18 +606,24 @@ class CafeAuraApp(tk.Tk):
         self.summary.pack(fill=tk.X, pady=8)
 
         self.var_subtotal = tk.StringVar(value=f"{CURRENCY} 0.00")
+        self.var_discount = tk.StringVar(value=f"{CURRENCY} 0.00")
         self.var_sgst = tk.StringVar(value=f"{CURRENCY} 0.00")
         self.var_cgst = tk.StringVar(value=f"{CURRENCY} 0.00")
         self.var_total = tk.StringVar(value=f"{CURRENCY} 0.00")
+        sgst_rate, cgst_rate = (format_rate(r) for r in self.tax.rates(self.tax.default_class))
+        self.var_sgst_label = tk.StringVar(value=f"SGST ({sgst_rate}%):")
+        self.var_cgst_label = tk.StringVar(value=f"CGST ({cgst_rate}%):")
 
         self._row_summary(self.summary, 0, "Subtotal:", self.var_subtotal)
-        self._row_summary(self.summary, 1, f"SGST ({int(TAX_SGST*100)}%):", self.var_sgst)
-        self._row_summary(self.summary, 2, f"CGST ({int(TAX_CGST*100)}%):", self.var_cgst)
-        ttk.Separator(self.summary).grid(row=3, column=0, columnspan=2, sticky="ew", pady=6)
-        self._row_summary(self.summary, 4, "Grand Total:", self.var_total, bold=True)
+        self._row_summary(self.summary, 1, "Discount:", self.var_discount)
+        self._row_summary(self.summary, 2, self.var_sgst_label, self.var_sgst)
+        self._row_summary(self.summary, 3, self.var_cgst_label, self.var_cgst)
+        ttk.Separator(self.summary).grid(row=4, column=0, columnspan=2, sticky="ew", pady=6)
+        self._row_summary(self.summary, 5, "Grand Total:", self.var_total, bold=True)
 
     def _row_summary(self, parent, r, label, var, bold=False):
-        ttk.Label(parent, text=label, font=("Segoe UI", 10, "bold" if bold else "normal")).grid(row=r, column=0, sticky="w", padx=8, pady=4)
+        text = {"textvariable": label} if isinstance(label, tk.StringVar) else {"text": label}
+        ttk.Label(parent, **text, font=("Segoe UI", 10, "bold" if bold else "normal")).grid(row=r, column=0, sticky="w", padx=8, pady=4)
         ttk.Label(parent, textvariable=var, font=("Segoe UI", 10, "bold" if bold else "normal")).grid(row=r, column=1, sticky="e", padx=8, pady=4)
 
     # ---------- Events ----------
@@ -259,33 +635,96 @@ class CafeAuraApp(tk.Tk):
         category = event.widget.get(idx)
         self.show_items(category)
 
+    @timed("ui.show_items")
     def show_items(self, category):
-        # Clear previous
-        for child in self.items_frame.winfo_children():
-            child.destroy()
-
-        ttk.Label(self.items_frame, text=f"{category} Menu", font=("Segoe UI", 13, "bold")).grid(row=0, column=0, columnspan=4, sticky="w", pady=(0,6))
-        ttk.Label(self.items_frame, text="Item").grid(row=1, column=0, sticky="w", padx=4)
-        ttk.Label(self.items_frame, text="Price").grid(row=1, column=1, sticky="w", padx=4)
-        ttk.Label(self.items_frame, text="Qty").grid(row=1, column=2, sticky="w", padx=4)
-        ttk.Label(self.items_frame, text="Add").grid(row=1, column=3, sticky="w", padx=4)
-
-        for r, (name, price) in enumerate(MENU[category], start=2):
-            ttk.Label(self.items_frame, text=name, font=("Segoe UI", 10)).grid(row=r, column=0, sticky="w", padx=4, pady=2)
-            ttk.Label(self.items_frame, text=f"{CURRENCY} {price}").grid(row=r, column=1, sticky="w", padx=4)
+        # Each category's panel is built once, on first view, then just swapped in;
+        # switching back only resets the quantity spinners.
+        self.current_category = category
+        panel = self._category_panels.get(category)
+        if panel is None:
+            panel = self._category_panels[category] = self._build_category_panel(category)
+        frame, qty_vars = panel
+        if self._current_panel is not frame:
+            if self._current_panel is not None:
+                self._current_panel.grid_remove()
+            frame.grid(row=0, column=0, sticky="nw")
+            self._current_panel = frame
+            self.middle_canvas.yview_moveto(0)
+        for qty_var in qty_vars:
+            qty_var.set(1)
+
+    def _build_category_panel(self, category):
+        """Create the item rows for one category; returns (frame, qty_vars)."""
+        frame = ttk.Frame(self.items_frame)
+        ttk.Label(frame, text=f"{category} Menu", font=("Segoe UI", 13, "bold")).grid(row=0, column=0, columnspan=4, sticky="w", pady=(0,6))
+        ttk.Label(frame, text="Item").grid(row=1, column=0, sticky="w", padx=4)
+        ttk.Label(frame, text="Price").grid(row=1, column=1, sticky="w", padx=4)
+        ttk.Label(frame, text="Qty").grid(row=1, column=2, sticky="w", padx=4)
+        ttk.Label(frame, text="Add").grid(row=1, column=3, sticky="w", padx=4)
+
+        qty_vars = []
+        for r, item in enumerate(self.catalog.items_in(category), start=2):
+            ttk.Label(frame, text=item["name"], font=("Segoe UI", 10)).grid(row=r, column=0, sticky="w", padx=4, pady=2)
+            ttk.Label(frame, text=f"{CURRENCY} {item['price']}").grid(row=r, column=1, sticky="w", padx=4)
 
             qty_var = tk.IntVar(value=1)
-            spin = ttk.Spinbox(self.items_frame, from_=1, to=50, width=5, textvariable=qty_var, justify="center")
+            qty_vars.append(qty_var)
+            spin = ttk.Spinbox(frame, from_=1, to=50, width=5, textvariable=qty_var, justify="center")
             spin.grid(row=r, column=2, padx=4)
 
-            def make_add_cmd(name=name, price=price, qty_var=qty_var):
-                return lambda: self.add_to_cart(name, price, int(qty_var.get()))
+            def make_add_cmd(item_id=item["id"], qty_var=qty_var):
+                return lambda: self.add_to_cart(item_id, int(qty_var.get()))
 
-            add_btn = ttk.Button(self.items_frame, text="Add", command=make_add_cmd())
+            add_btn = ttk.Button(frame, text="Add", command=make_add_cmd())
+            self._flag_add_button(add_btn, item)
             add_btn.grid(row=r, column=3, padx=4)
+            self._add_buttons[item["id"]] = add_btn
+        return frame, qty_vars
+
+    # ---------- Quick Search ----------
+    def _on_search_change(self, *_):
+        query = self.search_var.get()
+        item = self.search_index.lookup_code(query) if len(query.strip()) == QUICK_CODE_LENGTH else None
+        if item is not None:
+            self.search_var.set("")
+            self.add_to_cart(item["id"], 1)
+            return
+        self._search_hits = self.search_index.search(query)
+        self.search_results.delete(0, tk.END)
+        for hit in self._search_hits:
+            label = f"{hit.get('code', ''):>4}  {hit['name']}  ({CURRENCY} {hit['price']})"
+            if not hit["available"]:
+                label += "  - sold out"
+            elif hit["id"] in self._stock_flags:
+                label += "  - out of stock" if self._stock_flags[hit["id"]][0] == OUT else "  - low"
+            self.search_results.insert(tk.END, label)
+        if self._search_hits:
+            self.search_results.selection_set(0)
+            if not self.search_results.winfo_ismapped():
+                self.search_results.pack(fill=tk.X, pady=(0, 6), before=self.middle_canvas)
+        else:
+            self.search_results.pack_forget()
+
+    def _move_search_selection(self, step):
+        if not self._search_hits:
+            return
+        sel = self.search_results.curselection()
+        idx = min(max((sel[0] if sel else 0) + step, 0), len(self._search_hits) - 1)
+        self.search_results.selection_clear(0, tk.END)
+        self.search_results.selection_set(idx)
+        self.search_results.see(idx)
+
+    def _add_search_selection(self, event=None):
+        sel = self.search_results.curselection()
+        if not self._search_hits or not sel:
+            return
+        item = self._search_hits[sel[0]]
+        self.search_var.set("")
+        self.add_to_cart(item["id"], 1)
+        self.search_entry.focus_set()
 
     # ---------- Cart Ops ----------
-    def add_to_cart(self, name, price, qty):
+    def add_to_cart(self, item_id, qty):
         try:
             qty = int(qty)
         except ValueError:
@@ -295,15 +734,16 @@ class CafeAuraApp(tk.Tk):
             messagebox.showwarning("Quantity", "Minimum quantity is 1.")
             return
 
-        # merge if already exists
-        for item in self.cart:
-            if item['name'] == name and item['price'] == price:
-                item['qty'] += qty
-                break
-        else:
-            self.cart.append({"name": name, "price": price, "qty": qty})
-
-        self._refresh_cart_table()
+        item = self.catalog.get(item_id)
+        if item is None or not item["available"]:
+            messagebox.showwarning("Unavailable", "This item is no longer on the menu.")
+            return
+        if self.stock.is_out(item):
+            messagebox.showwarning("Out of Stock", f"{item['name']} is out of stock.")
+            return
+        line_id = self.cart.add(item, qty)
+        self.cart_journal.add(item, qty)
+        self._refresh_cart_row(line_id)
         self._update_totals()
 
     def remove_selected(self):
@@ -311,162 +751,181 @@ class CafeAuraApp(tk.Tk):
         if not sel:
             messagebox.showinfo("Remove", "Please select an item in cart.")
             return
-        index = int(sel[0])
-        if 0 <= index < len(self.cart):
-            del self.cart[index]
-            self._refresh_cart_table()
-            self._update_totals()
+        for line_id in sel:
+            self.cart.remove(line_id)
+            self.cart_journal.remove(line_id)
+            self.cart_table.delete(line_id)
+        self._update_totals()
 
     def clear_cart(self):
         if not self.cart:
             return
         if messagebox.askyesno("Clear Cart", "Remove all items from cart?"):
             self.cart.clear()
+            self.cart_journal.clear()
             self._refresh_cart_table()
             self._update_totals()
 
+    @timed("ui.refresh_cart_table")
     def _refresh_cart_table(self):
-        for row in self.cart_table.get_children():
-            self.cart_table.delete(row)
-        for i, item in enumerate(self.cart):
-            total = item['qty'] * item['price']
-            self.cart_table.insert('', 'end', iid=str(i), values=(item['name'], item['qty'], f"{item['price']:.2f}", f"{total:.2f}"))
+        self.cart_table.delete(*self.cart_table.get_children())
+        for line_id in self.cart.line_ids():
+            self._refresh_cart_row(line_id)
+
+    def _refresh_cart_row(self, line_id):
+        """Insert or update the single Treeview row for a cart line (iid == line ID)."""
+        item = self.cart.get(line_id)
+        if item is None:
+            if self.cart_table.exists(line_id):
+                self.cart_table.delete(line_id)
+            return
+        values = (item['name'], item['qty'], f"{from_paise(item['price_paise']):.2f}",
+                  f"{from_paise(item['qty'] * item['price_paise']):.2f}")
+        if self.cart_table.exists(line_id):
+            self.cart_table.item(line_id, values=values)
+        else:
+            self.cart_table.insert('', 'end', iid=line_id, values=values)
 
+    @timed("ui.update_totals")
     def _update_totals(self):
-        subtotal = sum(i['qty'] * i['price'] for i in self.cart)
-        sgst = subtotal * TAX_SGST
-        cgst = subtotal * TAX_CGST
-        grand = subtotal + sgst + cgst
-
-        self.var_subtotal.set(f"{CURRENCY} {subtotal:.2f}")
-        self.var_sgst.set(f"{CURRENCY} {sgst:.2f}")
-        self.var_cgst.set(f"{CURRENCY} {cgst:.2f}")
-        self.var_total.set(f"{CURRENCY} {grand:.2f}")
+        bill = self.cart.bill()
+        self.var_subtotal.set(f"{CURRENCY} {from_paise(bill['subtotal']):.2f}")
+        self.var_discount.set(f"-{CURRENCY} {from_paise(bill['discount']):.2f}")
+        self.var_sgst.set(f"{CURRENCY} {from_paise(bill['sgst']):.2f}")
+        self.var_cgst.set(f"{CURRENCY} {from_paise(bill['cgst']):.2f}")
+        self.var_total.set(f"{CURRENCY} {from_paise(bill['grand_total']):.2f}")
+        # a single tax class shows its rates; a mix of classes shows the summed amounts
+        if len(bill['taxes']) == 1:
+            self.var_sgst_label.set(f"SGST ({bill['taxes'][0]['sgst_rate']}%):")
+            self.var_cgst_label.set(f"CGST ({bill['taxes'][0]['cgst_rate']}%):")
+        elif bill['taxes']:
+            self.var_sgst_label.set("SGST:")
+            self.var_cgst_label.set("CGST:")
 
     # ---------- Order Ops ----------
     def new_order(self):
         if self.cart and not messagebox.askyesno("New Order", "Start a new order? Current cart will be cleared."):
             return
+        self._reset_order()
+        messagebox.showinfo("New Order", f"New Order ID: {self.order_id}")
+
+    def _reset_order(self):
+        """Empty cart, blank customer and a fresh order ID (and journal) for the next order."""
         self.cart.clear()
         self._refresh_cart_table()
         self._update_totals()
-        self.order_id = self._new_order_id()
+        self.order_id = new_order_id()
+        self.cart_journal.begin(self.order_id)
         self.customer_name.delete(0, tk.END)
         self.customer_phone.delete(0, tk.END)
-        messagebox.showinfo("New Order", f"New Order ID: {self.order_id}")
+        self._set_selected_customer(None)
 
     def checkout(self):
         if not self.cart:
             messagebox.showwarning("Checkout", "Your cart is empty.")
             return
 
-        subtotal = sum(i['qty'] * i['price'] for i in self.cart)
-        sgst = subtotal * TAX_SGST
-        cgst = subtotal * TAX_CGST
-        grand = subtotal + sgst + cgst
-
+        grand = self.cart.totals()[3]
         name = self.customer_name.get().strip() or "Guest"
-        phone = self.customer_phone.get().strip() or "-"
 
         if not messagebox.askyesno("Confirm Order", f"Place order {self.order_id} for {name}?\nTotal: {CURRENCY} {grand:.2f}"):
             return
 
-        receipt_text = self._build_receipt_text(name, phone, subtotal, sgst, cgst, grand)
-
-        # Save order to MongoDB (best-effort)
-        order_doc = {
-            "order_id": self.order_id,
-            "datetime": dt.datetime.now(),
-            "customer_name": name,
-            "phone": phone,
-            "items": self.cart.copy(),
-            "subtotal": subtotal,
-            "sgst": sgst,
-            "cgst": cgst,
-            "grand_total": grand,
-        }
-        saved = save_order_to_mongo(order_doc)
-        if saved:
-            messagebox.showinfo("Order Saved", "Order saved to database.")
-        else:
-            if PYMONGO_AVAILABLE:
-                messagebox.showwarning("DB", "Could not save order to DB (connection failed).")
+        # The local store is the primary write target; the sync engine pushes it to
+        # MongoDB in the background, so checkout never waits on the DB.
+        # Timed from confirmation to receipt on screen (dialogs excluded).
+        error = None
+        with timed("ui.checkout"):
+            try:
+                order = self.order_service.place_order(self.cart, self.order_id, name, self.customer_phone.get())
+            except sqlite3.Error as e:
+                error = f"Could not save order locally.\n{e}"
+            except OrderConflict as e:
+                error = f"{e}\nStart a new order for the extra items."
             else:
-                messagebox.showwarning("DB", "pymongo not installed; order not saved to DB.")
-
-        # Show receipt window with Save option only (print removed)
-        self._show_receipt_window(receipt_text)
-
-    def _build_receipt_text(self, customer_name, phone, subtotal, sgst, cgst, grand):
-        now = dt.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-        lines = []
-        lines.append("*" * 54)
-        lines.append(f"\t\t{RESTAURANT_NAME.upper()}")
-        lines.append("*" * 54)
-        lines.append(f"Order ID : {self.order_id}")
-        lines.append(f"Date/Time: {now}")
-        lines.append(f"Customer : {customer_name}")
-        lines.append(f"Phone    : {phone}")
-        lines.append("-" * 54)
-        lines.append(f"{'Item':28} {'Qty':>3} {'Price':>8} {'Total':>10}")
-        lines.append("-" * 54)
-        for item in self.cart:
-            total = item['qty'] * item['price']
-            name = (item['name'][:25] + '...') if len(item['name']) > 28 else item['name']
-            lines.append(f"{name:28} {item['qty']:>3} {item['price']:>8.2f} {total:>10.2f}")
-        lines.append("-" * 54)
-        lines.append(f"Subtotal: {CURRENCY} {subtotal:.2f}")
-        lines.append(f"SGST (9%): {CURRENCY} {sgst:.2f}")
-        lines.append(f"CGST (9%): {CURRENCY} {cgst:.2f}")
-        lines.append("=" * 54)
-        lines.append(f"Grand Total: {CURRENCY} {grand:.2f}")
-        lines.append("=" * 54)
-        lines.append("Thank you for your order! Please visit again.")
-        return "\n".join(lines)
+                # The placed order is closed: anything added from here on is a new order.
+                self._reset_order()
+                self._set_db_status()
+                self._apply_stock_flags()  # this order's stock is already off the till's levels
+                self._show_receipt_window(order)  # not modal: the timer stops once it is drawn
+        if error is not None:
+            messagebox.showerror("Order", error)  # after the timer, so time spent reading it is not counted
+            return
+        if not PYMONGO_AVAILABLE:
+            messagebox.showwarning("DB", "pymongo not installed; order saved locally until it is.")
 
-    def _show_receipt_window(self, receipt_text):
+    def _show_receipt_window(self, order, reprint=False):
+        """Receipt for a just-placed order, or a reprint of one from history (same renderer, same bytes)."""
         win = tk.Toplevel(self)
-        win.title("Order Receipt")
+        win.title(f"Order {order.order_id} (reprint)" if reprint else "Order Receipt")
         win.geometry("720x560")
 
         txt = tk.Text(win, wrap="word", font=("Consolas", 11))
-        txt.insert("1.0", receipt_text)
+        txt.insert("1.0", order.receipt_text())
         txt.config(state="disabled")
         txt.pack(fill=tk.BOTH, expand=True)
 
         btns = ttk.Frame(win)
         btns.pack(fill=tk.X)
-        ttk.Button(btns, text="Save Receipt", command=lambda: self._save_receipt(receipt_text)).pack(side=tk.LEFT, padx=6, pady=6)
-        ttk.Button(btns, text="New Order", command=lambda: [win.destroy(), self.new_order()]).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btns, text="Save Receipt", command=lambda: self._save_receipt(order)).pack(side=tk.LEFT, padx=6, pady=6)
+        ttk.Button(btns, text="Print", command=lambda: self._print_receipt(order)).pack(side=tk.LEFT, padx=6)
         ttk.Button(btns, text="Close", command=win.destroy).pack(side=tk.RIGHT, padx=6)
 
-    def _save_receipt(self, text):
-        default_name = f"receipt_{self.order_id}.txt"
+    def _save_receipt(self, order):
+        default_name = f"receipt_{order.order_id}.txt"
         file = filedialog.asksaveasfilename(defaultextension=".txt", initialfile=default_name,
-                                            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
+                                            filetypes=[("Text Files", "*.txt"), ("HTML Files", "*.html"),
+                                                       ("PDF Files", "*.pdf"), ("ESC/POS Print Files", "*.bin"),
+                                                       ("All Files", "*.*")])
         if not file:
             return
+        fmt = RECEIPT_FORMATS.get(file.rsplit(".", 1)[-1].lower(), "text")
         try:
-            with open(file, "w", encoding="utf-8") as f:
-                f.write(text)
+            data = get_renderer().render(order, fmt)
+            if isinstance(data, bytes):
+                with open(file, "wb") as f:
+                    f.write(data)
+            else:
+                with open(file, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(data)
             messagebox.showinfo("Saved", f"Receipt saved to:\n{file}")
         except Exception as e:
             messagebox.showerror("Error", f"Could not save file.\n{e}")
 
+    def _print_receipt(self, order):
+        try:
+            print_escpos(order, PRINTER_DEVICE)
+        except OSError as e:
+            messagebox.showerror("Print", f"Could not print receipt on {PRINTER_DEVICE}.\n{e}")
+
     # ---------- Old Orders Viewer ----------
     def view_old_orders(self):
         if not PYMONGO_AVAILABLE:
             messagebox.showwarning("pymongo missing", "pymongo not installed; cannot fetch orders.\nInstall with: pip install pymongo")
             return
-        if not mongo_connected:
+        if not db.mongo_connected:
             messagebox.showwarning("DB", "Not connected to MongoDB; cannot fetch orders.")
             return
 
-        orders = fetch_orders_from_mongo(limit=500)
         win = tk.Toplevel(self)
         win.title("Old Orders - Cafe Aura")
         win.geometry("900x520")
 
+        # Search bar: filters are pushed down to MongoDB, not applied to loaded rows.
+        search = ttk.Frame(win, padding=(8, 8, 8, 0))
+        search.pack(fill=tk.X)
+        filter_vars = {}
+        for col, (key, label, width) in enumerate([("name", "Customer", 16), ("phone", "Phone", 12),
+                                                   ("date_from", "From (DD-MM-YYYY)", 11), ("date_to", "To", 11),
+                                                   ("min_total", "Min Total", 8), ("max_total", "Max Total", 8)]):
+            ttk.Label(search, text=label).grid(row=0, column=col * 2, sticky="e", padx=(6, 2))
+            filter_vars[key] = tk.StringVar()
+            ttk.Entry(search, textvariable=filter_vars[key], width=width).grid(row=0, column=col * 2 + 1)
+        ttk.Button(search, text="Clear", command=lambda: [v.set("") for v in filter_vars.values()]).grid(row=0, column=12, padx=6)
+        ttk.Button(search, text="Export...", command=lambda: self._export_orders(state["query"])).grid(row=0, column=13)
+        status = ttk.Label(win, text="Loading...", padding=(8, 4, 8, 0))
+        status.pack(fill=tk.X)
+
         frame = ttk.Frame(win, padding=8)
         frame.pack(fill=tk.BOTH, expand=True)
 
@@ -478,34 +937,115 @@ class CafeAuraApp(tk.Tk):
         tree.heading("phone", text="Phone")
         tree.heading("grand_total", text=f"Total ({CURRENCY})")
 
-        tree.column("order_id", width=120)
+        tree.column("order_id", width=150)
         tree.column("datetime", width=180)
         tree.column("customer_name", width=180)
         tree.column("phone", width=120)
         tree.column("grand_total", width=100, anchor="e")
 
         vsb = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=vsb.set)
         vsb.pack(side="right", fill="y")
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # Insert rows
-        for o in orders:
-            dt_val = o.get("datetime")
-            if isinstance(dt_val, dt.datetime):
-                dt_str = dt_val.strftime("%d-%m-%Y %H:%M:%S")
-            else:
-                dt_str = str(dt_val)
-            tree.insert("", "end", values=(o.get("order_id", "-"), dt_str, o.get("customer_name", "-"), o.get("phone", "-"), f"{o.get('grand_total', 0):.2f}"))
+        # Rows are fetched a page at a time, off the Tk thread, as the user nears the bottom;
+        # past the hot orders the pages continue into the archive tier (archive.py).
+        # "generation" bumps on every new search so pages from a stale query are dropped.
+        state = {"after": None, "loading": False, "done": False, "query": {}, "generation": 0, "debounce": None}
+        order_ids = {}  # tree iid -> order_id (Treeview values coerce digit-only ids to int)
+
+        def load_more():
+            if state["loading"] or state["done"]:
+                return
+            state["loading"] = True
+            after, query, generation = state["after"], state["query"], state["generation"]
+            self._run_async(lambda: fetch_history_page(after, query=query), lambda result: on_page(generation, result),
+                            lambda e: on_failed(generation, e))
+
+        def on_failed(generation, error):
+            if not tree.winfo_exists() or generation != state["generation"]:
+                return
+            state["loading"] = False  # scrolling tries again
+            status.config(text=f"Could not load orders: {error}")
+
+        def on_page(generation, result):
+            if not tree.winfo_exists() or generation != state["generation"]:
+                return
+            docs, next_after = result
+            for o in docs:
+                if tree.exists(str(o["_id"])):
+                    continue  # seen in both tiers while an archive run was moving it
+                order_ids[str(o["_id"])] = o.get("order_id")
+                tree.insert("", "end", iid=str(o["_id"]),
+                            values=(o.get("order_id", "-"), format_dt(o.get("datetime")), o.get("customer_name", "-"),
+                                    o.get("phone", "-"), f"{o.get('grand_total', 0):.2f}"))
+            state["after"] = next_after
+            state["done"] = next_after is None
+            state["loading"] = False
+            count = len(tree.get_children())
+            status.config(text=f"{count} orders" if state["done"] else f"{count}+ orders (scroll for more)")
+
+        def parse_filters():
+            raw = {k: v.get().strip() for k, v in filter_vars.items()}
+            filters = {"name": raw["name"], "phone": raw["phone"]}
+            for key in ("date_from", "date_to"):
+                if raw[key]:
+                    filters[key] = dt.datetime.strptime(raw[key], "%d-%m-%Y").date()
+            for key in ("min_total", "max_total"):
+                if raw[key]:
+                    filters[key] = float(raw[key])
+            return filters
+
+        def apply_filters():
+            state["debounce"] = None
+            try:
+                query = build_order_query(**parse_filters())
+            except ValueError:
+                status.config(text="Dates must be DD-MM-YYYY and totals numbers.")
+                return
+            state.update(after=None, loading=False, done=False, query=query, generation=state["generation"] + 1)
+            order_ids.clear()
+            tree.delete(*tree.get_children())
+            status.config(text="Searching...")
+            load_more()
+
+        def on_filter_change(*_):
+            if state["debounce"] is not None:
+                win.after_cancel(state["debounce"])
+            state["debounce"] = win.after(SEARCH_DEBOUNCE_MS, apply_filters)
+
+        for var in filter_vars.values():
+            var.trace_add("write", on_filter_change)
+
+        def on_scroll(first, last):
+            vsb.set(first, last)
+            if float(last) > 0.9:
+                load_more()
+
+        tree.configure(yscrollcommand=on_scroll)
+        load_more()
+
+        # Orders placed on any till appear at the top as they happen (unfiltered view only).
+        def on_event(event):
+            if event["type"] != ORDER_CREATED or state["query"] or not tree.winfo_exists():
+                return
+            iid = f"live:{event['order_id']}"
+            if tree.exists(iid):
+                return
+            order_ids[iid] = event["order_id"]
+            when = dt.datetime.fromisoformat(event["datetime"]) if event.get("datetime") else None
+            tree.insert("", 0, iid=iid, values=(event["order_id"], format_dt(when), event["customer_name"],
+                                                event["phone"], f"{event['grand_total']:.2f}"))
+
+        self._listen(win, on_event)
 
         # Double-click to view details
         def on_double(ev):
             sel = tree.selection()
             if not sel: return
-            item = tree.item(sel[0])["values"]
-            order_id = item[0]
-            # fetch full order doc
-            doc = mongo_collection.find_one({"order_id": order_id})
+            order_id = order_ids.get(sel[0])
+            self._run_async(lambda: fetch_order(order_id), on_details)
+
+        def on_details(doc):
             if doc:
                 self._show_order_details(doc)
             else:
@@ -513,73 +1053,282 @@ class CafeAuraApp(tk.Tk):
 
         tree.bind("<Double-1>", on_double)
 
-    def _show_order_details(self, doc):
+    def _export_orders(self, query):
+        """Bulk-export the orders matching the viewer's current filters, with a progress bar."""
+        from cafe_aura.export import count_orders, export_orders  # only needed here; keeps startup lean
+
+        out_dir = filedialog.askdirectory(title="Export orders to folder")
+        if not out_dir:
+            return
         win = tk.Toplevel(self)
-        win.title(f"Order {doc.get('order_id', '')}")
-        win.geometry("600x520")
+        win.title("Exporting Orders")
+        win.geometry("380x130")
+        label = ttk.Label(win, text="Counting orders...", padding=8)
+        label.pack(fill=tk.X)
+        bar = ttk.Progressbar(win, mode="determinate", length=340)
+        bar.pack(padx=8)
+
+        # Written by the export thread, read by tick(); plain ints/bools are safe to share.
+        progress = {"total": 0, "done": 0, "cancel": False, "finished": False}
+        cancel = lambda: progress.update(cancel=True)
+        ttk.Button(win, text="Cancel", command=cancel).pack(pady=8)
+        win.protocol("WM_DELETE_WINDOW", lambda: [cancel(), win.destroy()])
+
+        def work():
+            try:
+                progress["total"] = count_orders(query)
+                return export_orders(out_dir, query, progress=lambda n: progress.update(done=n),
+                                     cancelled=lambda: progress["cancel"])
+            except Exception as e:
+                return e
+
+        def tick():
+            if progress["finished"] or not win.winfo_exists():
+                return
+            if progress["total"]:
+                bar.config(maximum=progress["total"], value=progress["done"])
+                label.config(text=f"Exported {progress['done']} of {progress['total']} orders...")
+            win.after(100, tick)
+
+        def finished(result):
+            progress["finished"] = True
+            if win.winfo_exists():
+                win.destroy()
+            if isinstance(result, Exception):
+                messagebox.showerror("Export", f"Export failed.\n{result}")
+            elif result["cancelled"]:
+                messagebox.showinfo("Export", f"Export cancelled after {result['count']} orders; "
+                                              "the partial files were deleted.")
+            else:
+                messagebox.showinfo("Export", f"Exported {result['count']} orders to:\n" + "\n".join(result["files"]))
 
-        txt = tk.Text(win, wrap="word", font=("Consolas", 11))
+        self._run_async(work, finished)
+        tick()
+
+    # ---------- Reports ----------
+    def view_kitchen(self):
+        win = tk.Toplevel(self)
+        win.title("Kitchen Display - Cafe Aura")
+        win.geometry("900x560")
+        KitchenDisplay(win, self.order_service.set_status).pack(fill=tk.BOTH, expand=True)
+
+    def view_reports(self):
+        if not PYMONGO_AVAILABLE or not db.mongo_connected:
+            messagebox.showwarning("DB", "Not connected to MongoDB; reports are unavailable.")
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Sales Reports - Cafe Aura")
+        win.geometry("640x620")
+
+        bar = ttk.Frame(win, padding=8)
+        bar.pack(fill=tk.X)
+        ttk.Label(bar, text="Date (DD-MM-YYYY):").pack(side=tk.LEFT)
+        day_var = tk.StringVar(value=dt.date.today().strftime("%d-%m-%Y"))
+        ttk.Entry(bar, textvariable=day_var, width=12).pack(side=tk.LEFT, padx=4)
+
+        txt = tk.Text(win, wrap="none", font=("Consolas", 11))
+        txt.pack(fill=tk.BOTH, expand=True)
+
+        def show(text):
+            if not txt.winfo_exists():
+                return
+            txt.config(state="normal")
+            txt.delete("1.0", tk.END)
+            txt.insert("1.0", text)
+            txt.config(state="disabled")
+
+        def selected_day():
+            try:
+                return dt.datetime.strptime(day_var.get().strip(), "%d-%m-%Y").date()
+            except ValueError:
+                show("Enter the date as DD-MM-YYYY.")
+                return None
+
+        def load():
+            day = selected_day()
+            if day is None:
+                return
+            show("Loading...")
+            self._run_async(lambda: fetch_daily_report(day),
+                            lambda report: show(self._build_report_text(day, report)))
+
+        def rebuild():
+            day = selected_day()
+            if day is None:
+                return
+            show("Rebuilding rollups from orders...")
+            self._run_async(lambda: rebuild_rollups(day, day, self.catalog), lambda _: load(), rebuild_failed)
+
+        def rebuild_failed(error):
+            if not isinstance(error, ValueError):  # ValueError: the day is archived
+                db.record_error(error)
+            show(f"Rebuild failed: {error}")
+            messagebox.showerror("Rebuild", f"Could not rebuild rollups.\n{error}", parent=win)
+
+        ttk.Button(bar, text="Load", command=load).pack(side=tk.LEFT, padx=4)
+        ttk.Button(bar, text="Rebuild from Orders", command=rebuild).pack(side=tk.LEFT, padx=4)
+        load()
+
+    def _build_report_text(self, day, report):
+        if report is None:
+            return "Could not load report (database unavailable)."
+        totals = report["day"]
+        if not totals:
+            return f"No sales recorded for {day:%d-%m-%Y}.\nUse 'Rebuild from Orders' if orders exist for this day."
         lines = []
         lines.append("*" * 54)
-        lines.append(f"\t\t{RESTAURANT_NAME.upper()}")
+        lines.append(f"\t{RESTAURANT_NAME.upper()} - SALES REPORT")
+        lines.append(f"\t\t{day:%d-%m-%Y}")
         lines.append("*" * 54)
-        lines.append(f"Order ID : {doc.get('order_id', '-')}")
-        dt_val = doc.get("datetime")
-        if isinstance(dt_val, dt.datetime):
-            lines.append(f"Date/Time: {dt_val.strftime('%d-%m-%Y %H:%M:%S')}")
-        else:
-            lines.append(f"Date/Time: {dt_val}")
-        lines.append(f"Customer : {doc.get('customer_name', '-')}")
-        lines.append(f"Phone    : {doc.get('phone', '-')}")
+        lines.append(f"Orders     : {totals['orders']}")
+        lines.append(f"Subtotal   : {CURRENCY} {totals['subtotal']:.2f}")
+        lines.append(f"Discounts  : {CURRENCY} {totals['discount']:.2f}")
+        lines.append(f"SGST       : {CURRENCY} {totals['sgst']:.2f}")
+        lines.append(f"CGST       : {CURRENCY} {totals['cgst']:.2f}")
+        lines.append(f"Revenue    : {CURRENCY} {totals['grand_total']:.2f}")
         lines.append("-" * 54)
-        lines.append(f"{'Item':28} {'Qty':>3} {'Price':>8} {'Total':>10}")
+        lines.append(f"{'Hour':12} {'Orders':>8} {'Revenue':>14}")
+        for hour in report["hours"]:
+            lines.append(f"{hour['start']:%H:00-%H:59}  {hour['orders']:>8} {hour['grand_total']:>14.2f}")
         lines.append("-" * 54)
-        for item in doc.get("items", []):
-            total = item.get("qty", 0) * item.get("price", 0)
-            name = item.get("name", "")
-            name_short = (name[:25] + '...') if len(name) > 28 else name
-            lines.append(f"{name_short:28} {item.get('qty',0):>3} {item.get('price',0):>8.2f} {total:>10.2f}")
+        lines.append("Top Items")
+        top = sorted(totals.get("items", {}).items(), key=lambda kv: kv[1]["qty"], reverse=True)[:10]
+        for name, stats in top:
+            lines.append(f"{name:28} {stats['qty']:>5} {stats['amount']:>14.2f}")
         lines.append("-" * 54)
-        lines.append(f"Subtotal: {CURRENCY} {doc.get('subtotal', 0):.2f}")
-        lines.append(f"SGST (9%): {CURRENCY} {doc.get('sgst', 0):.2f}")
-        lines.append(f"CGST (9%): {CURRENCY} {doc.get('cgst', 0):.2f}")
-        lines.append("=" * 54)
-        lines.append(f"Grand Total: {CURRENCY} {doc.get('grand_total', 0):.2f}")
+        lines.append("Category Mix")
+        categories = totals.get("categories", {})
+        cat_total = sum(c["amount"] for c in categories.values()) or 1
+        for name, stats in sorted(categories.items(), key=lambda kv: kv[1]["amount"], reverse=True):
+            lines.append(f"{name:20} {stats['qty']:>5} {stats['amount']:>14.2f} {stats['amount'] * 100 / cat_total:>6.1f}%")
         lines.append("=" * 54)
-        txt.insert("1.0", "\n".join(lines))
-        txt.config(state="disabled")
-        txt.pack(fill=tk.BOTH, expand=True)
+        return "\n".join(lines)
 
-    def _new_order_id(self):
-        return uuid.uuid4().hex[:8].upper()
+    def _show_order_details(self, doc):
+        self._show_receipt_window(Order.from_doc(doc), reprint=True)
+
+# ---------------------------- KITCHEN DISPLAY ---------------------------- #
+class KitchenDisplay(ttk.Frame):
+    """Open tickets from every till, pushed by the order event stream.
+
+    Has its own subscriber (replaying recent events, so a display opened mid-service
+    shows what is already cooking). "Mark Ready" calls ``set_status(order_id, "ready")``,
+    which tells every till and clears the ticket on every display.
+    """
+
+    WARN_AFTER = 10 * 60  # seconds; older tickets are highlighted
+
+    def __init__(self, master, set_status):
+        super().__init__(master, padding=8)
+        self.set_status = set_status
+        self.tickets = {}  # order_id -> (event, received at)
+        self.done = set()  # bumped order IDs, so a late or replayed update cannot reopen them
+        self.subscriber = make_subscriber()
+        self.subscriber.start()
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X)
+        self.status = ttk.Label(bar, text="Connecting...", foreground="gray")
+        self.status.pack(side=tk.LEFT)
+        ttk.Button(bar, text="Mark Ready", command=self.mark_ready).pack(side=tk.RIGHT)
+
+        cols = ("order_id", "age", "terminal", "customer", "items")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for col, text, width in (("order_id", "Order", 110), ("age", "Age", 70), ("terminal", "Till", 100),
+                                 ("customer", "Customer", 140), ("items", "Items", 460)):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width)
+        self.tree.tag_configure("late", foreground="red")
+        self.tree.pack(fill=tk.BOTH, expand=True, pady=(6, 0))
+        self.tree.bind("<Double-1>", lambda e: self.mark_ready())
+        self.bind("<Destroy>", self._on_destroy)
+
+        self._jobs = {}  # "poll"/"tick" -> pending after() id, cancelled on <Destroy>
+        self._poll()
+        self._tick()
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return  # <Destroy> also fires for each child widget
+        for job in self._jobs.values():
+            self.after_cancel(job)
+        self._jobs.clear()
+        self.subscriber.stop()
+
+    def _poll(self):
+        try:
+            while True:
+                self._apply(self.subscriber.results.get_nowait())
+        except queue.Empty:
+            pass
+        self._jobs["poll"] = self.after(100, self._poll)
+
+    def _apply(self, event):
+        if event["type"] == "connection":
+            self.status.config(text="Live" if event["connected"] else "Reconnecting...",
+                               foreground="green" if event["connected"] else "red")
+        elif event["type"] in (ORDER_CREATED, ORDER_UPDATED) and event["order_id"] not in self.tickets \
+                and event["order_id"] not in self.done:
+            self.tickets[event["order_id"]] = (event, time.monotonic())
+            items = ", ".join(f"{i['qty']} x {i['name']}" for i in event["items"])
+            self.tree.insert("", "end", iid=event["order_id"],
+                             values=(event["order_id"], "0:00", event["terminal"], event["customer_name"], items))
+        elif event["type"] == ORDER_STATUS and event["status"] == "ready":
+            self.done.add(event["order_id"])
+            if self.tickets.pop(event["order_id"], None) is not None:
+                self.tree.delete(event["order_id"])
+
+    def _tick(self):
+        now = time.monotonic()
+        for order_id, (_, received) in self.tickets.items():
+            age = int(now - received)
+            self.tree.set(order_id, "age", f"{age // 60}:{age % 60:02d}")
+            self.tree.item(order_id, tags=("late",) if age > self.WARN_AFTER else ())
+        self._jobs["tick"] = self.after(1000, self._tick)
+
+    def mark_ready(self):
+        for order_id in self.tree.selection():
+            self.set_status(order_id, "ready")
 
 # ---------------------------- RUN ---------------------------- #
-if __name__ == "__main__":
-    # Optional: nicer ttk defaults
+def apply_style(root):
+    """Optional: nicer ttk defaults. Needs the real root: styles belong to its Tcl
+    interpreter, and ttk.Style() without one would create an extra, empty Tk window."""
     try:
         from tkinter import font
-        style = ttk.Style()
+        style = ttk.Style(root)
         if "vista" in style.theme_names():
             style.theme_use("vista")
         elif "clam" in style.theme_names():
             style.theme_use("clam")
         style.configure("Treeview", rowheight=26)
-        default_font = font.nametofont("TkDefaultFont")
+        default_font = font.nametofont("TkDefaultFont", root)
         default_font.configure(size=10)
     except Exception:
         pass
 
-    # Early warnings about pymongo / DB connection
-    if not PYMONGO_AVAILABLE:
-        root_warn = tk.Tk()
-        root_warn.withdraw()
-        messagebox.showwarning("pymongo missing", "pymongo not installed. Orders will not be saved to MongoDB.\nInstall with: pip install pymongo")
-        root_warn.destroy()
-    elif not mongo_connected:
-        root_warn = tk.Tk()
-        root_warn.withdraw()
-        messagebox.showwarning("DB Conn", f"Could not connect to MongoDB at {MONGO_URI}. Orders will not be saved until connection is available.")
-        root_warn.destroy()
-
-    app = CafeAuraApp()
+if __name__ == "__main__":
+    startup = PhaseTimer("startup", _STARTED)
+    startup.mark("imports")
+
+    if "--kitchen" in sys.argv[1:]:
+        # Stand-alone kitchen screen: no till, just the live ticket feed.
+        root = tk.Tk()
+        apply_style(root)
+        root.title(f"{RESTAURANT_NAME} - Kitchen Display")
+        root.geometry("900x560")
+        publisher = EventPublisher()
+        publisher.start()
+        KitchenDisplay(root, lambda order_id, status: publisher.publish(status_event(order_id, status))).pack(fill=tk.BOTH, expand=True)
+        root.mainloop()
+        publisher.stop()
+        sys.exit()
+
+    warning = terminal_number_warning()
+    if warning:
+        print(warning, file=sys.stderr)
+    # A missing pymongo or unreachable DB is shown in the header; nothing blocks startup.
+    # --startup-timing prints where startup time went and exits once the screen is up.
+    app = CafeAuraApp(startup, exit_after_startup="--startup-timing" in sys.argv[1:])
     app.mainloop()
@@ -0,0 +1,4 @@
+"""Café Aura POS core: cart, tax and order logic usable without a display."""
+from .core import Cart, Order, new_order_id
+from .pricing import TaxPolicy, from_paise, to_paise
+from .service import OrderService
@@ -0,0 +1,199 @@
+"""Command line entry point: ``python -m cafe_aura serve|export|broker|migrate-ids|rebuild-customers|archive|stock``."""
+import argparse
+import asyncio
+import datetime as dt
+import queue
+import sys
+import threading
+
+from . import db
+from .catalog import MenuWatcher, load_catalog
+from .config import LOCAL_DB_PATH, EVENT_BROKER_HOST, EVENT_BROKER_PORT, RETENTION_DAYS, STOCK_LOW_THRESHOLD, TERMINAL_ID
+from .events import STOCK_UPDATED, EventPublisher, make_subscriber, stock_event
+from .ids import terminal_number_warning
+from .inventory import StockLevels, StockMonitor
+from .service import OrderService
+from .store import LocalOrderStore, OrderSync
+
+def cmd_serve(args):
+    from .server import serve
+
+    warning = terminal_number_warning()
+    if warning:
+        print(warning, file=sys.stderr)
+    store = LocalOrderStore(args.db)
+    events = EventPublisher()
+    sync = OrderSync(store, events)
+    stock = StockLevels()
+    monitor = StockMonitor(stock, store)
+    subscriber = make_subscriber(replay=False)
+    db.start_health_monitor()  # connects to MongoDB in the background
+    sync.start()
+    events.start()
+    monitor.start()
+    subscriber.start()
+    threading.Thread(target=_wake_on_stock_events, args=(subscriber, monitor), name="stock-events", daemon=True).start()
+    service = OrderService(store, sync, catalog=load_catalog(), events=events, stock=stock)
+    MenuWatcher(service.catalog, on_reload=lambda catalog, _: setattr(service, "catalog", catalog)).start()
+    print(f"Serving Café Aura order API on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.stop()
+        monitor.stop()
+        events.stop()
+        sync.stop()
+
+def _wake_on_stock_events(subscriber, monitor):
+    # the API server has no Tk loop to drain the subscriber, so a thread does it
+    while subscriber.is_alive() or not subscriber.results.empty():
+        try:
+            event = subscriber.results.get(timeout=1)
+        except queue.Empty:
+            continue
+        if event["type"] == STOCK_UPDATED and event["terminal"] != TERMINAL_ID:
+            monitor.wake()
+
+def cmd_broker(args):
+    from .broker import serve_broker
+
+    print(f"Order event broker listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(serve_broker(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+def cmd_export(args):
+    from .export import export_orders, count_orders
+
+    if not db.connect_mongo():
+        sys.exit(f"Could not connect to MongoDB: {db.mongo_stats['last_error']}")
+    query = db.build_order_query(date_from=args.date_from, date_to=args.date_to)
+    total = count_orders(query)
+
+    def progress(done):
+        print(f"\rExported {done}/{total} orders", end="", file=sys.stderr, flush=True)
+
+    result = export_orders(args.out, query, progress=progress)
+    print(file=sys.stderr)
+    for path in result["files"]:
+        print(path)
+
+def cmd_migrate_ids(args):
+    if not db.connect_mongo():
+        sys.exit(f"Could not connect to MongoDB: {db.mongo_stats['last_error']}")
+    stats = db.migrate_order_ids(reissue=args.reissue,
+                                 progress=lambda n: print(f"\rReissued {n} IDs", end="", file=sys.stderr, flush=True))
+    print(f"Fixed {stats['duplicates']} duplicate IDs, reissued {stats['reissued']}; order_id is now unique.")
+
+def cmd_rebuild_customers(args):
+    from .customers import rebuild_customers
+
+    if not db.connect_mongo():
+        sys.exit(f"Could not connect to MongoDB: {db.mongo_stats['last_error']}")
+    count = rebuild_customers(progress=lambda n: print(f"\rScanned {n} orders", end="", file=sys.stderr, flush=True))
+    print(f"\nWrote {count} customers.")
+
+def cmd_archive(args):
+    from .archive import archive_orders, compact, retention_cutoff
+
+    if not db.connect_mongo():
+        sys.exit(f"Could not connect to MongoDB: {db.mongo_stats['last_error']}")
+    before = dt.datetime.combine(args.before, dt.time.min) if args.before else retention_cutoff(args.days)
+    result = archive_orders(before, files_dir=args.files,
+                            progress=lambda n: print(f"\rArchived {n} orders", end="", file=sys.stderr, flush=True))
+    print(f"\nMoved {result['count']} orders dated before {before:%Y-%m-%d} to the archive.")
+    for path in result["files"]:
+        print(path)
+    if args.compact:
+        compact()
+        print("Compacted the orders collection.")
+
+def cmd_stock(args):
+    from .inventory import OUT, fetch_stock, restock, set_stock, sku_state
+
+    if not db.connect_mongo():
+        sys.exit(f"Could not connect to MongoDB: {db.mongo_stats['last_error']}")
+    for sku, qty in args.add:
+        restock(sku, qty)
+    for sku, qty in args.set:
+        set_stock(sku, stock=qty)
+    for sku, qty in args.low:
+        set_stock(sku, low=qty)
+    changed = {sku for sku, _ in args.add + args.set + args.low}
+    if changed:
+        # tell the tills now rather than at their next fallback refresh
+        events = EventPublisher()
+        events.start()
+        events.publish(stock_event(changed))
+        events.stop(flush=True)
+        events.join(3)  # give up quietly if the broker is down: tills still refresh on their own
+    skus = fetch_stock()
+    if skus is None:
+        sys.exit(f"Could not read stock: {db.mongo_stats['last_error']}")
+    for sku, doc in sorted(skus.items()):
+        low = doc.get("low", STOCK_LOW_THRESHOLD)
+        # the same rule as the till's menu flags (one unit per portion)
+        state = sku_state(doc)
+        flag = "OUT" if state == OUT else state or ""
+        print(f"{sku:<24}{doc.get('stock', 0):>10g}{low:>8g}  {flag}")
+
+def _sku_qty(value):
+    sku, sep, qty = value.partition("=")
+    if not sep or not sku:
+        raise argparse.ArgumentTypeError(f"expected SKU=QTY, got {value!r}")
+    return sku, float(qty) if "." in qty else int(qty)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cafe_aura", description="Café Aura POS tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the HTTP order API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--db", default=LOCAL_DB_PATH, help="local SQLite order store")
+    serve.set_defaults(func=cmd_serve)
+
+    broker = sub.add_parser("broker", help="relay live order events between tills and kitchen displays")
+    broker.add_argument("--host", default=EVENT_BROKER_HOST, help="use 0.0.0.0 to accept other machines")
+    broker.add_argument("--port", type=int, default=EVENT_BROKER_PORT)
+    broker.set_defaults(func=cmd_broker)
+
+    iso_date = lambda s: dt.date.fromisoformat(s)
+    export = sub.add_parser("export", help="bulk-export orders to gzip'd JSONL/CSV and a zip of receipts")
+    export.add_argument("--from", dest="date_from", type=iso_date, help="first day (YYYY-MM-DD)")
+    export.add_argument("--to", dest="date_to", type=iso_date, help="last day (YYYY-MM-DD)")
+    export.add_argument("--out", default=".", help="output directory")
+    export.set_defaults(func=cmd_export)
+
+    migrate = sub.add_parser("migrate-ids", help="resolve duplicate legacy order IDs and make order_id unique")
+    migrate.add_argument("--reissue", action="store_true",
+                         help="also give every legacy order a time-ordered ID (old ID kept as legacy_order_id)")
+    migrate.set_defaults(func=cmd_migrate_ids)
+
+    customers = sub.add_parser("rebuild-customers", help="recompute the customer directory from all stored orders")
+    customers.set_defaults(func=cmd_rebuild_customers)
+
+    archive = sub.add_parser("archive", help="move old orders into the compressed archive tier")
+    archive.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep this many days in the orders collection")
+    archive.add_argument("--before", type=iso_date, help="archive orders before this day instead (YYYY-MM-DD)")
+    archive.add_argument("--files", help="also append them to monthly orders-YYYY-MM.jsonl.gz files in this directory")
+    archive.add_argument("--compact", action="store_true", help="compact the orders collection afterwards")
+    archive.set_defaults(func=cmd_archive)
+
+    stock = sub.add_parser("stock", help="show stock levels; restock or stocktake SKUs")
+    stock.add_argument("--add", type=_sku_qty, action="append", default=[], metavar="SKU=QTY",
+                       help="add a delivery to the stock (safe while tills are selling)")
+    stock.add_argument("--set", type=_sku_qty, action="append", default=[], metavar="SKU=QTY",
+                       help="stocktake: overwrite the count")
+    stock.add_argument("--low", type=_sku_qty, action="append", default=[], metavar="SKU=QTY",
+                       help="flag the SKU as low at or below QTY")
+    stock.set_defaults(func=cmd_stock)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
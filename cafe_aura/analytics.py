@@ -0,0 +1,169 @@
+"""Sales analytics: incremental hourly/daily rollups and the reports read from them."""
+import datetime as dt
+from decimal import Decimal
+
+from . import db
+from .archive import newest_archived
+from .catalog import load_catalog
+from .pricing import bill_from_doc, from_paise, line_amount
+
+# Sales are pre-aggregated into one rollup doc per hour and per day, each carrying
+# totals plus per-item and per-category breakdowns, so a day's report reads 25 small
+# docs instead of scanning orders. Amounts are integer paise, so $inc never drifts.
+# Docs look like:
+#   {"_id": "hour:2025-08-16T13", "period": "hour", "start": datetime, "orders": 12,
+#    "subtotal_paise": ..., "discount_paise": ..., "sgst_paise": ..., "cgst_paise": ..., "grand_total_paise": ...,
+#    "items": {"Veg Burger": {"qty": 3, "amount_paise": 29700}}, "categories": {"Burger": {...}}}
+# Item/category amounts are gross (before discounts). Rollups written before paise
+# were used carry rupee floats under the unsuffixed names; reports read either.
+ROLLUP_TOTALS = ("subtotal", "discount", "sgst", "cgst", "grand_total")
+
+def _rollup_key(name):
+    # Mongo field names may not contain "." or start with "$"
+    return name.replace(".", "\uff0e").lstrip("$") or "-"
+
+class _Categories:
+    """Category of an order line. Orders carry each line's category; lines saved before
+    they did are looked up by name in the catalog, loaded only if such a line turns up."""
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+
+    def __call__(self, name, category=None):
+        if category:
+            return category
+        if self.catalog is None:
+            self.catalog = load_catalog()
+        item = self.catalog.by_name.get(name)
+        return item["category"] if item else "Other"
+
+def _rollup_buckets(when):
+    hour = when.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    return [(f"hour:{hour:%Y-%m-%dT%H}", "hour", hour), (f"day:{day:%Y-%m-%d}", "day", day)]
+
+def update_rollups(order_docs, catalog=None):
+    """Increment the hourly/daily rollups for newly stored orders in one bulk_write.
+
+    ``catalog`` (default: the menu file) names the category of lines stored without
+    one. A failed write is recorded like any other DB error and returns False.
+    """
+    if not order_docs or db.mongo_rollups is None:
+        return False
+    category_of = _Categories(catalog)
+    incs = {}
+    for doc in order_docs:
+        bill = bill_from_doc(doc)
+        for bucket_id, period, start in _rollup_buckets(doc["datetime"]):
+            bucket = incs.setdefault(bucket_id, ({"period": period, "start": start}, {}))[1]
+            bucket["orders"] = bucket.get("orders", 0) + 1
+            for field in ROLLUP_TOTALS:
+                bucket[field + "_paise"] = bucket.get(field + "_paise", 0) + bill[field]
+            for item in doc.get("items", []):
+                amount = line_amount(item)
+                category = category_of(item["name"], item.get("category"))
+                for prefix, key in (("items", item["name"]), ("categories", category)):
+                    path = f"{prefix}.{_rollup_key(key)}"
+                    bucket[path + ".qty"] = bucket.get(path + ".qty", 0) + item["qty"]
+                    bucket[path + ".amount_paise"] = bucket.get(path + ".amount_paise", 0) + amount
+    ops = [db.UpdateOne({"_id": bucket_id}, {"$setOnInsert": fields, "$inc": inc}, upsert=True)
+           for bucket_id, (fields, inc) in incs.items()]
+    try:
+        db.mongo_rollups.bulk_write(ops, ordered=False)
+        return True
+    except Exception as e:
+        db.record_error(e)
+        return False
+
+def rebuild_rollups(day_from, day_to, catalog=None):
+    """Recompute rollups for the days day_from..day_to (inclusive) with aggregation pipelines.
+
+    Used as the catch-up job for orders stored before rollups existed or whose
+    increments were lost; replaces the affected bucket docs wholesale and returns
+    how many were written. ``catalog`` is as for update_rollups. Raises ValueError
+    for a range that reaches into archived days (their orders are no longer in the
+    orders collection, so rebuilding would wipe their rollups); DB errors are raised
+    to the caller.
+    """
+    if db.mongo_collection is None or db.mongo_rollups is None:
+        return 0
+    start = dt.datetime.combine(day_from, dt.time.min)
+    end = dt.datetime.combine(day_to + dt.timedelta(days=1), dt.time.min)
+    newest = newest_archived()
+    if newest is not None and newest >= start:
+        raise ValueError(f"Orders up to {newest:%d-%m-%Y} are archived; "
+                         "their rollups are kept as they are and cannot be rebuilt.")
+    match = {"$match": {"datetime": {"$gte": start, "$lt": end}}}
+    # Same numbers as update_rollups (bill_from_doc / line_amount), in pipeline form.
+    def rupees_to_paise(field):
+        return {"$toLong": {"$round": [{"$multiply": [{"$ifNull": [f"${field}", 0]}, 100]}, 0]}}
+
+    def total_paise(field):
+        return {"$ifNull": [f"$bill.{field}", rupees_to_paise(field) if field != "discount" else 0]}
+
+    category_of = _Categories(catalog)
+    line_paise = {"$multiply": ["$items.qty", {"$ifNull": ["$items.price_paise", rupees_to_paise("items.price")]}]}
+    buckets = {}
+    for period, fmt in (("hour", "%Y-%m-%dT%H"), ("day", "%Y-%m-%d")):
+        key = {"$dateToString": {"format": fmt, "date": "$datetime"}}
+        totals = {field + "_paise": {"$sum": total_paise(field)} for field in ROLLUP_TOTALS}
+        for row in db.mongo_collection.aggregate([match, {"$group": {"_id": key, "orders": {"$sum": 1}, **totals}}]):
+            bucket_start = dt.datetime.strptime(row["_id"], fmt)
+            buckets[f"{period}:{row['_id']}"] = {
+                "period": period, "start": bucket_start, "orders": row["orders"],
+                **{field + "_paise": row[field + "_paise"] for field in ROLLUP_TOTALS}, "items": {}, "categories": {},
+            }
+        item_rows = db.mongo_collection.aggregate([
+            match,
+            {"$unwind": "$items"},
+            {"$group": {"_id": {"bucket": key, "name": "$items.name", "category": "$items.category"},
+                        "qty": {"$sum": "$items.qty"},
+                        "amount_paise": {"$sum": line_paise}}},
+        ])
+        for row in item_rows:
+            bucket = buckets[f"{period}:{row['_id']['bucket']}"]
+            name = row["_id"]["name"]
+            stats = bucket["items"].setdefault(_rollup_key(name), {"qty": 0, "amount_paise": 0})
+            stats["qty"] += row["qty"]
+            stats["amount_paise"] += row["amount_paise"]
+            category = category_of(name, row["_id"].get("category"))
+            cat = bucket["categories"].setdefault(_rollup_key(category), {"qty": 0, "amount_paise": 0})
+            cat["qty"] += row["qty"]
+            cat["amount_paise"] += row["amount_paise"]
+
+    db.mongo_rollups.delete_many({"start": {"$gte": start, "$lt": end}})
+    if buckets:
+        db.mongo_rollups.insert_many([{"_id": bucket_id, **doc} for bucket_id, doc in buckets.items()])
+    return len(buckets)
+
+def _in_rupees(stats, fields):
+    # Decimal rupees under the plain names; a bucket started before the switch to paise
+    # holds a legacy rupee float as well, until it is rebuilt
+    for field in fields:
+        stats[field] = from_paise(stats.get(field + "_paise", 0)) + Decimal(str(stats.get(field, 0)))
+    return stats
+
+def _rollup_in_rupees(doc):
+    _in_rupees(doc, ROLLUP_TOTALS)
+    for breakdown in ("items", "categories"):
+        for stats in doc.get(breakdown, {}).values():
+            _in_rupees(stats, ("amount",))
+    return doc
+
+def fetch_daily_report(day):
+    """Day totals plus its hourly rollups for ``day`` (a date); None if the DB is unavailable.
+
+    Amounts come back as Decimal rupees under the plain field names (subtotal, amount, ...).
+    """
+    if not db.mongo_connected or db.mongo_rollups is None:
+        return None
+    start = dt.datetime.combine(day, dt.time.min)
+    hour_ids = [f"hour:{start + dt.timedelta(hours=h):%Y-%m-%dT%H}" for h in range(24)]
+    try:
+        docs = {d["_id"]: _rollup_in_rupees(d) for d in db.mongo_rollups.find({"_id": {"$in": [f"day:{day:%Y-%m-%d}"] + hour_ids}})}
+    except Exception:
+        return None
+    return {
+        "day": docs.get(f"day:{day:%Y-%m-%d}"),
+        "hours": [docs[h] for h in hour_ids if h in docs],
+    }
@@ -0,0 +1,160 @@
+"""Retention: move old orders out of the hot orders collection into a compressed archive tier.
+
+``python -m cafe_aura archive`` moves orders older than RETENTION_DAYS (whole days) into
+the archive collection, oldest first, in batches. An archived doc keeps only the fields
+the history viewer searches and shows, plus the full order as zlib-compressed BSON:
+    {"_id": ..., "order_id": "...", "datetime": datetime, "customer_name": "...",
+     "customer_name_lc": "...", "phone": "...", "grand_total": 240.0,
+     "archived_at": datetime, "z": b"<zlib(bson(order))>"}
+so the hot collection (and its indexes, and its backups) stays the size of the last few
+months. Optionally each moved order is also appended to a monthly orders-YYYY-MM.jsonl.gz
+file. Rollups and the customer directory are not touched: they already count these orders.
+
+fetch_history_page and fetch_order read the hot tier first and fall through to the
+archive, so the Old Orders viewer and exports span both without knowing about tiers.
+"""
+import datetime as dt
+import gzip
+import json
+import os
+import zlib
+
+from . import db
+from .config import ARCHIVE_BATCH_SIZE, COLLECTION_NAME, HISTORY_PAGE_SIZE, RETENTION_DAYS
+
+SUMMARY_FIELDS = ("order_id", "legacy_order_id", "datetime", "customer_name", "customer_name_lc", "phone", "grand_total")
+
+def retention_cutoff(days=RETENTION_DAYS, today=None):
+    """Midnight ``days`` days ago: orders before it are due for the archive."""
+    today = today or dt.date.today()
+    return dt.datetime.combine(today - dt.timedelta(days=days), dt.time.min)
+
+def _archived_doc(doc, now):
+    import bson  # ships with pymongo
+
+    summary = {field: doc[field] for field in SUMMARY_FIELDS if field in doc}
+    if "customer_name_lc" not in summary:
+        summary["customer_name_lc"] = (doc.get("customer_name") or "").lower()
+    return {**summary, "archived_at": now, "z": zlib.compress(bson.encode(doc))}
+
+def _expand(archived):
+    import bson
+
+    return bson.decode(zlib.decompress(archived["z"]))
+
+def archive_orders(before, files_dir=None, progress=None):
+    """Move every order dated before ``before`` (a datetime) to the archive; returns {"count": n, "files": [...]}.
+
+    Each batch is upserted into the archive with $setOnInsert on _id and only then
+    deleted from the orders collection, so an interrupted run loses nothing and can
+    simply be run again. With ``files_dir`` each batch is first appended to monthly
+    orders-YYYY-MM.jsonl.gz files (a rerun after an interruption may repeat a few lines).
+    ``progress(count)`` is called after every batch.
+    """
+    if not db.mongo_connected or db.mongo_collection is None or db.mongo_archive is None:
+        raise RuntimeError("Not connected to MongoDB.")
+    if files_dir:
+        os.makedirs(files_dir, exist_ok=True)
+    query = {"datetime": {"$lt": before}}
+    count, files = 0, set()
+    while True:
+        batch = list(db.mongo_collection.find(query).sort([("datetime", 1), ("_id", 1)]).limit(ARCHIVE_BATCH_SIZE))
+        if not batch:
+            break
+        if files_dir:
+            files.update(_append_to_files(files_dir, batch))
+        now = dt.datetime.now()
+        db.mongo_archive.bulk_write([db.UpdateOne({"_id": doc["_id"]}, {"$setOnInsert": _archived_doc(doc, now)},
+                                                  upsert=True) for doc in batch], ordered=False)
+        db.mongo_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        count += len(batch)
+        if progress is not None:
+            progress(count)
+    return {"count": count, "files": sorted(files)}
+
+def _append_to_files(files_dir, batch):
+    from .export import _json_default  # export is only needed here; the till imports this module
+
+    by_month = {}
+    for doc in batch:
+        by_month.setdefault(f"{doc['datetime']:%Y-%m}", []).append(doc)
+    paths = []
+    for month, docs in by_month.items():
+        path = os.path.join(files_dir, f"orders-{month}.jsonl.gz")
+        # "a" adds a new gzip member; gzip readers treat the concatenation as one stream
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for doc in docs:
+                doc = {k: v for k, v in doc.items() if k not in ("_id", "customer_name_lc")}
+                f.write(json.dumps(doc, default=_json_default, ensure_ascii=False) + "\n")
+        paths.append(path)
+    return paths
+
+def compact():
+    """Ask MongoDB to give the space freed by archiving back to the OS (blocks the orders collection)."""
+    return db.mongo_collection.database.command({"compact": COLLECTION_NAME})
+
+def newest_archived():
+    """Datetime of the newest archived order, or None if nothing is archived (or there is no
+    archive). A DB error is recorded and re-raised, not taken for an empty archive."""
+    if db.mongo_archive is None:
+        return None
+    try:
+        doc = db.mongo_archive.find_one({}, {"datetime": 1}, sort=[("datetime", -1), ("_id", -1)])
+    except Exception as e:
+        db.record_error(e)
+        raise
+    return doc and doc.get("datetime")
+
+def _needs_archive(query):
+    # only search the archive if it holds something the date range reaches
+    newest = newest_archived()
+    if newest is None:
+        return False
+    date_from = (query or {}).get("datetime", {}).get("$gte")
+    return date_from is None or date_from <= newest
+
+def fetch_history_page(after=None, limit=HISTORY_PAGE_SIZE, query=None):
+    """db.fetch_orders_page over both tiers: hot orders newest first, then archived ones.
+
+    ``after`` is the cursor returned with the previous page (None for the first); the
+    archive is only queried once the hot tier is exhausted and the date range reaches
+    back into it. Returns (docs, next_after) like fetch_orders_page.
+    """
+    tier, keyset = after if after is not None else ("hot", None)
+    docs = []
+    if tier == "hot":
+        docs, keyset = db.fetch_orders_page(keyset, limit, query)
+        if keyset is not None:
+            return docs, ("hot", keyset)
+        if not _needs_archive(query):
+            return docs, None
+        # hot tier exhausted part-way through this page: top it up from the archive
+        limit -= len(docs)
+    more, keyset = db.fetch_orders_page(keyset, limit, query, collection=db.mongo_archive)
+    return docs + more, ("archive", keyset) if keyset is not None else None
+
+def fetch_order(order_id):
+    """Full order document by order_id from whichever tier holds it, or None."""
+    doc = db.fetch_order_from_mongo(order_id)
+    if doc is not None or not db.mongo_connected or db.mongo_archive is None:
+        return doc
+    try:
+        archived = db.mongo_archive.find_one(db._order_id_filter(order_id), {"z": 1})
+    except Exception as e:
+        db.record_error(e)
+        return None
+    return _expand(archived) if archived else None
+
+def count_archived(query=None):
+    return db.mongo_archive.count_documents(query or {})
+
+def iter_archived(query=None):
+    """Full archived orders matching ``query`` (on the summary fields), oldest first."""
+    cursor = (db.mongo_archive.find(query or {}, {"z": 1})
+              .sort([("datetime", 1), ("_id", 1)])
+              .batch_size(ARCHIVE_BATCH_SIZE))
+    try:
+        for archived in cursor:
+            yield _expand(archived)
+    finally:
+        cursor.close()
@@ -0,0 +1,85 @@
+"""The event broker behind ``python -m cafe_aura broker``: relays order events from tills
+to every subscribed till and kitchen display (clients are in events.py).
+
+Kept apart from the clients so a till never imports asyncio just to publish.
+"""
+import asyncio
+import collections
+import json
+import uuid
+
+from .config import EVENT_BROKER_HOST, EVENT_BROKER_PORT, EVENT_QUEUE_SIZE, EVENT_REPLAY_SIZE
+from .events import _line
+
+class EventBroker:
+    """Relays published events to every subscriber, numbering them with a sequence.
+
+    The last EVENT_REPLAY_SIZE events are kept so a subscriber that reconnects with
+    ``since`` gets what it missed. Each subscriber has a bounded queue; one that falls
+    EVENT_QUEUE_SIZE events behind is disconnected (it will reconnect and replay), so
+    a stuck display never holds memory or slows down the others.
+    """
+
+    def __init__(self, replay_size=EVENT_REPLAY_SIZE, queue_size=EVENT_QUEUE_SIZE):
+        self.epoch = uuid.uuid4().hex  # changes on restart, telling subscribers to replay from scratch
+        self.seq = 0
+        self.recent = collections.deque(maxlen=replay_size)
+        self.queue_size = queue_size
+        self.subscribers = set()
+
+    def publish(self, event):
+        self.seq += 1
+        event = {**event, "seq": self.seq}
+        self.recent.append(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.put_nowait(event)
+            except asyncio.QueueFull:
+                # too far behind: its stream loop ends and the client reconnects with ``since``
+                self.subscribers.discard(subscriber)
+                subscriber.lagging = True
+
+    async def handle(self, reader, writer):
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            if hello.get("op") == "publish":
+                async for raw in reader:
+                    self.publish(json.loads(raw))
+            elif hello.get("op") == "subscribe":
+                await self._stream(writer, hello)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, hello):
+        subscriber = asyncio.Queue(self.queue_size)
+        subscriber.lagging = False
+        since = hello.get("since")
+        if since is not None and hello.get("epoch") != self.epoch:
+            since = 0  # numbered by an earlier broker run: replay everything still kept
+        writer.write(_line({"type": "hello", "epoch": self.epoch, "seq": self.seq}))
+        if since is not None:
+            for event in self.recent:
+                if event["seq"] > since:
+                    writer.write(_line(event))
+        self.subscribers.add(subscriber)
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    event = {"type": "ping", "seq": self.seq}  # keeps idle connections honest
+                if subscriber.lagging:
+                    break
+                writer.write(_line(event))
+                await writer.drain()
+        finally:
+            self.subscribers.discard(subscriber)
+
+async def serve_broker(host=EVENT_BROKER_HOST, port=EVENT_BROKER_PORT, broker=None):
+    broker = broker or EventBroker()
+    server = await asyncio.start_server(broker.handle, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,109 @@
+"""Menu catalog: items with stable IDs loaded from menu.json, indexed by ID/category, hot-reloaded."""
+import json
+import os
+import queue
+import re
+import threading
+
+from .config import MENU, MENU_PATH, MENU_POLL_INTERVAL
+from .pricing import compile_offer
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+class Catalog:
+    """Immutable snapshot of the menu. Items are dicts {id, code, name, category, price, available},
+    optionally with a "tax_class"; ``offers`` are discount/combo specs (see pricing.compile_offer)."""
+
+    def __init__(self, items, version=None, offers=()):
+        self.version = version
+        self.offers = list(offers)
+        self.by_id = {}
+        self.by_name = {}
+        self.by_category = {}  # category -> [item], in menu order
+        for item in items:
+            item = {"available": True, **item}
+            if item["id"] in self.by_id:
+                raise ValueError(f"Duplicate menu item id: {item['id']}")
+            self.by_id[item["id"]] = item
+            self.by_name[item["name"]] = item
+            self.by_category.setdefault(item["category"], []).append(item)
+
+    @classmethod
+    def from_menu(cls, menu):
+        """Build a catalog from a {category: [(name, price), ...]} dict.
+
+        IDs are name slugs; quick codes are <category number><position>, e.g. 101.
+        """
+        return cls([{"id": slugify(name), "code": f"{c}{p:02d}", "name": name, "category": category, "price": price}
+                    for c, (category, items) in enumerate(menu.items(), start=1)
+                    for p, (name, price) in enumerate(items, start=1)], version="builtin")
+
+    @classmethod
+    def load(cls, path):
+        """Load a catalog from a JSON file: {"items": [{id, code, name, category, price, available}], "offers": [...]}."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for spec in data.get("offers", ()):
+            compile_offer(spec)  # reject a bad offer here, so the watcher keeps the last good menu
+        return cls(data["items"], version=os.stat(path).st_mtime_ns, offers=data.get("offers", ()))
+
+    def categories(self):
+        return list(self.by_category)
+
+    def items_in(self, category):
+        return self.by_category.get(category, [])
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def to_dict(self):
+        return {"items": list(self.by_id.values()), "offers": self.offers}
+
+    def changed_categories(self, other):
+        """Categories whose items differ between this catalog and ``other``."""
+        def signature(catalog, category):
+            return [tuple(sorted(item.items())) for item in catalog.items_in(category)]
+        return {category for category in set(self.by_category) | set(other.by_category)
+                if signature(self, category) != signature(other, category)}
+
+def load_catalog(path=MENU_PATH):
+    """The catalog from ``path``, or the built-in MENU if that file does not exist."""
+    if os.path.exists(path):
+        return Catalog.load(path)
+    return Catalog.from_menu(MENU)
+
+class MenuWatcher(threading.Thread):
+    """Polls the menu file's mtime and reloads it off the UI thread.
+
+    Each successful reload calls ``on_reload(catalog, changed_categories)`` on this
+    thread if given, otherwise pushes that tuple onto ``results`` for a Tk after()
+    poll. A file that fails to parse (e.g. mid-save) is retried on the next poll.
+    """
+
+    def __init__(self, catalog, path=MENU_PATH, interval=MENU_POLL_INTERVAL, on_reload=None):
+        super().__init__(name="menu-watcher", daemon=True)
+        self.catalog = catalog
+        self.path = path
+        self.interval = interval
+        self.on_reload = on_reload
+        self.results = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if os.stat(self.path).st_mtime_ns == self.catalog.version:
+                    continue
+                catalog = Catalog.load(self.path)
+            except (OSError, ValueError, KeyError):
+                continue
+            changed = catalog.changed_categories(self.catalog)
+            self.catalog = catalog
+            if self.on_reload is not None:
+                self.on_reload(catalog, changed)
+            else:
+                self.results.put((catalog, changed))
@@ -0,0 +1,156 @@
+"""Shop configuration: taxes, currency, database settings and the menu."""
+import os
+import socket
+import zlib
+
+# Tax classes as SGST/CGST percentages (strings, so they stay exact). An item uses its
+# menu.json "tax_class", else its category's class below, else DEFAULT_TAX_CLASS.
+TAX_CLASSES = {
+    "standard": {"sgst": "9", "cgst": "9"},
+    "reduced": {"sgst": "2.5", "cgst": "2.5"},
+    "exempt": {"sgst": "0", "cgst": "0"},
+}
+DEFAULT_TAX_CLASS = "standard"
+CATEGORY_TAX_CLASSES = {}  # e.g. {"Drinks": "reduced"}
+CURRENCY = "₹"
+RESTAURANT_NAME = "Café Aura"
+RECEIPT_WIDTH = 54  # characters per receipt line (use 48 for 80mm ESC/POS printers)
+
+# Replace with your MongoDB URI if using Atlas or remote DB
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "cafe_aura"
+COLLECTION_NAME = "orders"
+
+# Connection pool / timeouts for the shared MongoClient
+MONGO_MAX_POOL_SIZE = 20
+MONGO_MIN_POOL_SIZE = 2
+MONGO_MAX_IDLE_TIME_MS = 60000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 2000
+MONGO_CONNECT_TIMEOUT_MS = 2000
+MONGO_SOCKET_TIMEOUT_MS = 10000
+HEALTH_CHECK_INTERVAL = 10  # seconds between pings while the DB is up
+HEALTH_MAX_BACKOFF = 60  # cap on the retry delay while it is down
+HISTORY_PAGE_SIZE = 100  # rows fetched per page in the Old Orders viewer
+SEARCH_DEBOUNCE_MS = 300  # wait this long after the last keystroke before querying
+ROLLUP_COLLECTION_NAME = "sales_rollups"  # pre-aggregated hourly/daily sales for Reports
+CUSTOMER_COLLECTION_NAME = "customers"  # one doc per phone number, see customers.py
+# Retention: `python -m cafe_aura archive` moves orders older than RETENTION_DAYS into
+# a compressed archive collection (see archive.py); history search spans both.
+ARCHIVE_COLLECTION_NAME = "orders_archive"
+RETENTION_DAYS = 180
+ARCHIVE_BATCH_SIZE = 1000  # orders moved per round-trip
+# Inventory (see inventory.py): one doc per SKU, decremented as orders sync
+INVENTORY_COLLECTION_NAME = "inventory"
+STOCK_LOW_THRESHOLD = 5  # "low" for SKUs whose doc sets no threshold of its own
+# Tills refresh stock when a "stock.updated" event arrives (see events.py); this is only
+# the fallback for missed events (broker down, or EVENT_SOURCE = "mongo")
+STOCK_POLL_INTERVAL = 120  # seconds
+CUSTOMER_CACHE_SIZE = 500  # customers each till keeps in memory for autocomplete
+
+# Local order store (SQLite, WAL): checkout writes here first, a background
+# sync engine streams unsynced orders to MongoDB whenever it is reachable.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_DB_PATH = os.path.join(BASE_DIR, "cafe_aura_local.db")
+CART_JOURNAL_PATH = os.path.join(BASE_DIR, "cafe_aura_cart.journal")  # open cart, for crash recovery
+SYNC_BATCH_SIZE = 50
+SYNC_IDLE_INTERVAL = 5  # seconds between reconnect/sync checks when idle
+SYNC_MAX_BACKOFF = 30  # seconds
+
+# ESC/POS receipt printer: a device node such as /dev/usb/lp0, or a file that stands in for one
+PRINTER_DEVICE = os.environ.get("CAFE_AURA_PRINTER", os.path.join(BASE_DIR, "receipt_printer.bin"))
+
+# Live order events between tills and the kitchen display: a small TCP broker
+# (`python -m cafe_aura broker`) relays them, or set EVENT_SOURCE = "mongo" to read a
+# MongoDB change stream instead (needs a replica set).
+TERMINAL_ID = os.environ.get("CAFE_AURA_TERMINAL", socket.gethostname())
+# Goes into every order ID (see ids.py). Set CAFE_AURA_TERMINAL_NO to a number 1..65535
+# that no other till uses: only then can IDs never collide. Without it the number is a
+# hash of TERMINAL_ID, which two tills can share, and the till warns at startup.
+# 0 is reserved for IDs reissued by `python -m cafe_aura migrate-ids`.
+TERMINAL_NUMBER_SET = bool(os.environ.get("CAFE_AURA_TERMINAL_NO"))
+TERMINAL_NUMBER = int(os.environ.get("CAFE_AURA_TERMINAL_NO") or zlib.crc32(TERMINAL_ID.encode()) % 65535 + 1)
+EVENT_SOURCE = "broker"
+EVENT_BROKER_HOST = os.environ.get("CAFE_AURA_BROKER_HOST", "127.0.0.1")
+EVENT_BROKER_PORT = 8765
+EVENT_QUEUE_SIZE = 256  # events buffered per publisher/subscriber before dropping
+EVENT_REPLAY_SIZE = 1000  # recent events the broker replays to reconnecting subscribers
+EVENT_RECONNECT_MAX = 10  # cap on the reconnect delay, seconds
+
+# Performance metrics: hot paths are always timed in-process (see metrics.py). With
+# CAFE_AURA_METRICS_DUMP=1 the till rewrites METRICS_DUMP_PATH.json and .prom every
+# METRICS_DUMP_INTERVAL seconds; set CAFE_AURA_PROFILE to "cprofile" or "sampling" to
+# profile the whole session into PROFILE_PATH.* on exit (or toggle it from the F12 overlay).
+METRICS_DUMP_ENABLED = os.environ.get("CAFE_AURA_METRICS_DUMP", "") not in ("", "0")
+METRICS_DUMP_PATH = os.path.join(BASE_DIR, "cafe_aura_metrics")
+METRICS_DUMP_INTERVAL = 15  # seconds
+PROFILE_MODE = os.environ.get("CAFE_AURA_PROFILE") or None
+PROFILE_PATH = os.path.join(BASE_DIR, "cafe_aura_profile")
+
+# Menu catalog: menu.json is the source of truth and is hot-reloaded when it changes.
+# MENU below is the built-in fallback used when that file is missing.
+MENU_PATH = os.path.join(BASE_DIR, "menu.json")
+MENU_POLL_INTERVAL = 2  # seconds between menu.json mtime checks
+
+# Extended Menu
+MENU = {
+    "Pizza": [
+        ("Volcano Pizza", 200),
+        ("Corn Pizza", 150),
+        ("Onion Pizza", 180),
+        ("Cheese Pizza", 250),
+        ("Veg Pizza", 120),
+    ],
+    "Maggie": [
+        ("Masala Maggie", 50),
+        ("Cheese Maggie", 70),
+        ("Veg Maggie", 60),
+        ("Special Maggie", 80),
+        ("Spicy Maggie", 90),
+    ],
+    "Burger": [
+        ("Veg Burger", 99),
+        ("Cheese Burger", 220),
+        ("Chicken Burger", 250),
+        ("Spicy Burger", 180),
+        ("Double Cheese Burger", 300),
+    ],
+    "Sandwich": [
+        ("Veg Sandwich", 120),
+        ("Cheese Sandwich", 199),
+        ("Grilled Sandwich", 150),
+        ("Club Sandwich", 180),
+        ("Special Sandwich", 250),
+    ],
+    "Drinks": [
+        ("Cold Coffee", 120),
+        ("Masala Chaas", 60),
+        ("Fresh Lime Soda", 80),
+        ("Iced Tea", 110),
+        ("Mineral Water", 30),
+    ],
+    "Desserts": [
+        ("Brownie", 140),
+        ("Gulab Jamun", 90),
+        ("Ice Cream", 100),
+        ("Cheesecake", 220),
+        ("Fruit Salad", 120),
+    ],
+    "Coffee & Shakes": [
+        ("Espresso", 80),
+        ("Cold Coffee (Large)", 160),
+        ("Cappuccino", 130),
+        ("Vanilla Shake", 140),
+        ("Chocolate Shake", 150),
+    ],
+    "Fries & Sides": [
+        ("Classic Fries", 90),
+        ("Cheese Fries", 140),
+        ("Garlic Bread", 80),
+        ("Onion Rings", 100),
+    ],
+    "Pasta": [
+        ("White Sauce Pasta", 180),
+        ("Red Sauce Pasta", 160),
+        ("Pesto Pasta", 200),
+    ],
+}
@@ -0,0 +1,175 @@
+"""Headless POS logic: cart and order/receipt building, with no Tk dependency (money math is in pricing)."""
+import datetime as dt
+
+from .ids import new_order_id
+from .pricing import TaxPolicy, bill_from_doc, compute_bill, from_paise, to_paise
+
+def format_dt(value):
+    if isinstance(value, dt.datetime):
+        return value.strftime("%d-%m-%Y %H:%M:%S")
+    return str(value)
+
+class Cart:
+    """Line items of an order in progress, indexed by catalog item ID with running totals.
+
+    Each line is a dict {item_id, name, category, price, qty, price_paise, tax_class};
+    the item ID doubles as the line ID, so UIs can use it as a row key. add/remove keep
+    per-tax-class gross totals in paise, so bill() only redoes tax per class plus the
+    offers that mention an item in the cart, and is cached until the next change.
+    """
+
+    def __init__(self, tax=None, table=None):
+        self.tax = tax or TaxPolicy()
+        self.table = table  # PriceTable of the catalog the items come from, if known
+        self._lines = {}  # line_id -> line, in insertion order
+        self._class_gross = {}  # tax class -> paise
+        self._bill = None
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, line_id):
+        return line_id in self._lines
+
+    @property
+    def lines(self):
+        return list(self._lines.values())
+
+    def line_ids(self):
+        return list(self._lines)
+
+    def get(self, line_id):
+        return self._lines.get(line_id)
+
+    def use_table(self, table):
+        """Switch to a reloaded catalog's price table (its offers apply from now on)."""
+        self.table = table
+        self._bill = None
+
+    def add(self, item, qty):
+        """Add qty of a catalog item, merging with an existing line; returns the line ID.
+
+        A line keeps the price it was first added at, even if the menu is reloaded.
+        """
+        qty = int(qty)
+        if qty < 1:
+            raise ValueError("Minimum quantity is 1.")
+        if not item.get("available", True):
+            raise ValueError(f"{item['name']} is not available.")
+        line_id = item["id"]
+        line = self._lines.get(line_id)
+        if line is None:
+            if self.table is not None:
+                price_paise, tax_class = self.table.row(item)
+            else:
+                price_paise, tax_class = to_paise(item["price"]), self.tax.class_for(item)
+            line = self._lines[line_id] = {"item_id": item["id"], "name": item["name"], "category": item["category"],
+                                           "price": item["price"], "qty": 0,
+                                           "price_paise": price_paise, "tax_class": tax_class}
+        line['qty'] += qty
+        self._add_gross(line, qty)
+        return line_id
+
+    def remove(self, line_id):
+        line = self._lines.pop(line_id, None)
+        if line is not None:
+            self._add_gross(line, -line['qty'])
+
+    def clear(self):
+        self._lines.clear()
+        self._class_gross.clear()
+        self._bill = None
+
+    def _add_gross(self, line, qty):
+        tax_class = line['tax_class']
+        self._class_gross[tax_class] = self._class_gross.get(tax_class, 0) + qty * line['price_paise']
+        self._bill = None
+
+    def subtotal(self):
+        return from_paise(sum(self._class_gross.values()))
+
+    def bill(self):
+        """The bill in paise (see pricing.compute_bill)."""
+        if self._bill is None:
+            offers = self.table.offers_for(self._lines) if self.table is not None else ()
+            self._bill = compute_bill(self.tax, self._class_gross, self._lines, offers)
+        return self._bill
+
+    def totals(self):
+        """Return (subtotal, sgst, cgst, grand_total) as Decimal rupees."""
+        bill = self.bill()
+        return tuple(from_paise(bill[k]) for k in ("subtotal", "sgst", "cgst", "grand_total"))
+
+    def to_dict(self):
+        bill = self.bill()
+        return {"items": [dict(i) for i in self], **_rupee_totals(bill), "bill": bill}
+
+def _rupee_totals(bill):
+    # rupee copies of the paise totals, for display and range queries
+    return {k: float(from_paise(bill[k])) for k in ("subtotal", "discount", "sgst", "cgst", "grand_total")}
+
+class Order:
+    """A placed order: a frozen copy of the cart plus customer details and its bill (paise)."""
+
+    def __init__(self, order_id, when, customer_name, phone, items, bill):
+        self.order_id = order_id
+        self.datetime = when
+        self.customer_name = customer_name
+        self.phone = phone
+        self.items = items
+        self.bill = bill
+
+    @property
+    def subtotal(self):
+        return from_paise(self.bill["subtotal"])
+
+    @property
+    def discount(self):
+        return from_paise(self.bill["discount"])
+
+    @property
+    def sgst(self):
+        return from_paise(self.bill["sgst"])
+
+    @property
+    def cgst(self):
+        return from_paise(self.bill["cgst"])
+
+    @property
+    def grand_total(self):
+        return from_paise(self.bill["grand_total"])
+
+    @classmethod
+    def from_cart(cls, cart, order_id, customer_name="", phone=""):
+        if not len(cart):
+            raise ValueError("Your cart is empty.")
+        if not isinstance(customer_name, str) or not isinstance(phone, str):
+            raise ValueError("Customer name and phone must be text.")
+        return cls(order_id, dt.datetime.now(), customer_name.strip() or "Guest", phone.strip() or "-",
+                   [dict(i) for i in cart], cart.bill())
+
+    @classmethod
+    def from_doc(cls, doc):
+        """Rebuild an Order from a stored document (missing fields fall back to defaults)."""
+        return cls(doc.get("order_id", "-"), doc.get("datetime"), doc.get("customer_name", "-"), doc.get("phone", "-"),
+                   doc.get("items", []), bill_from_doc(doc))
+
+    def to_doc(self):
+        """The MongoDB/local-store document for this order; ``bill`` (paise) is authoritative."""
+        return {
+            "order_id": self.order_id,
+            "datetime": self.datetime,
+            "customer_name": self.customer_name,
+            "phone": self.phone,
+            "customer_name_lc": self.customer_name.lower(),
+            "items": [dict(i) for i in self.items],
+            **_rupee_totals(self.bill),
+            "bill": self.bill,
+        }
+
+    def receipt_text(self):
+        from .receipts import get_renderer  # receipts imports this module
+        return get_renderer().render(self, "text")
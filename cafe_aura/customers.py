@@ -0,0 +1,194 @@
+"""Customer directory: one doc per phone number, kept up to date from placed orders.
+
+The customers collection is maintained by the sync engine next to the sales rollups:
+each newly stored order bumps its customer's visit count and lifetime spend and
+records what they ordered last. Docs look like:
+    {"phone": "9876543210", "name": "Riya Shah", "name_lc": "riya shah", "visits": 12,
+     "spend_paise": 456000, "first_visit": datetime, "last_visit": datetime,
+     "last_order_id": "...", "last_items": [{"item_id": "cold-coffee", "name": "Cold Coffee", "qty": 2}]}
+
+Tills keep the customers they have seen recently in a CustomerCache, so the header
+autocompletes without a round-trip; fetch_customers is the indexed fallback.
+"""
+import collections
+import itertools
+import re
+import threading
+
+from . import db
+from .config import CUSTOMER_CACHE_SIZE
+from .pricing import bill_from_doc
+
+def normalize_phone(phone):
+    """Digits only, without a country code; None for "-", blanks and anything too short to be a number."""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) > 10 and digits.startswith(("91", "0")):
+        digits = digits[-10:]
+    return digits if len(digits) >= 6 else None
+
+def _last_items(order_doc):
+    return [{"item_id": i.get("item_id"), "name": i["name"], "qty": i["qty"]} for i in order_doc.get("items", [])]
+
+def update_customers(order_docs):
+    """Fold newly stored orders into the customers collection in one bulk_write.
+
+    Only call this for orders that were just inserted (as the sync engine does for
+    rollups), so a retried batch never counts a visit twice. Orders without a usable
+    phone number (walk-in guests) are skipped.
+
+    Two tills upserting the same new phone at once can lose the race for the unique
+    index; the loser's update is then retried as a plain update of the doc the winner
+    created, rather than reported as a DB failure.
+    """
+    if not order_docs or db.mongo_customers is None:
+        return False
+    ops = []  # (phone, update, upsert)
+    for doc in order_docs:
+        phone = normalize_phone(doc.get("phone"))
+        if phone is None:
+            continue
+        name = doc.get("customer_name") or "Guest"
+        ops.append((phone, {
+            "$setOnInsert": {"first_visit": doc["datetime"]},
+            "$set": {"name": name, "name_lc": name.lower(), "last_visit": doc["datetime"],
+                     "last_order_id": doc["order_id"], "last_items": _last_items(doc)},
+            "$inc": {"visits": 1, "spend_paise": bill_from_doc(doc)["grand_total"]},
+        }, True))
+    while ops:
+        try:
+            # ordered: two orders from one customer in a batch must apply oldest first
+            db.mongo_customers.bulk_write([db.UpdateOne({"phone": phone}, update, upsert=upsert)
+                                           for phone, update, upsert in ops], ordered=True)
+            return True
+        except db.BulkWriteError as e:
+            # an ordered write stops at its first error: everything before it was applied
+            errors = e.details.get("writeErrors") or [{}]
+            index = errors[0].get("index", 0)
+            if errors[0].get("code") != db.DUPLICATE_KEY or not ops[index][2]:
+                db.record_error(e)
+                return False
+            phone, update, _ = ops[index]
+            ops = [(phone, update, False)] + ops[index + 1:]
+        except Exception as e:
+            db.record_error(e)
+            return False
+    return True
+
+def rebuild_customers(progress=None):
+    """Recompute the customers collection from every stored order (archived ones too); returns how many were written.
+
+    The catch-up job for orders placed before the collection existed. Run it while the
+    tills are idle: visits synced during the rebuild may be counted twice.
+    """
+    if db.mongo_collection is None or db.mongo_customers is None:
+        return 0
+    from .archive import iter_archived
+
+    fields = {"order_id": 1, "datetime": 1, "customer_name": 1, "phone": 1, "items": 1, "bill": 1,
+              "subtotal": 1, "sgst": 1, "cgst": 1, "grand_total": 1, "tax_rates": 1}
+    customers = {}
+    hot = db.mongo_collection.find({}, fields).sort([("datetime", 1), ("_id", 1)])
+    for n, doc in enumerate(itertools.chain(iter_archived(), hot), start=1):  # archived orders are the oldest
+        phone = normalize_phone(doc.get("phone"))
+        if phone is not None:
+            name = doc.get("customer_name") or "Guest"
+            c = customers.setdefault(phone, {"phone": phone, "first_visit": doc["datetime"], "visits": 0, "spend_paise": 0})
+            c.update(name=name, name_lc=name.lower(), last_visit=doc["datetime"], last_order_id=doc["order_id"],
+                     last_items=_last_items(doc))
+            c["visits"] += 1
+            c["spend_paise"] += bill_from_doc(doc)["grand_total"]
+        if progress is not None and n % 10000 == 0:
+            progress(n)
+    ops = [db.UpdateOne({"phone": phone}, {"$set": c}, upsert=True) for phone, c in customers.items()]
+    for start in range(0, len(ops), 1000):
+        db.mongo_customers.bulk_write(ops[start:start + 1000], ordered=False)
+    return len(ops)
+
+CUSTOMER_FIELDS = {"_id": 0, "phone": 1, "name": 1, "visits": 1, "spend_paise": 1, "last_visit": 1,
+                   "last_order_id": 1, "last_items": 1}
+
+def fetch_customers(prefix, limit=8):
+    """Customers whose phone (if ``prefix`` is digits) or name starts with ``prefix``, most visits first.
+
+    Both lookups are index range scans (phone_unique / name_lc). Returns [] if the DB is unavailable.
+    """
+    if not db.mongo_connected or db.mongo_customers is None:
+        return []
+    prefix = prefix.strip()
+    digits = re.sub(r"\D", "", prefix)
+    if digits and len(digits) == len(prefix.replace(" ", "").lstrip("+")):
+        query = {"phone": {"$regex": "^" + digits}}
+    else:
+        query = {"name_lc": {"$regex": "^" + re.escape(prefix.lower())}}
+    try:
+        return list(db.mongo_customers.find(query, CUSTOMER_FIELDS).sort("visits", -1).limit(limit))
+    except Exception as e:
+        db.record_error(e)
+        return []
+
+class CustomerCache:
+    """In-memory LRU of recently seen customers (phone -> record), safe across threads.
+
+    Fed by checkouts (``remember``) and by DB lookups (``add``); ``search`` ranks the
+    matches by visit count, so regulars come first.
+    """
+
+    def __init__(self, size=CUSTOMER_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._records = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, phone):
+        with self._lock:
+            return self._records.get(normalize_phone(phone))
+
+    def _put(self, phone, record):
+        self._records[phone] = record
+        self._records.move_to_end(phone)
+        while len(self._records) > self.size:
+            self._records.popitem(last=False)
+
+    def add(self, record):
+        """Cache a record from the customers collection, unless this till has seen a later visit
+        that has not been synced yet."""
+        with self._lock:
+            cached = self._records.get(record["phone"])
+            if cached is not None and cached.get("last_visit") and record.get("last_visit") \
+                    and cached["last_visit"] > record["last_visit"]:
+                return
+            self._put(record["phone"], dict(record))
+
+    def remember(self, order_doc):
+        """Count a just-placed order, so the customer autocompletes at once (even offline)."""
+        phone = normalize_phone(order_doc.get("phone"))
+        if phone is None:
+            return
+        with self._lock:
+            record = dict(self._records.get(phone) or {"phone": phone, "visits": 0, "spend_paise": 0})
+            record.update(name=order_doc.get("customer_name") or "Guest", last_visit=order_doc["datetime"],
+                          last_order_id=order_doc["order_id"], last_items=_last_items(order_doc),
+                          visits=record["visits"] + 1,
+                          spend_paise=record["spend_paise"] + bill_from_doc(order_doc)["grand_total"])
+            self._put(phone, record)
+
+    def load(self, order_docs):
+        """Warm the cache from local order history (oldest first), e.g. LocalOrderStore.recent()."""
+        for doc in order_docs:
+            self.remember(doc)
+
+    def search(self, prefix, limit=8):
+        """Cached customers whose phone starts with ``prefix`` or any of whose name words does."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        digits = normalize_phone(prefix) or re.sub(r"\D", "", prefix)
+        with self._lock:
+            records = list(self._records.values())
+        hits = [r for r in records
+                if (digits and r["phone"].startswith(digits))
+                or any(word.startswith(prefix) for word in [r["name"].lower()] + r["name"].lower().split())]
+        hits.sort(key=lambda r: -r["visits"])
+        return hits[:limit]
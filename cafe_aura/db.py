@@ -0,0 +1,357 @@
+"""MongoDB access: connection, indexes, order writes and history queries."""
+import datetime as dt
+import importlib.util
+import re
+import threading
+import time
+
+from .config import (MONGO_URI, DB_NAME, COLLECTION_NAME, HISTORY_PAGE_SIZE, ROLLUP_COLLECTION_NAME, CUSTOMER_COLLECTION_NAME,
+                     ARCHIVE_COLLECTION_NAME, INVENTORY_COLLECTION_NAME,
+                     MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+                     MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+                     HEALTH_CHECK_INTERVAL, HEALTH_MAX_BACKOFF)
+from .ids import ALPHABET, ID_LENGTH, OrderIdGenerator, is_legacy_id
+from .metrics import timed
+
+# pymongo is only looked up here; importing it takes longer than building the order
+# screen, so load_pymongo() does that on the health monitor's first connect instead.
+PYMONGO_AVAILABLE = importlib.util.find_spec("pymongo") is not None
+MongoClient = UpdateOne = BulkWriteError = None  # set by load_pymongo()
+DUPLICATE_KEY = 11000  # MongoDB error code for a unique index violation
+
+# Connection state lives at module level; read it as ``db.mongo_connected`` (not via
+# ``from ... import``) so callers see changes made by the health monitor.
+mongo_client = None
+mongo_collection = None
+mongo_rollups = None
+mongo_customers = None
+mongo_archive = None
+mongo_inventory = None
+mongo_connected = False
+order_id_index_unique = None  # False until duplicate legacy IDs are fixed by migrate_order_ids
+
+# Health/latency counters, updated by ping() and record_error(); read-only for callers.
+mongo_stats = {
+    "pings": 0,
+    "ping_failures": 0,
+    "consecutive_failures": 0,
+    "op_errors": 0,
+    "last_latency_ms": None,
+    "avg_latency_ms": None,
+    "last_error": None,
+}
+
+_client_lock = threading.Lock()
+_indexes_ready = False
+_health_monitor = None
+
+def load_pymongo():
+    """Import pymongo (once). Raises ImportError if it is missing or broken."""
+    global MongoClient, UpdateOne, BulkWriteError
+    if MongoClient is None:
+        from pymongo import MongoClient, UpdateOne
+        from pymongo.errors import BulkWriteError
+
+def get_client():
+    """The process-wide pooled MongoClient (created on first use; no network I/O)."""
+    global mongo_client, mongo_collection, mongo_rollups, mongo_customers, mongo_archive, mongo_inventory
+    with _client_lock:
+        if mongo_client is None:
+            load_pymongo()
+            mongo_client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                retryWrites=True,
+                retryReads=True,
+            )
+            database = mongo_client[DB_NAME]
+            mongo_collection = database[COLLECTION_NAME]
+            mongo_rollups = database[ROLLUP_COLLECTION_NAME]
+            mongo_customers = database[CUSTOMER_COLLECTION_NAME]
+            mongo_archive = database[ARCHIVE_COLLECTION_NAME]
+            mongo_inventory = database[INVENTORY_COLLECTION_NAME]
+        return mongo_client
+
+def ping():
+    """Round-trip to the server, updating mongo_connected and mongo_stats. Returns True if up."""
+    global mongo_connected, _indexes_ready
+    if not PYMONGO_AVAILABLE:
+        mongo_stats["last_error"] = "pymongo is not installed"
+        mongo_connected = False
+        return False
+    start = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+        latency = (time.perf_counter() - start) * 1000
+        if not _indexes_ready:
+            ensure_indexes(mongo_collection)
+            ensure_archive_indexes(mongo_archive)
+            mongo_rollups.create_index("start", name="start")  # rebuild_rollups range deletes
+            mongo_customers.create_index("phone", unique=True, name="phone_unique")
+            mongo_customers.create_index([("name_lc", 1), ("visits", -1)], name="name_lc")
+            _indexes_ready = True
+    except Exception as e:
+        mongo_stats["pings"] += 1
+        mongo_stats["ping_failures"] += 1
+        mongo_stats["consecutive_failures"] += 1
+        mongo_stats["last_error"] = str(e)
+        mongo_connected = False
+        return False
+    mongo_stats["pings"] += 1
+    mongo_stats["consecutive_failures"] = 0
+    mongo_stats["last_latency_ms"] = latency
+    avg = mongo_stats["avg_latency_ms"]
+    mongo_stats["avg_latency_ms"] = latency if avg is None else avg * 0.8 + latency * 0.2
+    mongo_connected = True
+    return True
+
+def connect_mongo():
+    """Blocking connection check for scripts/CLI tools; the apps use start_health_monitor()."""
+    return ping()
+
+def record_error(exc):
+    """Note a failed DB operation: mark the DB down and have the monitor re-check right away."""
+    global mongo_connected
+    mongo_stats["op_errors"] += 1
+    mongo_stats["last_error"] = str(exc)
+    mongo_connected = False
+    if _health_monitor is not None:
+        _health_monitor.wake()
+
+class HealthMonitor(threading.Thread):
+    """Pings MongoDB in the background: every HEALTH_CHECK_INTERVAL seconds while up,
+    with exponential backoff (capped at HEALTH_MAX_BACKOFF) while down."""
+
+    def __init__(self):
+        super().__init__(name="mongo-health", daemon=True)
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            if ping():
+                backoff = 1
+                delay = HEALTH_CHECK_INTERVAL
+            else:
+                delay = backoff
+                backoff = min(backoff * 2, HEALTH_MAX_BACKOFF)
+            self._wake.wait(delay)
+            self._wake.clear()
+
+def start_health_monitor():
+    """Start (once) the background monitor that owns connecting/reconnecting. Non-blocking."""
+    global _health_monitor
+    if PYMONGO_AVAILABLE and _health_monitor is None:
+        _health_monitor = HealthMonitor()
+        _health_monitor.start()
+    return _health_monitor
+
+# Newest-first history pages sort on (datetime, _id) and show only these columns; with
+# them all in one index a page is read from the index alone (a covered query), never
+# touching the full documents and their items arrays.
+HISTORY_FIELDS = {"order_id": 1, "datetime": 1, "customer_name": 1, "phone": 1, "grand_total": 1}
+HISTORY_INDEX = [("datetime", -1), ("_id", -1), ("order_id", 1), ("customer_name", 1), ("phone", 1), ("grand_total", 1)]
+
+def _create_search_indexes(collection):
+    collection.create_index(HISTORY_INDEX, name="history_summary")
+    if "datetime_desc" in collection.index_information():
+        collection.drop_index("datetime_desc")  # superseded by history_summary (same prefix)
+    collection.create_index("legacy_order_id", sparse=True, name="legacy_order_id")
+    # Search filters in the Old Orders viewer
+    collection.create_index([("customer_name_lc", 1), ("datetime", -1)], name="customer_name_lc")
+    collection.create_index([("phone", 1), ("datetime", -1)], name="phone")
+    collection.create_index("grand_total", name="grand_total")
+
+def ensure_archive_indexes(collection):
+    """The archive tier is searched with the same filters as the orders collection."""
+    _create_search_indexes(collection)
+    collection.create_index("order_id", name="order_id")
+
+def ensure_indexes(collection):
+    """Create the indexes the history viewer and order lookups rely on (idempotent)."""
+    global order_id_index_unique
+    _create_search_indexes(collection)
+    try:
+        collection.create_index("order_id", unique=True, name="order_id_unique")
+        order_id_index_unique = True
+    except Exception:
+        # Legacy duplicates block the unique index; fall back to a plain one for lookups
+        # until `python -m cafe_aura migrate-ids` has resolved them.
+        collection.create_index("order_id", name="order_id")
+        order_id_index_unique = False
+    # One-time backfill of the normalized name for orders saved before it existed;
+    # once done this is an index-only no-op.
+    collection.update_many({"customer_name_lc": {"$exists": False}},
+                           [{"$set": {"customer_name_lc": {"$toLower": "$customer_name"}}}])
+
+@timed("db.upsert_orders")
+def upsert_orders_to_mongo(order_docs):
+    """Write a batch keyed on order_id.
+
+    Returns the docs that were newly inserted (already-stored orders are skipped),
+    or None if the batch could not be written.
+    """
+    if not mongo_connected or mongo_collection is None:
+        return None
+    try:
+        if mongo_archive is not None:
+            # an order already moved to the archive tier (see archive.py) is stored too,
+            # e.g. when a till restored from a backup syncs it again
+            ids = [doc["order_id"] for doc in order_docs]
+            archived = set()
+            for d in mongo_archive.find({"$or": [{"order_id": {"$in": ids}}, {"legacy_order_id": {"$in": ids}}]},
+                                        {"order_id": 1, "legacy_order_id": 1}):
+                archived.update((d["order_id"], d.get("legacy_order_id")))
+            order_docs = [doc for doc in order_docs if doc["order_id"] not in archived]
+            if not order_docs:
+                return []
+        # $setOnInsert keyed on order_id makes a retried batch a no-op for orders already stored.
+        ops = [UpdateOne(_order_id_filter(doc["order_id"]), {"$setOnInsert": doc}, upsert=True)
+               for doc in order_docs]
+        result = mongo_collection.bulk_write(ops, ordered=False)
+    except Exception as e:
+        record_error(e)
+        return None
+    return [order_docs[i] for i in sorted(result.upserted_ids)]
+
+def build_order_query(name=None, phone=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """Mongo filter for the Old Orders search bar; every clause is served by an index.
+
+    name is a case-insensitive prefix, phone a prefix, dates are inclusive days and
+    totals are inclusive bounds. Empty/None arguments are ignored.
+    """
+    query = {}
+    if name:
+        query["customer_name_lc"] = {"$regex": "^" + re.escape(name.lower())}
+    if phone:
+        query["phone"] = {"$regex": "^" + re.escape(phone)}
+    if date_from or date_to:
+        query["datetime"] = {}
+        if date_from:
+            query["datetime"]["$gte"] = dt.datetime.combine(date_from, dt.time.min)
+        if date_to:
+            query["datetime"]["$lt"] = dt.datetime.combine(date_to + dt.timedelta(days=1), dt.time.min)
+    if min_total is not None or max_total is not None:
+        query["grand_total"] = {}
+        if min_total is not None:
+            query["grand_total"]["$gte"] = min_total
+        if max_total is not None:
+            query["grand_total"]["$lte"] = max_total
+    return query
+
+@timed("db.fetch_orders_page")
+def fetch_orders_page(after=None, limit=HISTORY_PAGE_SIZE, query=None, collection=None):
+    """Keyset-paginated history, newest first, projected to the viewer's columns.
+
+    ``after`` is the (datetime, _id) of the last row already shown and ``query`` an
+    optional filter from build_order_query; returns (docs, next_after) where next_after
+    is None once the results are exhausted. ``collection`` defaults to the orders
+    collection (archive.fetch_history_page also pages the archive tier). A DB error is
+    recorded and re-raised: an empty last page would end paging for good, whereas the
+    caller can ask for the same page again.
+    """
+    collection = mongo_collection if collection is None else collection
+    if not mongo_connected or collection is None:
+        return [], None
+    query = dict(query or {})
+    if after is not None:
+        last_dt, last_id = after
+        keyset = {"$or": [{"datetime": {"$lt": last_dt}},
+                          {"datetime": last_dt, "_id": {"$lt": last_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+    try:
+        cursor = (collection.find(query, HISTORY_FIELDS)
+                  .sort([("datetime", -1), ("_id", -1)])
+                  .limit(limit))
+        docs = list(cursor)
+    except Exception as e:
+        record_error(e)
+        raise
+    if len(docs) < limit:
+        return docs, None
+    return docs, (docs[-1].get("datetime"), docs[-1]["_id"])
+
+def _order_id_filter(order_id):
+    # a legacy ID may have been reissued by migrate_order_ids; it lives on as legacy_order_id
+    if is_legacy_id(order_id):
+        return {"$or": [{"order_id": order_id}, {"legacy_order_id": order_id}]}
+    return {"order_id": order_id}
+
+@timed("db.fetch_order")
+def fetch_order_from_mongo(order_id):
+    """Full order document by order_id (or the legacy ID it replaced), or None."""
+    if not mongo_connected or mongo_collection is None:
+        return None
+    try:
+        return mongo_collection.find_one(_order_id_filter(order_id))
+    except Exception as e:
+        record_error(e)
+        return None
+
+def migrate_order_ids(reissue=False, progress=None):
+    """Make order_id unique, optionally moving legacy IDs onto the time-ordered scheme.
+
+    Orders sharing a legacy ID keep the oldest as is; the others get a new ID. With
+    ``reissue`` every legacy ID is replaced, oldest order first, by an ID built from the
+    order's own datetime (terminal number 0). Replaced IDs are kept in legacy_order_id,
+    so reprints and lookups by the old number still work. Finally the unique index is
+    created. Safe to re-run; returns {"duplicates": n, "reissued": n}.
+    """
+    global order_id_index_unique
+    if not mongo_connected or mongo_collection is None:
+        raise RuntimeError("Not connected to MongoDB.")
+    clock = {"ns": 0}
+    issue = OrderIdGenerator(terminal=0, clock=lambda: clock["ns"])
+
+    def new_id(doc):
+        clock["ns"] = int(doc["datetime"].timestamp() * 1000) * 1_000_000
+        return issue()
+
+    stats = {"duplicates": 0, "reissued": 0}
+    duplicates = mongo_collection.aggregate([
+        {"$group": {"_id": "$order_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    for group in duplicates:
+        for _id in sorted(group["ids"])[1:]:
+            doc = mongo_collection.find_one({"_id": _id}, {"datetime": 1})
+            mongo_collection.update_one({"_id": _id}, {"$set": {"order_id": new_id(doc), "legacy_order_id": group["_id"]}})
+            stats["duplicates"] += 1
+
+    if reissue:
+        cursor = (mongo_collection.find({"legacy_order_id": {"$exists": False},
+                                         "order_id": {"$not": {"$regex": f"^[{ALPHABET}]{{{ID_LENGTH}}}$"}}},
+                                        {"order_id": 1, "datetime": 1})
+                  .sort([("datetime", 1), ("_id", 1)]))
+        batch = []
+        for doc in cursor:
+            batch.append(UpdateOne({"_id": doc["_id"]},
+                                   {"$set": {"order_id": new_id(doc), "legacy_order_id": doc["order_id"]}}))
+            if len(batch) == 500:
+                mongo_collection.bulk_write(batch, ordered=False)
+                stats["reissued"] += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(stats["reissued"])
+        if batch:
+            mongo_collection.bulk_write(batch, ordered=False)
+            stats["reissued"] += len(batch)
+
+    if "order_id" in mongo_collection.index_information():
+        mongo_collection.drop_index("order_id")  # the non-unique fallback
+    mongo_collection.create_index("order_id", unique=True, name="order_id_unique")
+    order_id_index_unique = True
+    return stats
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""Live order events for multiple tills and the kitchen display.
+
+Tills publish an event for every order they place (and the kitchen for every order it
+bumps); displays subscribe and get them pushed within milliseconds instead of polling
+MongoDB. Two sources are supported:
+
+* a small TCP broker (``python -m cafe_aura broker``, see broker.py) relaying
+  newline-delimited JSON, which needs nothing but the standard library, and
+* a MongoDB change stream on the orders collection (needs a replica set, and only sees
+  orders once the sync engine has pushed them).
+
+Nothing here can stall checkout: publishing only appends to a bounded queue, a slow
+subscriber is disconnected by the broker rather than buffered without limit, and every
+client reconnects with backoff and resumes from the last event it saw.
+"""
+import datetime as dt
+import json
+import queue
+import select
+import socket
+import threading
+
+from . import db
+from .config import (EVENT_SOURCE, EVENT_BROKER_HOST, EVENT_BROKER_PORT, EVENT_QUEUE_SIZE,
+                     EVENT_RECONNECT_MAX, TERMINAL_ID)
+
+ORDER_CREATED = "order.created"
+ORDER_UPDATED = "order.updated"
+ORDER_STATUS = "order.status"
+STOCK_UPDATED = "stock.updated"  # inventory changed: tills refresh their stock levels
+
+def order_event(kind, order_doc, terminal=TERMINAL_ID):
+    """A compact, JSON-ready event for an order doc: enough for a kitchen ticket or a history row."""
+    when = order_doc.get("datetime")
+    return {
+        "type": kind,
+        "order_id": order_doc.get("order_id"),
+        "terminal": order_doc.get("terminal", terminal),
+        "datetime": when.isoformat() if isinstance(when, dt.datetime) else when,
+        "customer_name": order_doc.get("customer_name", "-"),
+        "phone": order_doc.get("phone", "-"),
+        "grand_total": order_doc.get("grand_total", 0),
+        "items": [{"name": i.get("name", ""), "qty": i.get("qty", 0)} for i in order_doc.get("items", [])],
+        "status": order_doc.get("status", "new"),
+    }
+
+def status_event(order_id, status, terminal=TERMINAL_ID):
+    return {"type": ORDER_STATUS, "order_id": order_id, "terminal": terminal, "status": status,
+            "datetime": dt.datetime.now().isoformat(timespec="seconds")}
+
+def stock_event(skus, terminal=TERMINAL_ID):
+    return {"type": STOCK_UPDATED, "terminal": terminal, "skus": sorted(skus),
+            "datetime": dt.datetime.now().isoformat(timespec="seconds")}
+
+def _line(message):
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+class EventPublisher(threading.Thread):
+    """Ships events to the broker from a background thread.
+
+    ``publish`` never blocks: events go into a bounded queue and, if the broker has
+    been unreachable long enough to fill it, the oldest are dropped (counted in
+    ``dropped``). Orders themselves are safe in the local store either way.
+    """
+
+    def __init__(self, host=EVENT_BROKER_HOST, port=EVENT_BROKER_PORT, queue_size=EVENT_QUEUE_SIZE):
+        super().__init__(name="event-publisher", daemon=True)
+        self.address = (host, port)
+        self.connected = False
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._stop_event = threading.Event()
+
+    def publish(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self, flush=False):
+        """Stop the thread; with ``flush`` only once the events already published have been sent."""
+        if not flush:
+            self._stop_event.set()
+        self.publish(None)
+
+    def run(self):
+        backoff = 1
+        pending = None
+        while not self._stop_event.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=2) as sock:
+                    sock.settimeout(5)  # a broker that stops reading must not wedge this thread forever
+                    sock.sendall(_line({"op": "publish", "terminal": TERMINAL_ID}))
+                    self.connected, backoff = True, 1
+                    while not self._stop_event.is_set():
+                        event = pending if pending is not None else self._queue.get()
+                        if event is None:
+                            return
+                        pending = event
+                        if select.select([sock], [], [], 0)[0]:
+                            # the broker never writes to publishers, so readable means it hung up;
+                            # sending now would "succeed" into a dead socket and lose the event
+                            break
+                        sock.sendall(_line(event))
+                        pending = None
+            except OSError:
+                pass
+            self.connected = False
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, EVENT_RECONNECT_MAX)
+
+class _Subscriber(threading.Thread):
+    """Base for event sources: events go onto ``results`` for the Tk side to drain with
+    after(), along with {"type": "connection", "connected": bool} when the link changes."""
+
+    def __init__(self, name):
+        super().__init__(name=name, daemon=True)
+        self.results = queue.Queue()
+        self.connected = False
+        self._stop_event = threading.Event()
+
+    def _set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.results.put({"type": "connection", "connected": connected})
+
+class EventSubscriber(_Subscriber):
+    """Receives broker events on a background thread. Reconnects resume from the last
+    sequence number seen, so nothing is missed or shown twice."""
+
+    def __init__(self, host=EVENT_BROKER_HOST, port=EVENT_BROKER_PORT, replay=True):
+        super().__init__("event-subscriber")
+        self.address = (host, port)
+        self._epoch = None
+        self._seq = 0 if replay else None  # None: live events only on the first connect
+        self._sock = None
+
+    def stop(self):
+        self._stop_event.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=2) as sock:
+                    self._sock = sock
+                    if self._stop_event.is_set():
+                        break  # stop() ran before the socket was there to shut down
+                    sock.settimeout(45)  # the broker pings every 15s
+                    sock.sendall(_line({"op": "subscribe", "epoch": self._epoch, "since": self._seq}))
+                    for raw in sock.makefile("rb"):
+                        message = json.loads(raw)
+                        if message["type"] == "hello":
+                            if message["epoch"] != self._epoch:
+                                self._epoch = message["epoch"]
+                                self._seq = 0 if self._seq is not None else message["seq"]
+                            self._set_connected(True)
+                            backoff = 1
+                        elif message["type"] != "ping" and message["seq"] > self._seq:
+                            self._seq = message["seq"]
+                            self.results.put(message)
+            except (OSError, ValueError, KeyError):
+                pass
+            finally:
+                self._sock = None
+            self._set_connected(False)
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, EVENT_RECONNECT_MAX)
+
+class ChangeStreamSubscriber(_Subscriber):
+    """Same interface as EventSubscriber, fed by a MongoDB change stream on the orders
+    collection. Resumes from the last resume token after an error."""
+
+    def __init__(self):
+        super().__init__("event-change-stream")
+        self._resume_token = None
+        self._stream = None
+
+    def stop(self):
+        self._stop_event.set()
+        stream = self._stream
+        if stream is not None:
+            stream.close()
+
+    def run(self):
+        backoff = 1
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        while not self._stop_event.is_set():
+            if not db.mongo_connected or db.mongo_collection is None:
+                self._stop_event.wait(1)
+                continue
+            try:
+                with db.mongo_collection.watch(pipeline, full_document="updateLookup",
+                                               resume_after=self._resume_token) as stream:
+                    self._stream = stream
+                    if self._stop_event.is_set():
+                        break  # stop() ran before the stream was there to close
+                    self._set_connected(True)
+                    backoff = 1
+                    for change in stream:
+                        self._resume_token = stream.resume_token
+                        doc = change.get("fullDocument")
+                        if doc is not None:
+                            kind = ORDER_CREATED if change["operationType"] == "insert" else ORDER_UPDATED
+                            self.results.put(order_event(kind, doc))
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    db.record_error(e)
+            finally:
+                self._stream = None
+            self._set_connected(False)
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, EVENT_RECONNECT_MAX)
+
+def make_subscriber(source=EVENT_SOURCE, replay=True):
+    """The configured event source: "broker" (default) or "mongo" (change stream)."""
+    if source == "mongo":
+        return ChangeStreamSubscriber()
+    return EventSubscriber(replay=replay)
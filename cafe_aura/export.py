@@ -0,0 +1,96 @@
+"""Bulk export: stream orders from MongoDB into gzip'd JSONL/CSV plus a zip of text receipts."""
+import csv
+import datetime as dt
+import gzip
+import json
+import os
+import zipfile
+
+from . import db
+from .core import Order
+
+EXPORT_BATCH_SIZE = 500  # documents per cursor round-trip
+CSV_FIELDS = ("order_id", "datetime", "customer_name", "phone", "items", "subtotal", "discount", "sgst", "cgst", "grand_total")
+
+def _json_default(value):
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    return str(value)
+
+def count_orders(query=None):
+    from .archive import count_archived
+
+    return count_archived(query) + db.mongo_collection.count_documents(query or {})
+
+def iter_orders(query=None):
+    """Orders matching ``query``, oldest first, streamed from server-side cursors.
+
+    Archived orders (see archive.py) come first; they are all older than the hot ones.
+    """
+    from .archive import iter_archived
+
+    for doc in iter_archived(query):
+        doc.pop("_id", None)
+        doc.pop("customer_name_lc", None)
+        yield doc
+    cursor = (db.mongo_collection.find(query or {}, {"_id": 0, "customer_name_lc": 0})
+              .sort([("datetime", 1), ("_id", 1)])
+              .batch_size(EXPORT_BATCH_SIZE))
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+def export_orders(out_dir, query=None, progress=None, cancelled=None):
+    """Write every order matching ``query`` to out_dir; returns {"count": n, "files": [...], "cancelled": bool}.
+
+    Output is <prefix>.jsonl.gz, <prefix>.csv.gz and <prefix>_receipts.zip. Orders are
+    written one at a time as the cursor yields them, so memory does not grow with the
+    range. ``progress(count)`` is called every EXPORT_BATCH_SIZE orders (from this
+    thread). If ``cancelled()`` returns True the export stops, its partial files are
+    deleted and the result has "cancelled": True and no files; they are deleted on an
+    error too, so a file left in out_dir is always a complete export.
+    """
+    if not db.mongo_connected or db.mongo_collection is None:
+        raise RuntimeError("Not connected to MongoDB.")
+    os.makedirs(out_dir, exist_ok=True)
+    prefix = os.path.join(out_dir, f"cafe_aura_orders_{dt.datetime.now():%Y%m%d_%H%M%S}")
+    files = [prefix + ".jsonl.gz", prefix + ".csv.gz", prefix + "_receipts.zip"]
+
+    count, stopped = 0, False
+    try:
+        with gzip.open(files[0], "wt", encoding="utf-8") as jsonl, \
+                gzip.open(files[1], "wt", encoding="utf-8", newline="") as csv_file, \
+                zipfile.ZipFile(files[2], "w", compression=zipfile.ZIP_DEFLATED) as receipts:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for doc in iter_orders(query):
+                if cancelled is not None and cancelled():
+                    stopped = True
+                    break
+                jsonl.write(json.dumps(doc, default=_json_default, ensure_ascii=False) + "\n")
+                writer.writerow({
+                    **doc,
+                    "datetime": _json_default(doc.get("datetime")),
+                    "items": "; ".join(f"{i.get('qty', 0)}x {i.get('name', '')}" for i in doc.get("items", [])),
+                })
+                receipts.writestr(f"receipt_{doc.get('order_id', count)}.txt", Order.from_doc(doc).receipt_text())
+                count += 1
+                if progress is not None and count % EXPORT_BATCH_SIZE == 0:
+                    progress(count)
+    except BaseException:
+        _remove(files)
+        raise
+    if stopped:
+        _remove(files)
+        return {"count": count, "files": [], "cancelled": True}
+    if progress is not None:
+        progress(count)
+    return {"count": count, "files": files, "cancelled": False}
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
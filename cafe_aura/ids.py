@@ -0,0 +1,114 @@
+"""Time-ordered order IDs: unique across tills without coordination, sortable by creation time.
+
+An ID is 80 bits written as 16 Crockford base32 characters:
+
+    48 bits  milliseconds since the Unix epoch
+    16 bits  terminal number (TERMINAL_NUMBER)
+    16 bits  sequence within the millisecond, starting at a random value
+
+so IDs from one till are strictly increasing and sorting IDs sorts orders by time.
+That holds across restarts too, if the clock went back meanwhile: OrderService resumes
+the generator after the newest ID in the till's local store (resume_after).
+
+IDs from different tills can only collide if the tills share a terminal number: that
+is ruled out by giving each till its own CAFE_AURA_TERMINAL_NO. The hostname-derived
+default is not guaranteed distinct, so terminal_number_warning() flags it.
+
+Orders created before this scheme have 8-hex-character IDs; see db.migrate_order_ids.
+"""
+import datetime as dt
+import random
+import threading
+import time
+
+from .config import TERMINAL_ID, TERMINAL_NUMBER, TERMINAL_NUMBER_SET
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32: no I, L, O, U
+ID_LENGTH = 16
+_SEQ_BITS = 16
+_TERMINAL_BITS = 16
+_DECODE = {c: i for i, c in enumerate(ALPHABET)}
+
+def encode_id(millis, terminal, seq):
+    value = (millis << (_TERMINAL_BITS + _SEQ_BITS)) | (terminal << _SEQ_BITS) | seq
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+def decode_id(order_id):
+    """(millis, terminal, seq) for a time-ordered ID; raises ValueError for anything else."""
+    if len(order_id) != ID_LENGTH:
+        raise ValueError(f"Not a time-ordered order ID: {order_id!r}")
+    value = 0
+    for c in order_id.upper():
+        if c not in _DECODE:
+            raise ValueError(f"Not a time-ordered order ID: {order_id!r}")
+        value = value * 32 + _DECODE[c]
+    seq_mask, terminal_mask = (1 << _SEQ_BITS) - 1, (1 << _TERMINAL_BITS) - 1
+    return value >> (_TERMINAL_BITS + _SEQ_BITS), (value >> _SEQ_BITS) & terminal_mask, value & seq_mask
+
+def terminal_number_warning():
+    """A warning to show at startup if this till's terminal number was not configured, else None."""
+    if TERMINAL_NUMBER_SET:
+        return None
+    return (f"WARNING: CAFE_AURA_TERMINAL_NO is not set; using terminal number {TERMINAL_NUMBER} "
+            f"derived from {TERMINAL_ID!r}. Another till can get the same number and issue "
+            "colliding order IDs: give every till its own CAFE_AURA_TERMINAL_NO (1..65535).")
+
+def order_id_time(order_id):
+    """Local datetime an ID was issued at, or None for legacy (random) IDs."""
+    try:
+        millis = decode_id(order_id)[0]
+    except ValueError:
+        return None
+    return dt.datetime.fromtimestamp(millis / 1000)
+
+def is_legacy_id(order_id):
+    return order_id_time(order_id) is None
+
+class OrderIdGenerator:
+    """Issues strictly increasing IDs for one terminal; thread-safe.
+
+    If the clock stalls or steps back, IDs keep counting up from the last millisecond
+    used rather than going backwards; when a millisecond's sequence space runs out,
+    the generator moves on to the next millisecond.
+    """
+
+    def __init__(self, terminal=TERMINAL_NUMBER, clock=time.time_ns):
+        if not 0 <= terminal < 1 << _TERMINAL_BITS:
+            raise ValueError(f"Terminal number must be 0..{(1 << _TERMINAL_BITS) - 1}")
+        self.terminal = terminal
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._seq = 0
+
+    def __call__(self):
+        with self._lock:
+            now = self.clock() // 1_000_000
+            if now > self._last_ms:
+                # random start, so two processes sharing a terminal number rarely meet
+                self._last_ms, self._seq = now, random.randrange(1 << (_SEQ_BITS - 1))
+            elif self._seq < (1 << _SEQ_BITS) - 1:
+                self._seq += 1
+            else:
+                self._last_ms, self._seq = self._last_ms + 1, 0
+            return encode_id(self._last_ms, self.terminal, self._seq)
+
+    def resume_after(self, order_id):
+        """Issue only IDs above ``order_id`` from now on (one issued before a restart).
+
+        The in-memory guard against a clock going backwards is lost when the process
+        exits; this restores it. Legacy IDs and None are ignored.
+        """
+        try:
+            millis, _, seq = decode_id(order_id or "")
+        except ValueError:
+            return
+        with self._lock:
+            if (millis, seq) > (self._last_ms, self._seq):
+                self._last_ms, self._seq = millis, seq
+
+new_order_id = OrderIdGenerator()
@@ -0,0 +1,191 @@
+"""Inventory: stock levels per SKU, menu recipes, and the decrements made by checkouts.
+
+The inventory collection holds one doc per stock-keeping unit:
+    {"_id": "pizza-base", "name": "Pizza Base", "stock": 40, "low": 10, "updated_at": datetime}
+A menu item uses the SKUs in its "recipe" ({"pizza-base": 1, "cheese": 0.5}), or, with
+no recipe, one unit of the SKU named after its own id (bottled drinks, desserts bought in).
+SKUs without an inventory doc are not tracked and never run out.
+
+Checkout records what the order used in the order doc ("stock_usage"); once the order
+has synced, the sync engine applies it with one unordered bulk_write of $inc updates per
+batch, retrying until that write succeeds (the local store keeps it pending until then).
+$inc is atomic on the server, so several tills never lose each other's decrements,
+checkout itself makes no extra round-trip, and an order placed offline is counted when
+it syncs.
+
+Stock is not reserved at checkout, so it CAN be oversold: two tills (or a till working
+offline) can each sell the last portion before either decrement reaches the server.
+Such an order still goes through (it has been served) and the stock goes negative until
+the next stocktake. Out-of-stock flags only narrow that window; they are not a lock.
+
+Tills keep a StockLevels snapshot, refreshed by a StockMonitor thread, and show items
+running low or out of stock from it. Whatever changes the inventory publishes a
+"stock.updated" event, and the monitor refreshes when one arrives rather than polling.
+Each refresh takes off this till's orders whose decrement has not reached the server yet.
+"""
+import queue
+import threading
+
+from . import db
+from .config import STOCK_LOW_THRESHOLD, STOCK_POLL_INTERVAL
+
+OUT, LOW = "out", "low"
+
+def sku_state(doc, qty=1):
+    """OUT, LOW or None for one inventory doc, for something using ``qty`` of it per portion."""
+    stock = doc.get("stock", 0)
+    if stock < qty:
+        return OUT
+    if stock <= doc.get("low", STOCK_LOW_THRESHOLD):
+        return LOW
+    return None
+
+def recipe(item):
+    """{sku: qty per portion} for a catalog item."""
+    return item.get("recipe") or {item["id"]: 1}
+
+def stock_usage(cart, catalog):
+    """{sku: qty} used by every line of ``cart``, from the recipes in ``catalog``."""
+    usage = {}
+    for line in cart:
+        item = catalog.get(line["item_id"]) or {"id": line["item_id"]}
+        for sku, qty in recipe(item).items():
+            usage[sku] = usage.get(sku, 0) + qty * line["qty"]
+    return usage
+
+def update_inventory(order_docs):
+    """Take the stock used by ``order_docs`` off the inventory in one bulk_write; True on success.
+
+    Apply each order once: OrderSync keeps an order's stock pending in the local store
+    until this has succeeded for it, and retries it on later passes otherwise.
+    """
+    if not order_docs or db.mongo_inventory is None:
+        return False
+    usage = {}
+    for doc in order_docs:
+        for sku, qty in (doc.get("stock_usage") or {}).items():
+            usage[sku] = usage.get(sku, 0) + qty
+    if not usage:
+        return True
+    # no upsert: SKUs nobody stocks stay untracked
+    ops = [db.UpdateOne({"_id": sku}, {"$inc": {"stock": -qty}, "$currentDate": {"updated_at": True}})
+           for sku, qty in usage.items()]
+    try:
+        db.mongo_inventory.bulk_write(ops, ordered=False)
+        return True
+    except Exception as e:
+        db.record_error(e)
+        return False
+
+def restock(sku, qty, name=None):
+    """Add ``qty`` to a SKU's stock (creating it), atomically, so checkouts meanwhile are kept."""
+    update = {"$inc": {"stock": qty}, "$currentDate": {"updated_at": True}}
+    if name:
+        update["$set"] = {"name": name}
+    db.mongo_inventory.update_one({"_id": sku}, update, upsert=True)
+
+def set_stock(sku, stock=None, low=None):
+    """Stocktake: overwrite a SKU's count and/or its low-stock threshold."""
+    fields = {k: v for k, v in (("stock", stock), ("low", low)) if v is not None}
+    db.mongo_inventory.update_one({"_id": sku}, {"$set": fields, "$currentDate": {"updated_at": True}}, upsert=True)
+
+def fetch_stock():
+    """{sku: inventory doc}, or None if the DB is unavailable."""
+    if not db.mongo_connected or db.mongo_inventory is None:
+        return None
+    try:
+        return {doc["_id"]: doc for doc in db.mongo_inventory.find({}, {"name": 1, "stock": 1, "low": 1})}
+    except Exception as e:
+        db.record_error(e)
+        return None
+
+class StockLevels:
+    """The last known inventory on this till, safe across threads.
+
+    ``flags`` turns it into per-item states for the menu. A checkout on this till is
+    taken off at once (``remember``); a refresh from the server replaces the levels,
+    less ``pending`` ({sku: qty} of this till's orders the server has not counted yet).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skus = {}
+
+    def update(self, skus, pending=None):
+        skus = {sku: dict(doc) for sku, doc in skus.items()}
+        for sku, qty in (pending or {}).items():
+            if sku in skus:
+                skus[sku]["stock"] = skus[sku].get("stock", 0) - qty
+        with self._lock:
+            self._skus = skus
+
+    def remember(self, order_doc):
+        with self._lock:
+            for sku, qty in (order_doc.get("stock_usage") or {}).items():
+                if sku in self._skus:
+                    self._skus[sku]["stock"] = self._skus[sku].get("stock", 0) - qty
+
+    def portions(self, item):
+        """How many of ``item`` the tracked stock still makes, or None if none of its SKUs are tracked."""
+        with self._lock:
+            counts = [self._skus[sku].get("stock", 0) // qty
+                      for sku, qty in recipe(item).items() if sku in self._skus and qty > 0]
+        return int(max(min(counts), 0)) if counts else None
+
+    def state(self, item):
+        """OUT, LOW or None for one catalog item."""
+        with self._lock:
+            states = {sku_state(self._skus[sku], qty) for sku, qty in recipe(item).items() if sku in self._skus}
+        return OUT if OUT in states else LOW if LOW in states else None
+
+    def is_out(self, item):
+        return self.state(item) == OUT
+
+    def flags(self, catalog):
+        """{item_id: (OUT or LOW, portions left)} for the items in ``catalog`` that need a flag."""
+        flags = {}
+        for item in catalog.by_id.values():
+            state = self.state(item)
+            if state is not None:
+                flags[item["id"]] = (state, self.portions(item))
+        return flags
+
+class StockMonitor(threading.Thread):
+    """Refreshes ``levels`` from the inventory collection whenever ``wake()`` is called:
+    once this till's orders have synced, or a "stock.updated" event arrived from another
+    till. Without either it still refreshes every ``interval`` seconds, as a fallback.
+
+    With the till's LocalOrderStore as ``store``, its orders still pending a decrement
+    stay taken off after a refresh. Pushes True onto ``results`` whenever the levels
+    changed, for a Tk after() poll.
+    """
+
+    def __init__(self, levels, store=None, interval=STOCK_POLL_INTERVAL):
+        super().__init__(name="stock-monitor", daemon=True)
+        self.levels = levels
+        self.store = store
+        self.interval = interval
+        self.results = queue.Queue()
+        self._last = None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            # pending first: an order applied in between is then taken off twice until the
+            # next refresh (shows too little stock) rather than not at all
+            pending = self.store.pending_stock_usage() if self.store is not None else {}
+            skus = fetch_stock()
+            if skus is not None and (skus, pending) != self._last:
+                self._last = skus, pending
+                self.levels.update(skus, pending)
+                self.results.put(True)
+            self._wake.wait(self.interval)
+            self._wake.clear()
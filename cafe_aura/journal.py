@@ -0,0 +1,87 @@
+"""Crash recovery for the order in progress: an append-only journal of cart changes.
+
+Each change to the open cart appends one short JSON line instead of rewriting the cart:
+    {"op": "begin", "order_id": "..."}
+    {"op": "add", "item": {catalog item}, "qty": 2}
+    {"op": "remove", "line_id": "cold-coffee"}
+    {"op": "clear"}
+    {"op": "customer", "name": "Riya", "phone": "98..."}
+Starting a new order truncates the file, so it never holds more than one order. Lines
+are flushed as they are written, so they survive the till process dying (not a power
+cut in the same instant). recover() replays the file into the cart it describes.
+The order ID is journaled too: restoring a cart that was in fact checked out just
+before the crash is harmless, because checkout is idempotent on order_id.
+"""
+import json
+
+from .config import CART_JOURNAL_PATH
+
+class CartJournal:
+    def __init__(self, path=CART_JOURNAL_PATH):
+        self.path = path
+        self._file = None
+
+    def _append(self, record, mode="a"):
+        if self._file is None or mode == "w":
+            self.close()
+            self._file = open(self.path, mode, encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def begin(self, order_id):
+        """Start journaling a new order, dropping the previous one."""
+        self._append({"op": "begin", "order_id": order_id}, mode="w")
+
+    def add(self, item, qty):
+        # the whole item, so the line comes back at the price it was added at
+        self._append({"op": "add", "item": item, "qty": qty})
+
+    def remove(self, line_id):
+        self._append({"op": "remove", "line_id": line_id})
+
+    def clear(self):
+        self._append({"op": "clear"})
+
+    def customer(self, name, phone):
+        self._append({"op": "customer", "name": name, "phone": phone})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def recover(self):
+        """The journaled order as {"order_id", "lines": [(item, qty)], "customer_name", "phone"}, or None.
+
+        None if there is no journal or its cart is empty. An unreadable line (a write
+        torn by the crash) is skipped; begin() again to drop it from the file.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = f.readlines()
+        except OSError:
+            return None
+        state, lines = None, {}
+        for text in raw:
+            try:
+                record = json.loads(text)
+            except ValueError:
+                continue
+            op = record.get("op")
+            if op == "begin":
+                state, lines = {"order_id": record["order_id"], "customer_name": "", "phone": ""}, {}
+            elif state is None:
+                continue
+            elif op == "add":
+                item = record["item"]
+                line = lines.setdefault(item["id"], [item, 0])
+                line[1] += record["qty"]
+            elif op == "remove":
+                lines.pop(record["line_id"], None)
+            elif op == "clear":
+                lines.clear()
+            elif op == "customer":
+                state.update(customer_name=record["name"], phone=record["phone"])
+        if state is None or not lines:
+            return None
+        return {**state, "lines": [tuple(line) for line in lines.values()]}
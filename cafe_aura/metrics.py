@@ -0,0 +1,241 @@
+"""In-process performance metrics: timing histograms, periodic dumps and session profiling.
+
+Hot paths are wrapped with ``timed("name")`` (decorator or context manager). Each
+observation costs two perf_counter() calls and a lock, so the hooks stay on in
+production. ``registry.snapshot()`` gives count/mean/percentiles per metric for the
+debug overlay, and MetricsDumper writes the same as JSON and Prometheus text.
+"""
+import bisect
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from .config import METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL
+
+# Histogram bucket upper bounds, milliseconds (Prometheus-style, cumulative on export).
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RECENT_SAMPLES = 1024  # percentiles are computed over the most recent samples
+
+class Histogram:
+    """Bucketed latency histogram plus a window of recent samples for percentiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, ms):
+        with self._lock:
+            self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+            self.recent.append(ms)
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self.recent)
+            count, total, peak = self.count, self.total, self.max
+        if not samples:
+            return {"count": 0}
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+        return {"count": count, "mean_ms": total / count, "p50_ms": pct(50), "p95_ms": pct(95),
+                "p99_ms": pct(99), "max_ms": peak}
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, Histogram())
+        return hist
+
+    def observe(self, name, ms):
+        self.histogram(name).observe(ms)
+
+    def _sorted(self):
+        # copied under the lock: histogram() may add a name from another thread meanwhile
+        with self._lock:
+            return sorted(self.histograms.items())
+
+    def snapshot(self):
+        """{name: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}, sorted by name."""
+        return {name: hist.summary() for name, hist in self._sorted()}
+
+    def to_json(self):
+        return json.dumps({"time": time.time(), "metrics": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        lines = ["# HELP cafe_aura_duration_ms Duration of instrumented operations in milliseconds.",
+                 "# TYPE cafe_aura_duration_ms histogram"]
+        for name, hist in self._sorted():
+            with hist._lock:
+                buckets, count, total = list(hist.buckets), hist.count, hist.total
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS + ("+Inf",), buckets):
+                cumulative += n
+                lines.append(f'cafe_aura_duration_ms_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'cafe_aura_duration_ms_sum{{op="{name}"}} {total:.3f}')
+            lines.append(f'cafe_aura_duration_ms_count{{op="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write <path>.json and <path>.prom, each replaced atomically."""
+        for suffix, text in ((".json", self.to_json()), (".prom", self.to_prometheus())):
+            tmp = path + suffix + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path + suffix)
+
+registry = MetricsRegistry()
+
+class timed:
+    """Time a block or function into ``registry``: ``with timed("db.save"):`` or ``@timed("ui.show_items")``."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+    def __call__(self, func):
+        histogram = registry.histogram(self.name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe((time.perf_counter() - start) * 1000)
+        return wrapper
+
+class PhaseTimer:
+    """Splits a stretch of wall-clock time into named phases, e.g. the steps of startup.
+
+    Each phase is also recorded in ``registry`` as "<prefix>.<name>".
+    """
+
+    def __init__(self, prefix, start=None):
+        self.prefix = prefix
+        self.start = self.last = time.perf_counter() if start is None else start
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        ms = (now - self.last) * 1000
+        self.phases.append((name, ms))
+        registry.observe(f"{self.prefix}.{name}", ms)
+        self.last = now
+
+    def report(self):
+        lines, total = [], 0.0
+        for name, ms in self.phases:
+            total += ms
+            lines.append(f"{name:<20}{ms:>9.1f} ms{total:>10.1f} ms")
+        return "\n".join(lines)
+
+class MetricsDumper(threading.Thread):
+    """Writes registry.dump(path) every ``interval`` seconds, and once more on stop()."""
+
+    def __init__(self, path=METRICS_DUMP_PATH, interval=METRICS_DUMP_INTERVAL):
+        super().__init__(name="metrics-dumper", daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(2)
+        self._dump()
+
+    def _dump(self):
+        try:
+            registry.dump(self.path)
+        except OSError:
+            pass  # metrics must never take the till down
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._dump()
+
+class SessionProfiler:
+    """Profiles a whole session in one of two modes.
+
+    "cprofile" traces every call on the thread that started it (the Tk thread) and
+    saves a .pstats file. "sampling" records the stack of that thread every
+    ``interval`` seconds from a helper thread, which costs far less, and saves
+    collapsed stacks ("frame;frame;frame count" per line) for flame-graph tools.
+    """
+
+    def __init__(self, mode, path, interval=0.005):
+        if mode not in ("cprofile", "sampling"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.interval = interval
+        self.running = False
+        self._thread_id = None
+        self._profile = None
+        self._sampler = None
+        self._stacks = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self.running = True
+        self._thread_id = threading.get_ident()
+        if self.mode == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stop_event.clear()
+            self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop and write the profile; returns the file written."""
+        self.running = False
+        if self.mode == "cprofile":
+            self._profile.disable()
+            path = self.path + ".pstats"
+            self._profile.dump_stats(path)
+        else:
+            self._stop_event.set()
+            self._sampler.join()
+            path = self.path + ".collapsed.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        return path
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
@@ -0,0 +1,224 @@
+"""Exact money: integer paise, tax classes, discounts/combos and per-catalog price tables.
+
+Every amount is an int number of paise; rupees appear only at the edges (menu.json
+prices, display, and the rupee copies kept on stored orders for queries). Rounding is
+half-up and happens once per discount line and once per tax class and component, so
+the cart screen, the receipt and the reports all see the same numbers.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from .config import TAX_CLASSES, CATEGORY_TAX_CLASSES, DEFAULT_TAX_CLASS
+
+def to_paise(amount):
+    """Rupees (int, float, str or Decimal) -> int paise, rounded half-up."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_paise(paise):
+    """int paise -> Decimal rupees with two places (formats exactly with :.2f)."""
+    return Decimal(paise).scaleb(-2)
+
+def percent_of(paise, percent):
+    return int((Decimal(paise) * Decimal(percent) / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def format_rate(rate):
+    """'9.00' -> '9', '2.50' -> '2.5' (labels such as "SGST (2.5%)")."""
+    return f"{Decimal(str(rate)).normalize():f}"
+
+class TaxPolicy:
+    """Tax classes (SGST/CGST percentages) and the rule deciding each item's class.
+
+    An item uses its own "tax_class" if it has one, else its category's class from
+    CATEGORY_TAX_CLASSES, else DEFAULT_TAX_CLASS. Also hands out the PriceTable for a
+    catalog, built once per catalog version.
+    """
+
+    def __init__(self, classes=None, category_classes=None, default_class=DEFAULT_TAX_CLASS):
+        classes = TAX_CLASSES if classes is None else classes
+        self.classes = {name: (Decimal(str(rates["sgst"])), Decimal(str(rates["cgst"])))
+                        for name, rates in classes.items()}
+        self.category_classes = CATEGORY_TAX_CLASSES if category_classes is None else category_classes
+        self.default_class = default_class
+        self._tables = {}  # catalog version -> PriceTable
+
+    def class_for(self, item):
+        return item.get("tax_class") or self.category_classes.get(item.get("category"), self.default_class)
+
+    def rates(self, tax_class):
+        """(sgst %, cgst %) for a class; unknown classes are taxed as the default class."""
+        return self.classes.get(tax_class) or self.classes[self.default_class]
+
+    def split(self, tax_class, taxable):
+        """(sgst, cgst) paise on ``taxable`` paise of the given class."""
+        sgst, cgst = self.rates(tax_class)
+        return percent_of(taxable, sgst), percent_of(taxable, cgst)
+
+    def table(self, catalog):
+        """The PriceTable for ``catalog``, cached by catalog version."""
+        table = self._tables.get(catalog.version)
+        if table is None or table.catalog is not catalog:
+            table = PriceTable(catalog, self)
+            self._tables = {catalog.version: table}  # only the live catalog is worth keeping
+        return table
+
+class PercentOffer:
+    """``percent`` off every unit of the listed items and/or a whole category."""
+
+    def __init__(self, spec):
+        self.id = spec["id"]
+        self.name = spec.get("name", self.id)
+        self.percent = Decimal(str(spec["percent"]))
+        self.items = set(spec.get("items", ()))
+        self.category = spec.get("category")
+        if not 0 < self.percent <= 100 or not (self.items or self.category):
+            raise ValueError(f"Bad percent offer: {self.id}")
+
+    def applies_to(self, item):
+        return item["id"] in self.items or item["category"] == self.category
+
+    def apply(self, lines, remaining, discounts):
+        total = 0
+        for item_id, line in lines.items():
+            qty = remaining.get(item_id, 0)
+            if qty and (item_id in self.items or line["category"] == self.category):
+                amount = percent_of(qty * line["price_paise"], self.percent)
+                discounts[item_id] = discounts.get(item_id, 0) + amount
+                remaining[item_id] = 0
+                total += amount
+        return total
+
+class ComboOffer:
+    """A fixed price for a set of items, e.g. {"volcano-pizza": 1, "cold-coffee": 1} for 299.
+
+    The saving is split across the combo's lines in proportion to their list price, so
+    each line's tax class is charged on what was actually paid for it.
+    """
+
+    def __init__(self, spec):
+        self.id = spec["id"]
+        self.name = spec.get("name", self.id)
+        self.items = {item_id: int(qty) for item_id, qty in spec["combo"].items()}
+        self.price = to_paise(spec["price"])
+        if not self.items or min(self.items.values()) < 1:
+            raise ValueError(f"Bad combo offer: {self.id}")
+
+    def applies_to(self, item):
+        return item["id"] in self.items
+
+    def apply(self, lines, remaining, discounts):
+        sets = min(remaining.get(item_id, 0) // qty for item_id, qty in self.items.items())
+        if sets < 1:
+            return 0
+        list_price = sum(lines[item_id]["price_paise"] * qty for item_id, qty in self.items.items())
+        if list_price <= self.price:
+            return 0
+        total = (list_price - self.price) * sets
+        allocated = 0
+        for n, (item_id, qty) in enumerate(self.items.items(), start=1):
+            share = total - allocated if n == len(self.items) else total * lines[item_id]["price_paise"] * qty // list_price
+            discounts[item_id] = discounts.get(item_id, 0) + share
+            remaining[item_id] -= qty * sets
+            allocated += share
+        return total
+
+def compile_offer(spec):
+    """A ComboOffer for specs with "combo", else a PercentOffer; raises ValueError if malformed."""
+    try:
+        return ComboOffer(spec) if "combo" in spec else PercentOffer(spec)
+    except (KeyError, TypeError, AttributeError, ArithmeticError) as e:
+        raise ValueError(f"Bad offer {spec!r}: {e}") from e
+
+class PriceTable:
+    """Prices in paise, tax classes and offers for one catalog version, precomputed.
+
+    Carts look items up here instead of converting prices and resolving tax classes on
+    every add, and only evaluate the offers that mention an item they hold.
+    """
+
+    def __init__(self, catalog, tax):
+        self.catalog = catalog
+        self.tax = tax
+        self.rows = {item_id: (to_paise(item["price"]), tax.class_for(item), item)
+                     for item_id, item in catalog.by_id.items()}
+        offers = [compile_offer(spec) for spec in catalog.offers]
+        # combos claim their units first; percentage offers apply to whatever is left
+        self.offers = sorted(offers, key=lambda offer: not isinstance(offer, ComboOffer))
+        self.offers_by_item = {}
+        for n, offer in enumerate(self.offers):
+            for item_id, item in catalog.by_id.items():
+                if offer.applies_to(item):
+                    self.offers_by_item.setdefault(item_id, set()).add(n)
+
+    def row(self, item):
+        """(price paise, tax class) for a catalog item; items from another catalog version are converted on the fly."""
+        row = self.rows.get(item["id"])
+        if row is None or row[2] is not item:
+            return to_paise(item["price"]), self.tax.class_for(item)
+        return row[0], row[1]
+
+    def offers_for(self, item_ids):
+        hits = set()
+        for item_id in item_ids:
+            hits |= self.offers_by_item.get(item_id, set())
+        return [self.offers[n] for n in sorted(hits)]
+
+def compute_bill(tax, class_gross, lines=None, offers=()):
+    """Bill in paise from per-tax-class gross amounts, less any offer discounts.
+
+    ``lines`` ({item_id: line}) is only needed when ``offers`` is non-empty. Returns
+    {subtotal, discount, sgst, cgst, grand_total, discounts: [{id, name, amount}],
+    taxes: [{class, sgst_rate, cgst_rate, taxable, sgst, cgst}]}.
+    """
+    applied, line_discounts = [], {}
+    if offers:
+        remaining = {item_id: line["qty"] for item_id, line in lines.items()}
+        for offer in offers:
+            amount = offer.apply(lines, remaining, line_discounts)
+            if amount:
+                applied.append({"id": offer.id, "name": offer.name, "amount": amount})
+    class_discounts = {}
+    for item_id, amount in line_discounts.items():
+        tax_class = lines[item_id]["tax_class"]
+        class_discounts[tax_class] = class_discounts.get(tax_class, 0) + amount
+
+    taxes = []
+    for tax_class in sorted(class_gross):
+        if not class_gross[tax_class]:
+            continue
+        taxable = class_gross[tax_class] - class_discounts.get(tax_class, 0)
+        sgst, cgst = tax.split(tax_class, taxable)
+        sgst_rate, cgst_rate = tax.rates(tax_class)
+        taxes.append({"class": tax_class, "sgst_rate": format_rate(sgst_rate), "cgst_rate": format_rate(cgst_rate),
+                      "taxable": taxable, "sgst": sgst, "cgst": cgst})
+    subtotal = sum(class_gross.values())
+    discount = sum(d["amount"] for d in applied)
+    sgst = sum(t["sgst"] for t in taxes)
+    cgst = sum(t["cgst"] for t in taxes)
+    return {"subtotal": subtotal, "discount": discount, "sgst": sgst, "cgst": cgst,
+            "grand_total": subtotal - discount + sgst + cgst, "discounts": applied, "taxes": taxes}
+
+def unit_price(item):
+    """Unit price in paise of a stored order line (lines saved before paise were stored carry rupees only)."""
+    price = item.get("price_paise")
+    return to_paise(item.get("price", 0)) if price is None else price
+
+def line_amount(item):
+    """Gross paise for a stored order line (qty x unit price)."""
+    return item.get("qty", 0) * unit_price(item)
+
+def bill_from_doc(doc):
+    """The paise bill of a stored order; orders saved before bills were stored are
+    converted from their rupee totals and (single) tax rates."""
+    bill = doc.get("bill")
+    if bill:
+        return bill
+    subtotal = to_paise(doc.get("subtotal", 0))
+    sgst, cgst = to_paise(doc.get("sgst", 0)), to_paise(doc.get("cgst", 0))
+    rates = doc.get("tax_rates")
+    if rates:
+        sgst_rate, cgst_rate = (Decimal(str(rates[k])) * 100 for k in ("sgst", "cgst"))
+    else:
+        sgst_rate, cgst_rate = (TAX_CLASSES[DEFAULT_TAX_CLASS][k] for k in ("sgst", "cgst"))
+    return {"subtotal": subtotal, "discount": 0, "sgst": sgst, "cgst": cgst,
+            "grand_total": to_paise(doc.get("grand_total", 0)), "discounts": [],
+            "taxes": [{"class": DEFAULT_TAX_CLASS, "sgst_rate": format_rate(sgst_rate), "cgst_rate": format_rate(cgst_rate),
+                       "taxable": subtotal, "sgst": sgst, "cgst": cgst}]}
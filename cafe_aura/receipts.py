@@ -0,0 +1,176 @@
+"""Receipt rendering: one layout, four outputs (plain text, ESC/POS, HTML, PDF).
+
+Everything static (header, column titles, footer, printer commands) is built once per
+ReceiptRenderer; rendering an order only formats its own lines. Output depends only on
+the order (including the tax rates stored with it), so a reprint from history is
+byte-identical to the receipt printed at checkout.
+"""
+import functools
+import html
+
+from .config import RESTAURANT_NAME, CURRENCY, RECEIPT_WIDTH, PRINTER_DEVICE
+from .core import format_dt
+from .metrics import timed
+from .pricing import from_paise, line_amount, unit_price
+
+FOOTER = "Thank you for your order! Please visit again."
+
+# ESC/POS commands
+ESC_INIT = b"\x1b@"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+ESC_DOUBLE_ON = b"\x1d!\x11"
+ESC_DOUBLE_OFF = b"\x1d!\x00"
+ESC_FEED_CUT = b"\n\n\n\x1dV\x00"
+
+class ReceiptRenderer:
+    """Renders Order objects; build via get_renderer() to share the cached static blocks."""
+
+    def __init__(self, restaurant_name=RESTAURANT_NAME, currency=CURRENCY, width=RECEIPT_WIDTH):
+        self.restaurant_name = restaurant_name
+        self.currency = currency
+        self.width = width
+        name_width = width - 26
+        self._item_line = f"{{name:{name_width}}} {{qty:>3}} {{price:>8.2f}} {{total:>10.2f}}".format
+        self._name_width = name_width
+
+        stars, dashes, equals = "*" * width, "-" * width, "=" * width
+        self._rules = (dashes, equals)
+        self._header = [stars, f"\t\t{restaurant_name.upper()}", stars]
+        self._columns = [dashes, f"{'Item':{name_width}} {'Qty':>3} {'Price':>8} {'Total':>10}", dashes]
+        self._footer = [equals, FOOTER]
+
+        # Printers and standard PDF fonts have no rupee glyph.
+        self._printer_currency = "Rs." if currency == "₹" else currency
+        self._escpos_header = (ESC_INIT + ESC_ALIGN_CENTER + ESC_BOLD_ON + ESC_DOUBLE_ON
+                               + self._encode_printer(restaurant_name.upper()) + b"\n"
+                               + ESC_DOUBLE_OFF + ESC_BOLD_OFF + ESC_ALIGN_LEFT
+                               + self._encode_printer(stars) + b"\n")
+        self._escpos_footer = (ESC_ALIGN_CENTER + self._encode_printer(FOOTER) + b"\n"
+                               + ESC_ALIGN_LEFT + ESC_FEED_CUT)
+        self._html_head = (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(restaurant_name)} receipt</title>"
+            "<style>body{font-family:monospace;max-width:32em}table{width:100%;border-collapse:collapse}"
+            "td.n{text-align:right}th{text-align:left;border-bottom:1px solid #000}"
+            ".total{font-weight:bold;border-top:1px solid #000}</style></head><body>\n"
+            f"<h2 style=\"text-align:center\">{html.escape(restaurant_name)}</h2>\n"
+        )
+        self._html_foot = f"<p style=\"text-align:center\">{html.escape(FOOTER)}</p>\n</body></html>\n"
+
+    # ---------- shared pieces ----------
+    def _details(self, order):
+        return [
+            f"Order ID : {order.order_id}",
+            f"Date/Time: {format_dt(order.datetime)}",
+            f"Customer : {order.customer_name}",
+            f"Phone    : {order.phone}",
+        ]
+
+    def _item_lines(self, order):
+        lines = []
+        for item in order.items:
+            qty = item.get('qty', 0)
+            name = item.get('name', '')
+            if len(name) > self._name_width:
+                name = name[:self._name_width - 3] + '...'
+            lines.append(self._item_line(name=name, qty=qty, price=from_paise(unit_price(item)),
+                                         total=from_paise(line_amount(item))))
+        return lines
+
+    def _totals(self, order, currency):
+        bill = order.bill
+        lines = [f"Subtotal: {currency} {order.subtotal:.2f}"]
+        for discount in bill.get("discounts", ()):
+            lines.append(f"{discount['name']}: -{currency} {from_paise(discount['amount']):.2f}")
+        for tax in bill.get("taxes", ()):
+            lines.append(f"SGST ({tax['sgst_rate']}%): {currency} {from_paise(tax['sgst']):.2f}")
+            lines.append(f"CGST ({tax['cgst_rate']}%): {currency} {from_paise(tax['cgst']):.2f}")
+        return lines, f"Grand Total: {currency} {order.grand_total:.2f}"
+
+    def _body_lines(self, order, currency):
+        dashes, equals = self._rules
+        taxes, grand = self._totals(order, currency)
+        return (self._details(order) + self._columns + self._item_lines(order)
+                + [dashes] + taxes + [equals, grand])
+
+    # ---------- formats ----------
+    def render_text(self, order):
+        return "\n".join(self._header + self._body_lines(order, self.currency) + self._footer)
+
+    def render_escpos(self, order):
+        """Byte stream for an ESC/POS thermal printer (init, bold header, body, cut)."""
+        body = "\n".join(self._body_lines(order, self._printer_currency) + [self._rules[1]])
+        return self._escpos_header + self._encode_printer(body) + b"\n" + self._escpos_footer
+
+    def render_html(self, order):
+        esc = html.escape
+        rows = "".join(
+            f"<tr><td>{esc(str(i.get('name', '')))}</td><td class=\"n\">{i.get('qty', 0)}</td>"
+            f"<td class=\"n\">{from_paise(unit_price(i)):.2f}</td>"
+            f"<td class=\"n\">{from_paise(line_amount(i)):.2f}</td></tr>\n"
+            for i in order.items)
+        taxes, grand = self._totals(order, self.currency)
+        return (self._html_head
+                + "<p>" + "<br>\n".join(esc(line) for line in self._details(order)) + "</p>\n"
+                + "<table>\n<tr><th>Item</th><th>Qty</th><th>Price</th><th>Total</th></tr>\n" + rows + "</table>\n"
+                + "<p>" + "<br>\n".join(esc(line) for line in taxes) + "</p>\n"
+                + f"<p class=\"total\">{esc(grand)}</p>\n"
+                + self._html_foot)
+
+    def render_pdf(self, order):
+        """One-page PDF of the text layout (Courier), built without third-party libraries."""
+        text = self.render_text(order).replace("\t\t", "    ").replace(self.currency, self._printer_currency)
+        return _text_pdf(text.split("\n"))
+
+    def _encode_printer(self, text):
+        return text.replace(self.currency, self._printer_currency).encode("cp858", errors="replace")
+
+    def render(self, order, fmt):
+        """Render by format name: "text", "escpos", "html" or "pdf" (text/html are str)."""
+        renderer = {"text": self.render_text, "escpos": self.render_escpos,
+                    "html": self.render_html, "pdf": self.render_pdf}[fmt]
+        with timed(f"receipt.{fmt}"):
+            return renderer(order)
+
+@functools.lru_cache(maxsize=None)
+def get_renderer(restaurant_name=RESTAURANT_NAME, currency=CURRENCY, width=RECEIPT_WIDTH):
+    return ReceiptRenderer(restaurant_name, currency, width)
+
+def print_escpos(order, device=PRINTER_DEVICE):
+    """Send the ESC/POS receipt to a printer device node or a stand-in file (appended)."""
+    with open(device, "ab") as f:
+        f.write(get_renderer().render(order, "escpos"))
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _text_pdf(lines, font_size=9, leading=11, margin=24):
+    """Minimal PDF 1.4 with one page of monospaced text."""
+    char_width = font_size * 0.6  # Courier advance width
+    page_w = int(margin * 2 + char_width * max(len(line) for line in lines)) + 1
+    page_h = margin * 2 + leading * len(lines)
+    content = "BT /F1 %d Tf %d TL %d %d Td\n" % (font_size, leading, margin, page_h - margin - font_size)
+    content += "".join(f"({_pdf_escape(line)}) '\n" for line in lines) + "ET"
+    stream = content.encode("cp1252", errors="replace")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w} {page_h}] "
+        f"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>".encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
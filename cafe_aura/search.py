@@ -0,0 +1,100 @@
+"""Incremental menu search: word-prefix and trigram indexes over the catalog, plus quick codes."""
+import re
+
+QUICK_CODE_LENGTH = 3  # quick codes are fixed-width, so a complete code is unambiguous
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _trigrams(text):
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class MenuSearchIndex:
+    """Search over catalog items by name/category word prefix, substring or quick code.
+
+    Built once per catalog and patched per category on reload (see update). Lookups
+    touch only the posting sets for the query's prefixes/trigrams, never every item.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._prefixes = {}  # word prefix -> {item_id}
+        self._trigrams = {}  # trigram -> {item_id}
+        self._keys = {}  # item_id -> (prefixes, trigrams), so an item can be removed
+        self.by_code = {}
+        for item in catalog.by_id.values():
+            self._add(item)
+
+    def update(self, catalog, changed_categories):
+        """Re-index only the items of ``changed_categories`` after a menu reload."""
+        old = self.catalog
+        self.catalog = catalog
+        for category in changed_categories:
+            for item in old.items_in(category):
+                self._remove(item)
+        for category in changed_categories:
+            for item in catalog.items_in(category):
+                self._add(item)
+
+    def lookup_code(self, code):
+        return self.by_code.get(code.strip())
+
+    def search(self, query, limit=8):
+        """Items matching every word of ``query``, best first."""
+        words = _words(query)
+        if not words:
+            return []
+        matches = None
+        for word in words:
+            ids = self._match_word(word)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        code_item = self.lookup_code(query)
+        q = query.strip().lower()
+
+        def rank(item):
+            name = item["name"].lower()
+            return (item is not code_item, not name.startswith(q), name)
+
+        items = (self.catalog.get(item_id) for item_id in matches)
+        return sorted((item for item in items if item is not None), key=rank)[:limit]
+
+    def _match_word(self, word):
+        ids = set(self._prefixes.get(word, ()))
+        if len(word) >= 3:
+            grams = {word[i:i + 3] for i in range(len(word) - 2)}
+            candidates = None
+            for gram in grams:
+                posting = self._trigrams.get(gram, set())
+                candidates = posting if candidates is None else candidates & posting
+                if not candidates:
+                    break
+            for item_id in candidates or ():
+                if word in self.catalog.get(item_id)["name"].lower():
+                    ids.add(item_id)
+        return ids
+
+    def _add(self, item):
+        text = f"{item['name']} {item['category']}"
+        prefixes = {word[:i] for word in _words(text) for i in range(1, len(word) + 1)}
+        code = item.get("code")
+        if code:
+            prefixes |= {code[:i] for i in range(1, len(code) + 1)}
+            self.by_code[code] = item
+        grams = _trigrams(item["name"])
+        for key in prefixes:
+            self._prefixes.setdefault(key, set()).add(item["id"])
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(item["id"])
+        self._keys[item["id"]] = (prefixes, grams)
+
+    def _remove(self, item):
+        prefixes, grams = self._keys.pop(item["id"], ((), ()))
+        for key in prefixes:
+            self._prefixes.get(key, set()).discard(item["id"])
+        for gram in grams:
+            self._trigrams.get(gram, set()).discard(item["id"])
+        if self.by_code.get(item.get("code")) is item:
+            del self.by_code[item["code"]]
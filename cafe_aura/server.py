@@ -0,0 +1,154 @@
+"""Minimal asyncio HTTP/JSON API over OrderService.
+
+Endpoints:
+    GET  /menu                          catalog items with IDs and prices
+    POST /carts                         create a cart -> {"order_id": ...}
+    GET  /carts/<order_id>              cart lines and totals
+    POST /carts/<order_id>/items        {"item_id": ..., "qty": 1}
+    POST /carts/<order_id>/checkout     {"customer_name": ..., "phone": ...} -> order
+    GET  /orders?limit=50               newest orders from the local store
+"""
+import asyncio
+import datetime as dt
+import json
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from .service import OrderConflict
+
+MAX_BODY = 64 * 1024
+MAX_PAGE = 500  # most orders GET /orders returns
+
+def _field(body, name, kind, default):
+    """body[name] if it is a ``kind`` (default if absent); raises ValueError otherwise."""
+    value = body.get(name, default)
+    # bool is an int subclass, but true/false is never a quantity
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ValueError(f"{name!r} must be {'an integer' if kind is int else 'a string'}.")
+    return value
+
+def _json_default(value):
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    return str(value)
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class OrderApi:
+    """Routes HTTP requests to an OrderService; blocking store writes run in an executor."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def handle(self, method, path, query, body):
+        parts = [p for p in path.split("/") if p]
+        if method == "GET" and parts == ["menu"]:
+            return self.service.catalog.to_dict()
+        if method == "POST" and parts == ["carts"]:
+            return {"order_id": self.service.create_cart()}
+        if len(parts) >= 2 and parts[0] == "carts":
+            order_id = parts[1]
+            try:
+                if method == "GET" and len(parts) == 2:
+                    return self.service.cart(order_id).to_dict()
+                if method == "POST" and parts[2:] == ["items"]:
+                    item_id, qty = _field(body, "item_id", str, None), _field(body, "qty", int, 1)
+                    return self.service.add_item(order_id, item_id, qty).to_dict()
+                if method == "POST" and parts[2:] == ["checkout"]:
+                    customer_name, phone = _field(body, "customer_name", str, ""), _field(body, "phone", str, "")
+                    loop = asyncio.get_running_loop()
+                    order = await loop.run_in_executor(None, self.service.checkout, order_id, customer_name, phone)
+                    return order.to_doc()
+            except KeyError as e:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"Not found: {e.args[0]}")
+            except OrderConflict as e:
+                raise HttpError(HTTPStatus.CONFLICT, str(e))
+            except (TypeError, ValueError) as e:
+                raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        if method == "GET" and parts == ["orders"]:
+            try:
+                limit = int(query.get("limit", ["50"])[0])
+            except ValueError:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "limit must be an integer.")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.service.history, max(1, min(limit, MAX_PAGE)))
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload, default=_json_default).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def serve_client(self, reader, writer):
+        """Serve one keep-alive connection until the client closes it.
+
+        A request that cannot be framed (bad request line or Content-Length, or a body
+        over MAX_BODY) gets its error response and the connection is closed, since the
+        rest of the stream can no longer be trusted to start at a request boundary.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                try:
+                    method, target, _ = request_line.split(" ", 2)
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request."}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {"error": f"Request body over {MAX_BODY} bytes."}, False)
+                    break
+                try:
+                    raw = await reader.readexactly(length) if length else b""
+                except asyncio.IncompleteReadError:
+                    break
+
+                url = urlsplit(target)
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise ValueError("Request body must be a JSON object.")
+                    payload = await self.handle(method, url.path, parse_qs(url.query), body)
+                    status = HTTPStatus.OK
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except ValueError as e:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                except Exception as e:
+                    # a bug, not the client's fault: still answer, so the client is not left hanging
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(service, host="127.0.0.1", port=8080):
+    api = OrderApi(service)
+    server = await asyncio.start_server(api.serve_client, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,113 @@
+"""Order service shared by every POS client: the Tk till, the HTTP API and load tests."""
+import threading
+
+from .catalog import load_catalog
+from .core import Cart, Order, new_order_id
+from .events import ORDER_CREATED, order_event, status_event
+from .inventory import stock_usage
+from .metrics import timed
+from .pricing import TaxPolicy
+
+class OrderConflict(ValueError):
+    """An order_id that is already stored was checked out again with a different cart."""
+
+def _same_order(stored, doc):
+    def lines(d):
+        return sorted((i.get("item_id") or i.get("name"), i.get("qty")) for i in d.get("items", []))
+    return lines(stored) == lines(doc) and stored.get("bill", {}).get("grand_total") == doc["bill"]["grand_total"]
+
+class OrderService:
+    """Open carts plus the single checkout path that writes orders to the local store.
+
+    Carts are keyed by their order ID, which is assigned when the cart is created.
+    Safe to call from several threads (the HTTP server runs checkouts in an executor).
+    """
+
+    def __init__(self, store, sync=None, tax=None, catalog=None, events=None, customers=None, stock=None):
+        self.store = store
+        self.sync = sync
+        self.events = events  # EventPublisher for tills/kitchen displays, if any
+        self.customers = customers  # CustomerCache for header autocomplete, if any
+        self.stock = stock  # StockLevels, to refuse items that are out of stock, if any
+        self.tax = tax or TaxPolicy()
+        self.catalog = catalog or load_catalog()
+        self.carts = {}
+        self._lock = threading.Lock()
+        # never reissue a stored ID, even if the clock went back while the till was down
+        new_order_id.resume_after(store.last_order_id())
+
+    def create_cart(self):
+        order_id = new_order_id()
+        with self._lock:
+            self.carts[order_id] = Cart(self.tax, self.tax.table(self.catalog))
+        return order_id
+
+    def cart(self, order_id):
+        """The open cart for order_id; raises KeyError if there is none."""
+        with self._lock:
+            return self.carts[order_id]
+
+    def add_item(self, order_id, item_id, qty=1):
+        """Add a catalog item (price comes from the catalog); raises KeyError/ValueError."""
+        item = self.catalog.get(item_id)
+        if item is None:
+            raise KeyError(item_id)
+        if self.stock is not None and self.stock.is_out(item):
+            raise ValueError(f"{item['name']} is out of stock.")
+        table = self.tax.table(self.catalog)
+        with self._lock:
+            cart = self.carts[order_id]
+            if cart.table is not table:
+                cart.use_table(table)  # the menu was reloaded since the cart was opened
+            cart.add(item, qty)
+            return cart
+
+    def checkout(self, order_id, customer_name="", phone=""):
+        """Place the cart's order; checking out an order_id again returns the order already placed."""
+        with self._lock:
+            cart = self.carts.get(order_id)
+        if cart is None:
+            doc = self.store.get(order_id)  # a retried request whose first attempt went through
+            if doc is None:
+                raise KeyError(order_id)
+            return Order.from_doc(doc)
+        order = self.place_order(cart, order_id, customer_name, phone)
+        with self._lock:
+            self.carts.pop(order_id, None)
+        return order
+
+    @timed("order.place")
+    def place_order(self, cart, order_id, customer_name="", phone=""):
+        """Turn a cart into an Order, store it durably and wake the sync engine.
+
+        Idempotent on order_id: if the same order is already stored (a double-click on
+        Checkout, a retried request, a restored cart that had in fact gone through),
+        the stored order is returned and nothing is announced or counted again. If the
+        stored order has different lines or total, raises OrderConflict rather than
+        hand back a receipt that leaves out what was added since.
+        """
+        order = Order.from_cart(cart, order_id, customer_name, phone)
+        doc = order.to_doc()
+        doc["stock_usage"] = stock_usage(cart, self.catalog)  # taken off the inventory by the sync engine
+        if not self.store.add(doc):
+            stored = self.store.get(order_id)
+            if not _same_order(stored, doc):
+                raise OrderConflict(f"Order {order_id} was already placed with different items.")
+            return Order.from_doc(stored)
+        if self.sync is not None:
+            self.sync.notify()
+        if self.events is not None:
+            self.events.publish(order_event(ORDER_CREATED, doc))
+        if self.customers is not None:
+            self.customers.remember(doc)
+        if self.stock is not None:
+            self.stock.remember(doc)
+        return order
+
+    def set_status(self, order_id, status):
+        """Announce a kitchen status change (e.g. "ready") to every subscribed terminal."""
+        if self.events is not None:
+            self.events.publish(status_event(order_id, status))
+
+    def history(self, limit=50):
+        return self.store.recent(limit)
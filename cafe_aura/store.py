@@ -0,0 +1,187 @@
+"""Offline-first local order store (SQLite) and the background MongoDB sync engine."""
+import datetime as dt
+import json
+import queue
+import sqlite3
+import threading
+
+from . import db
+from .analytics import update_rollups
+from .customers import update_customers
+from .events import stock_event
+from .inventory import update_inventory
+from .config import SYNC_BATCH_SIZE, SYNC_IDLE_INTERVAL, SYNC_MAX_BACKOFF
+
+def _encode_doc(doc):
+    """JSON text for an order doc (datetimes become {"$date": iso})."""
+    return json.dumps({k: ({"$date": v.isoformat()} if isinstance(v, dt.datetime) else v) for k, v in doc.items()})
+
+def _decode_doc(text):
+    return {k: (dt.datetime.fromisoformat(v["$date"]) if isinstance(v, dict) and "$date" in v else v)
+            for k, v in json.loads(text).items()}
+
+class LocalOrderStore:
+    """Embedded SQLite store that every order is written to before it goes anywhere else."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            " order_id TEXT PRIMARY KEY,"
+            " created_at TEXT NOT NULL,"
+            " doc TEXT NOT NULL,"
+            " synced INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_unsynced ON orders (synced)")
+        # 1 until the order's stock_usage has been taken off the inventory (see OrderSync._apply_stock)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(orders)")}
+        if "stock_pending" not in columns:
+            self._conn.execute("ALTER TABLE orders ADD COLUMN stock_pending INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_stock_pending ON orders (stock_pending)")
+        self._conn.commit()
+
+    def add(self, order_doc):
+        """Durably store an order; returns False (and changes nothing) if its order_id is already stored."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO orders (order_id, created_at, doc, stock_pending) VALUES (?, ?, ?, ?)",
+                (order_doc["order_id"], order_doc["datetime"].isoformat(), _encode_doc(order_doc),
+                 1 if order_doc.get("stock_usage") else 0),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, order_id):
+        """The stored order doc for order_id, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT doc FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return _decode_doc(row[0]) if row else None
+
+    def last_order_id(self):
+        """The highest time-ordered order ID stored (the newest order), or None."""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(order_id) FROM orders WHERE length(order_id) = 16").fetchone()[0]
+
+    def unsynced(self, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc FROM orders WHERE synced = 0 ORDER BY rowid LIMIT ?", (limit,)
+            ).fetchall()
+        return [_decode_doc(doc) for (doc,) in rows]
+
+    def unsynced_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM orders WHERE synced = 0").fetchone()[0]
+
+    def recent(self, limit=50):
+        """Newest orders first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT doc FROM orders ORDER BY rowid DESC LIMIT ?", (limit,)).fetchall()
+        return [_decode_doc(doc) for (doc,) in rows]
+
+    def mark_synced(self, order_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE orders SET synced = 1 WHERE order_id = ?", [(i,) for i in order_ids])
+
+    def stock_pending(self, limit):
+        """Synced orders whose stock has not been taken off the inventory yet, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc FROM orders WHERE stock_pending = 1 AND synced = 1 ORDER BY rowid LIMIT ?", (limit,)
+            ).fetchall()
+        return [_decode_doc(doc) for (doc,) in rows]
+
+    def pending_stock_usage(self):
+        """{sku: qty} used by stored orders whose stock has not been taken off the inventory yet."""
+        with self._lock:
+            rows = self._conn.execute("SELECT doc FROM orders WHERE stock_pending = 1").fetchall()
+        usage = {}
+        for (doc,) in rows:
+            for sku, qty in (json.loads(doc).get("stock_usage") or {}).items():
+                usage[sku] = usage.get(sku, 0) + qty
+        return usage
+
+    def mark_stock_applied(self, order_ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE orders SET stock_pending = 0 WHERE order_id = ?", [(i,) for i in order_ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class OrderSync(threading.Thread):
+    """Background sync engine: streams unsynced orders to MongoDB in batches while it is up.
+
+    Connecting/reconnecting is left to the db health monitor; this thread just waits
+    until ``db.mongo_connected`` says the server is reachable.
+
+    Results are pushed onto ``results`` as (synced_order_ids, backlog) tuples; the Tk
+    side polls that queue with after() so nothing here touches widgets. With an
+    EventPublisher as ``events``, each inventory write is announced to the other tills.
+    """
+
+    def __init__(self, store, events=None):
+        super().__init__(name="order-sync", daemon=True)
+        self.store = store
+        self.events = events
+        self.results = queue.Queue()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def notify(self):
+        """Ask for a sync pass now instead of at the next idle tick."""
+        self._wake.set()
+
+    def backlog(self):
+        return self.store.unsynced_count()
+
+    def stop(self, timeout=2):
+        self._stop_event.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.store.close()
+
+    def _apply_stock(self):
+        """Take synced orders' stock off the inventory. Nothing rebuilds stock, so an order
+        stays pending in the local store until its decrement has been written."""
+        while True:
+            docs = self.store.stock_pending(SYNC_BATCH_SIZE)
+            if not docs or not update_inventory(docs):
+                return
+            self.store.mark_stock_applied([doc["order_id"] for doc in docs])
+            if self.events is not None:
+                self.events.publish(stock_event({sku for doc in docs for sku in doc.get("stock_usage") or {}}))
+            if len(docs) < SYNC_BATCH_SIZE:
+                return
+
+    def run(self):
+        if not db.PYMONGO_AVAILABLE:
+            return  # orders stay in the local store until pymongo is installed
+        backoff = 1
+        while not self._stop_event.is_set():
+            if not db.mongo_connected:
+                self._stop_event.wait(1)
+                continue
+            docs = self.store.unsynced(SYNC_BATCH_SIZE)
+            inserted = db.upsert_orders_to_mongo(docs) if docs else None
+            if inserted is not None:
+                # Best-effort: a missed increment is repaired by rebuild_rollups.
+                update_rollups(inserted)
+                update_customers(inserted)
+                order_ids = [doc["order_id"] for doc in docs]
+                self.store.mark_synced(order_ids)
+                self._apply_stock()
+                self.results.put((order_ids, self.backlog()))
+                backoff = 1
+            elif not docs:
+                backoff = 1
+                self._apply_stock()  # retries decrements that failed on an earlier pass
+                self._wake.wait(SYNC_IDLE_INTERVAL)
+                self._wake.clear()
+            else:
+                self.results.put(([], self.backlog()))
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, SYNC_MAX_BACKOFF)
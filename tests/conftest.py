@@ -0,0 +1,30 @@
+import pytest
+
+from cafe_aura import db
+from cafe_aura.store import LocalOrderStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalOrderStore(str(tmp_path / "orders.db"))
+    yield store
+    store.close()
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """An in-memory MongoDB (mongomock) wired into the db module, as if connected.
+
+    Skipped when mongomock or pymongo (for UpdateOne, bson and the error classes) is
+    not installed. Restores the db module's globals afterwards.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    pytest.importorskip("pymongo")
+    db.load_pymongo()
+    database = mongomock.MongoClient().cafe_aura
+    for name, collection in (("mongo_collection", "orders"), ("mongo_rollups", "rollups"),
+                             ("mongo_customers", "customers"), ("mongo_archive", "orders_archive"),
+                             ("mongo_inventory", "inventory")):
+        monkeypatch.setattr(db, name, database[collection])
+    monkeypatch.setattr(db, "mongo_connected", True)
+    monkeypatch.setattr(db, "mongo_stats", {**db.mongo_stats, "op_errors": 0, "last_error": None})
+    monkeypatch.setattr(db, "_health_monitor", None)
+    return database
@@ -0,0 +1,55 @@
+import datetime as dt
+
+import pytest
+
+from cafe_aura import db
+from cafe_aura.analytics import rebuild_rollups, update_rollups
+from cafe_aura.catalog import Catalog
+
+CATALOG = Catalog([{"id": "mango", "code": "1", "name": "Mango Shake", "category": "Shakes", "price": 90}], version=1)
+DAY = dt.date(2025, 8, 16)
+
+def order(order_id="A"):
+    # Lines stored without a category, as orders saved before categories were
+    return {"order_id": order_id, "datetime": dt.datetime(2025, 8, 16, 13),
+            "items": [{"name": "Mango Shake", "qty": 2, "price_paise": 9000},
+                      {"name": "Mystery", "qty": 1, "price_paise": 100}],
+            "bill": {"subtotal": 18100, "discount": 0, "sgst": 0, "cgst": 0, "grand_total": 18100}}
+
+EXPECTED_CATEGORIES = {"Shakes": {"qty": 2, "amount_paise": 18000}, "Other": {"qty": 1, "amount_paise": 100}}
+
+def day_rollup(mongo):
+    return mongo.rollups.find_one({"_id": "day:2025-08-16"})
+
+def test_update_rollups_takes_categories_from_the_catalog(mongo):
+    assert update_rollups([order()], CATALOG)
+    day = day_rollup(mongo)
+    assert day["orders"] == 1 and day["grand_total_paise"] == 18100
+    assert day["categories"] == EXPECTED_CATEGORIES
+    assert mongo.rollups.find_one({"_id": "hour:2025-08-16T13"})["categories"] == EXPECTED_CATEGORIES
+
+def test_rebuild_matches_incremental_rollups(mongo):
+    update_rollups([order("A"), order("B")], CATALOG)
+    incremental = day_rollup(mongo)
+    mongo.orders.insert_many([order("A"), order("B")])
+    assert rebuild_rollups(DAY, DAY, CATALOG) == 2
+    rebuilt = day_rollup(mongo)
+    for field in ("orders", "subtotal_paise", "grand_total_paise", "items", "categories"):
+        assert rebuilt[field] == incremental[field]
+
+def test_rebuild_refuses_archived_days(mongo):
+    update_rollups([order()], CATALOG)
+    mongo.orders_archive.insert_one(order())
+    with pytest.raises(ValueError):
+        rebuild_rollups(DAY, DAY, CATALOG)
+    assert day_rollup(mongo)["orders"] == 1
+    assert rebuild_rollups(DAY + dt.timedelta(days=1), DAY + dt.timedelta(days=1), CATALOG) == 0
+
+def test_failed_rollup_write_is_recorded(mongo, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(db.mongo_rollups, "bulk_write", fail)
+    assert update_rollups([order()], CATALOG) is False
+    assert db.mongo_connected is False
+    assert db.mongo_stats["op_errors"] == 1
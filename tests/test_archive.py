@@ -0,0 +1,66 @@
+import datetime as dt
+
+import pytest
+
+from cafe_aura import archive, db
+
+DAY = dt.datetime(2025, 1, 1)
+
+def insert_orders(mongo, n, start=DAY):
+    docs = [{"order_id": f"O{i:03d}", "datetime": start + dt.timedelta(hours=i), "customer_name": f"C{i}",
+             "phone": "-", "grand_total": 100.0 + i, "items": []} for i in range(n)]
+    mongo.orders.insert_many(docs)
+    return docs
+
+def page_through(limit, query=None):
+    ids, after = [], None
+    while True:
+        docs, after = archive.fetch_history_page(after, limit, query)
+        ids += [d["order_id"] for d in docs]
+        if after is None:
+            return ids
+
+def test_pages_run_newest_first_across_both_tiers(mongo):
+    insert_orders(mongo, 7)
+    assert archive.archive_orders(DAY + dt.timedelta(hours=3))["count"] == 3
+    assert mongo.orders.count_documents({}) == 4
+    assert page_through(limit=3) == [f"O{i:03d}" for i in reversed(range(7))]
+
+def test_archive_is_skipped_when_the_date_range_ends_after_it(mongo):
+    insert_orders(mongo, 6)
+    archive.archive_orders(DAY + dt.timedelta(hours=3))
+    query = db.build_order_query(date_from=DAY.date() + dt.timedelta(days=1))
+    assert page_through(limit=2, query=query) == []
+    assert page_through(limit=2, query={"datetime": {"$gte": DAY + dt.timedelta(hours=4)}}) == ["O005", "O004"]
+
+def test_archived_orders_read_back_in_full(mongo):
+    [first, *_] = insert_orders(mongo, 2)
+    archive.archive_orders(DAY + dt.timedelta(hours=1))
+    doc = archive.fetch_order("O000")
+    assert doc["customer_name"] == first["customer_name"] and doc["items"] == []
+    assert archive.newest_archived() == DAY
+
+def test_a_db_error_is_raised_so_the_page_can_be_retried(mongo, monkeypatch):
+    insert_orders(mongo, 5)
+    docs, after = archive.fetch_history_page(None, 2)
+    find, down = db.mongo_collection.find, [True]
+
+    def flaky_find(*args, **kwargs):
+        if down[0]:
+            raise RuntimeError("connection reset")
+        return find(*args, **kwargs)
+
+    monkeypatch.setattr(db.mongo_collection, "find", flaky_find)
+    with pytest.raises(RuntimeError):
+        archive.fetch_history_page(after, 2)
+    assert not db.mongo_connected and db.mongo_stats["op_errors"] == 1
+    down[0] = False
+    monkeypatch.setattr(db, "mongo_connected", True)  # the health monitor's next ping
+    assert [d["order_id"] for d in archive.fetch_history_page(after, 2)[0]] == ["O002", "O001"]
+
+def test_archived_orders_are_not_synced_again(mongo):
+    docs = insert_orders(mongo, 2)
+    archive.archive_orders(DAY + dt.timedelta(hours=1))
+    resynced = db.upsert_orders_to_mongo([{k: v for k, v in doc.items() if k != "_id"} for doc in docs])
+    assert [d["order_id"] for d in resynced] == []
+    assert mongo.orders.count_documents({}) == 1
@@ -0,0 +1,55 @@
+import datetime as dt
+
+import pytest
+
+from cafe_aura import db
+from cafe_aura.customers import normalize_phone, update_customers
+
+def order(order_id, phone, name="Riya", total=50000, minute=0):
+    return {"order_id": order_id, "datetime": dt.datetime(2025, 8, 16, 13, minute), "customer_name": name,
+            "phone": phone, "items": [{"item_id": "cola", "name": "Cola", "qty": 2}], "bill": {"grand_total": total}}
+
+@pytest.mark.parametrize("raw, phone", [("98765 43210", "9876543210"), ("+91 98765-43210", "9876543210"),
+                                        ("09876543210", "9876543210"), ("-", None), ("123", None), (None, None)])
+def test_normalize_phone(raw, phone):
+    assert normalize_phone(raw) == phone
+
+def test_orders_fold_into_one_doc_per_phone(mongo):
+    assert update_customers([order("A", "98765 43210", minute=1), order("B", "-"),
+                             order("C", "+91 9876543210", name="Riya S", total=20000, minute=2)])
+    [doc] = mongo.customers.find({}, {"_id": 0})
+    assert doc["phone"] == "9876543210" and doc["visits"] == 2 and doc["spend_paise"] == 70000
+    assert doc["name"] == "Riya S" and doc["last_order_id"] == "C"
+    assert doc["first_visit"] == dt.datetime(2025, 8, 16, 13, 1)
+
+class RacingCustomers:
+    """Another till inserts ``phone`` right before this till's upsert of it (op ``index``) lands."""
+
+    def __init__(self, collection, phone, index):
+        self.collection, self.phone, self.index = collection, phone, index
+
+    def bulk_write(self, ops, ordered=True):
+        if self.phone is None:
+            return self.collection.bulk_write(ops, ordered=ordered)
+        index = self.index
+        self.collection.bulk_write(ops[:index], ordered=True)
+        self.collection.insert_one({"phone": self.phone, "visits": 1, "spend_paise": 100})
+        self.phone = None
+        raise db.BulkWriteError({"writeErrors": [{"index": index, "code": db.DUPLICATE_KEY, "errmsg": "E11000"}]})
+
+def test_a_lost_upsert_race_is_retried_as_an_update(mongo, monkeypatch):
+    mongo.customers.create_index("phone", unique=True)
+    monkeypatch.setattr(db, "mongo_customers", RacingCustomers(mongo.customers, "9876500002", 1))
+    assert update_customers([order("A", "9876500001"), order("B", "9876500002"), order("C", "9876500003")])
+    visits = {d["phone"]: (d["visits"], d["spend_paise"]) for d in mongo.customers.find()}
+    assert visits == {"9876500001": (1, 50000), "9876500002": (2, 50100), "9876500003": (1, 50000)}
+    assert db.mongo_connected and db.mongo_stats["op_errors"] == 0
+
+def test_other_write_errors_are_reported(mongo, monkeypatch):
+    class Broken:
+        def bulk_write(self, ops, ordered=True):
+            raise db.BulkWriteError({"writeErrors": [{"index": 0, "code": 2, "errmsg": "bad update"}]})
+
+    monkeypatch.setattr(db, "mongo_customers", Broken())
+    assert not update_customers([order("A", "9876500001")])
+    assert db.mongo_stats["op_errors"] == 1
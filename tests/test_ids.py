@@ -0,0 +1,87 @@
+import datetime as dt
+import threading
+
+import pytest
+
+from cafe_aura.ids import ID_LENGTH, OrderIdGenerator, decode_id, encode_id, is_legacy_id, order_id_time
+
+class FakeClock:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms * 1_000_000
+
+def test_encode_decode_round_trip():
+    order_id = encode_id(1_755_330_000_123, 42, 7)
+    assert len(order_id) == ID_LENGTH
+    assert decode_id(order_id) == (1_755_330_000_123, 42, 7)
+    assert decode_id(order_id.lower()) == (1_755_330_000_123, 42, 7)
+
+@pytest.mark.parametrize("bad", ["", "1A2B3C4D", "0123456789ABCDEU"])
+def test_decode_rejects_other_ids(bad):
+    with pytest.raises(ValueError):
+        decode_id(bad)
+
+def test_legacy_ids_have_no_time():
+    assert is_legacy_id("1a2b3c4d")
+    assert order_id_time(encode_id(0, 1, 0)) == dt.datetime.fromtimestamp(0)
+
+def test_ids_sort_by_time_then_terminal():
+    ids = [encode_id(ms, terminal, seq) for ms, terminal, seq in
+           [(1000, 1, 65535), (1001, 1, 0), (1001, 2, 0), (2 ** 40, 1, 0)]]
+    assert sorted(ids) == ids
+
+def test_strictly_increasing_within_a_millisecond():
+    generate = OrderIdGenerator(terminal=5, clock=FakeClock(1000))
+    ids = [generate() for _ in range(1000)]
+    assert ids == sorted(set(ids))
+    assert {decode_id(i)[0] for i in ids} == {1000}
+    assert {decode_id(i)[1] for i in ids} == {5}
+
+def test_clock_stepping_back_never_goes_backwards():
+    clock = FakeClock(5000)
+    generate = OrderIdGenerator(terminal=1, clock=clock)
+    first = generate()
+    clock.ms = 4000
+    second = generate()
+    assert second > first
+    assert decode_id(second)[0] == 5000
+
+def test_sequence_overflow_moves_to_the_next_millisecond():
+    generate = OrderIdGenerator(terminal=1, clock=FakeClock(1000))
+    ids = [generate() for _ in range(1 << 16)]
+    assert ids == sorted(set(ids))
+    assert decode_id(ids[-1])[0] == 1001
+
+def test_unique_across_threads():
+    generate = OrderIdGenerator(terminal=1)
+    results = []
+
+    def worker():
+        results.extend(generate() for _ in range(2000))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(results)) == 8000
+
+def test_terminal_number_must_fit():
+    with pytest.raises(ValueError):
+        OrderIdGenerator(terminal=1 << 16)
+
+def test_resume_after_an_id_issued_before_a_restart():
+    before = OrderIdGenerator(terminal=1, clock=FakeClock(5000))
+    last = before()
+    restarted = OrderIdGenerator(terminal=1, clock=FakeClock(4000))  # clock set back meanwhile
+    restarted.resume_after(last)
+    assert restarted() > last
+
+def test_resume_after_ignores_legacy_and_older_ids():
+    generate = OrderIdGenerator(terminal=1, clock=FakeClock(5000))
+    generate.resume_after(None)
+    generate.resume_after("1a2b3c4d")
+    generate.resume_after(encode_id(1000, 1, 0))
+    assert decode_id(generate())[0] == 5000
@@ -0,0 +1,78 @@
+import datetime as dt
+
+from cafe_aura import db
+from cafe_aura.catalog import Catalog
+from cafe_aura.inventory import LOW, OUT, StockLevels, fetch_stock, restock, set_stock, sku_state, stock_usage
+from cafe_aura.store import OrderSync
+
+PIZZA = {"id": "pizza", "code": "101", "name": "Volcano Pizza", "category": "Pizza", "price": 200,
+         "recipe": {"base": 1, "cheese": 0.5}}
+COLA = {"id": "cola", "code": "201", "name": "Cola", "category": "Drinks", "price": 40}
+CATALOG = Catalog([PIZZA, COLA], version=1)
+
+class Publisher:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+def order(order_id, usage):
+    return {"order_id": order_id, "datetime": dt.datetime(2025, 8, 16, 13), "items": [], "stock_usage": usage}
+
+def test_stock_usage_follows_recipes():
+    cart = [{"item_id": "pizza", "qty": 2}, {"item_id": "cola", "qty": 3}, {"item_id": "gone", "qty": 1}]
+    assert stock_usage(cart, CATALOG) == {"base": 2, "cheese": 1.0, "cola": 3, "gone": 1}
+
+def test_sku_state():
+    assert [sku_state({"stock": s, "low": 2}) for s in (-1, 0.5, 1, 2, 3)] == [OUT, OUT, LOW, LOW, None]
+    assert sku_state({"stock": 1}, qty=2) == OUT
+
+def test_levels_flag_items_and_count_portions():
+    levels = StockLevels()
+    levels.update({"base": {"stock": 10, "low": 2}, "cheese": {"stock": 1, "low": 0}})
+    assert levels.portions(PIZZA) == 2
+    assert levels.state(PIZZA) is None
+    assert levels.state(COLA) is None and levels.portions(COLA) is None  # untracked
+    levels.remember(order("A", {"cheese": 0.5}))
+    assert levels.flags(CATALOG) == {} and levels.portions(PIZZA) == 1
+    levels.remember(order("B", {"cheese": 0.5}))
+    assert levels.flags(CATALOG) == {"pizza": (OUT, 0)}
+
+def test_refresh_keeps_unsynced_deductions():
+    levels = StockLevels()
+    levels.update({"cola": {"stock": 5, "low": 0}}, pending={"cola": 3, "untracked": 1})
+    assert levels.portions(COLA) == 2
+
+def test_sync_applies_stock_once_and_retries_failures(mongo, store, monkeypatch):
+    mongo.inventory.insert_many([{"_id": "base", "stock": 10}, {"_id": "cheese", "stock": 4}])
+    store.add(order("A", {"base": 1, "cheese": 0.5}))
+    store.add(order("B", {"base": 2, "nobody-stocks-this": 1}))
+    store.mark_synced(["A", "B"])
+    publisher = Publisher()
+    sync = OrderSync(store, publisher)
+
+    bulk_write = db.mongo_inventory.bulk_write
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(db.mongo_inventory, "bulk_write", fail)
+    sync._apply_stock()
+    assert store.pending_stock_usage() == {"base": 3, "cheese": 0.5, "nobody-stocks-this": 1}
+    assert publisher.events == []
+
+    monkeypatch.setattr(db.mongo_inventory, "bulk_write", bulk_write)
+    sync._apply_stock()
+    sync._apply_stock()  # nothing left: no second decrement
+    assert {d["_id"]: d["stock"] for d in mongo.inventory.find()} == {"base": 7, "cheese": 3.5}
+    assert store.pending_stock_usage() == {}
+    assert publisher.events[0]["skus"] == ["base", "cheese", "nobody-stocks-this"]
+
+def test_restock_and_stocktake(mongo):
+    restock("cola", 12, name="Cola")
+    restock("cola", 3)
+    set_stock("cola", low=4)
+    assert fetch_stock()["cola"]["stock"] == 15 and fetch_stock()["cola"]["low"] == 4
+    set_stock("cola", stock=2)
+    assert sku_state(fetch_stock()["cola"]) == LOW
@@ -0,0 +1,47 @@
+import pytest
+
+from cafe_aura.journal import CartJournal
+
+PIZZA = {"id": "pizza", "name": "Volcano Pizza", "category": "Pizza", "price": 200}
+COFFEE = {"id": "coffee", "name": "Cold Coffee", "category": "Drinks", "price": 120}
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = CartJournal(str(tmp_path / "cart.journal"))
+    yield journal
+    journal.close()
+
+def test_replays_the_open_cart(journal):
+    journal.begin("A")
+    journal.add(PIZZA, 1)
+    journal.add(COFFEE, 2)
+    journal.add(PIZZA, 2)
+    journal.remove("coffee")
+    journal.customer("Riya", "98")
+    assert journal.recover() == {"order_id": "A", "customer_name": "Riya", "phone": "98", "lines": [(PIZZA, 3)]}
+
+def test_begin_drops_the_previous_order(journal):
+    journal.begin("A")
+    journal.add(PIZZA, 1)
+    journal.begin("B")
+    journal.add(COFFEE, 1)
+    assert journal.recover()["order_id"] == "B"
+    assert journal.recover()["lines"] == [(COFFEE, 1)]
+
+def test_nothing_to_recover(journal):
+    assert journal.recover() is None
+    journal.begin("A")
+    assert journal.recover() is None
+    journal.add(PIZZA, 1)
+    journal.clear()
+    assert journal.recover() is None
+
+def test_torn_last_line_is_skipped(journal):
+    journal.begin("A")
+    journal.add(PIZZA, 1)
+    journal.add(COFFEE, 1)
+    journal.close()
+    with open(journal.path, "rb+") as f:  # the crash cut the last write short
+        f.seek(-10, 2)
+        f.truncate()
+    assert journal.recover()["lines"] == [(PIZZA, 1)]
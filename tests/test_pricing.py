@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+from cafe_aura.catalog import Catalog
+from cafe_aura.core import Cart
+from cafe_aura.pricing import TaxPolicy, compile_offer, format_rate, from_paise, percent_of, to_paise
+
+TAX = TaxPolicy(classes={"standard": {"sgst": "9", "cgst": "9"}, "reduced": {"sgst": "2.5", "cgst": "2.5"}},
+                category_classes={}, default_class="standard")
+
+ITEMS = [
+    {"id": "pizza", "code": "101", "name": "Volcano Pizza", "category": "Pizza", "price": 200},
+    {"id": "coffee", "code": "201", "name": "Cold Coffee", "category": "Drinks", "price": 120},
+    {"id": "water", "code": "202", "name": "Water", "category": "Drinks", "price": "19.99", "tax_class": "reduced"},
+]
+
+def cart_for(offers=(), **lines):
+    catalog = Catalog(ITEMS, version="test", offers=offers)
+    cart = Cart(TAX, TAX.table(catalog))
+    for item_id, qty in lines.items():
+        cart.add(catalog.get(item_id), qty)
+    return cart
+
+@pytest.mark.parametrize("amount, paise", [(199, 19900), ("19.99", 1999), (2.675, 268), ("0.005", 1), (Decimal("0.004"), 0)])
+def test_to_paise_rounds_half_up(amount, paise):
+    assert to_paise(amount) == paise
+
+def test_from_paise_is_exact():
+    assert from_paise(70797) == Decimal("707.97")
+    assert f"{from_paise(5):.2f}" == "0.05"
+
+def test_percent_of_rounds_half_up():
+    assert percent_of(5, "50") == 3
+    assert percent_of(59997, "9") == 5400
+
+def test_format_rate():
+    assert format_rate("9.00") == "9"
+    assert format_rate(Decimal("2.50")) == "2.5"
+
+def test_bill_taxes_each_class_once():
+    bill = cart_for(pizza=3, water=2).bill()
+    assert bill["subtotal"] == 60000 + 3998
+    assert [(t["class"], t["taxable"], t["sgst"], t["cgst"]) for t in bill["taxes"]] == [
+        ("reduced", 3998, 100, 100),  # 2.5% of 39.98 = 0.9995 -> 1.00
+        ("standard", 60000, 5400, 5400),
+    ]
+    assert bill["grand_total"] == 63998 + 200 + 10800
+
+def test_combo_splits_saving_by_list_price():
+    combo = {"id": "meal", "name": "Meal", "combo": {"pizza": 1, "coffee": 1}, "price": 299}
+    cart = cart_for([combo], pizza=1, coffee=1)
+    bill = cart.bill()
+    assert bill["discounts"] == [{"id": "meal", "name": "Meal", "amount": 2100}]
+    assert bill["sgst"] == bill["cgst"] == 2691  # 9% of 299.00
+    assert bill["grand_total"] == 29900 + 2 * 2691
+
+def test_combo_claims_units_before_percent_offers():
+    offers = [{"id": "drinks10", "percent": 10, "category": "Drinks"},
+              {"id": "meal", "combo": {"pizza": 1, "coffee": 1}, "price": 299}]
+    bill = cart_for(offers, pizza=1, coffee=2).bill()
+    assert [(d["id"], d["amount"]) for d in bill["discounts"]] == [("meal", 2100), ("drinks10", 1200)]
+
+def test_cart_totals_follow_adds_and_removes():
+    cart = cart_for(pizza=1, coffee=1)
+    cart.add(cart.table.catalog.get("pizza"), 2)
+    cart.remove("coffee")
+    assert cart.get("pizza")["qty"] == 3
+    assert cart.totals() == (Decimal("600.00"), Decimal("54.00"), Decimal("54.00"), Decimal("708.00"))
+
+@pytest.mark.parametrize("spec", [{"id": "x", "percent": 0, "items": ["pizza"]}, {"id": "x", "percent": 10},
+                                  {"id": "x", "combo": {"pizza": 0}, "price": 100}, {"percent": 10}])
+def test_bad_offers_are_rejected(spec):
+    with pytest.raises(ValueError):
+        compile_offer(spec)
@@ -0,0 +1,50 @@
+import pytest
+
+from cafe_aura.catalog import Catalog
+from cafe_aura.search import MenuSearchIndex
+
+ITEMS = [
+    {"id": "volcano-pizza", "code": "101", "name": "Volcano Pizza", "category": "Pizza", "price": 200},
+    {"id": "corn-pizza", "code": "102", "name": "Corn Pizza", "category": "Pizza", "price": 150},
+    {"id": "cold-coffee", "code": "201", "name": "Cold Coffee", "category": "Drinks", "price": 120},
+    {"id": "pizza-fries", "code": "301", "name": "Pizza Fries", "category": "Sides", "price": 90},
+]
+
+@pytest.fixture
+def index():
+    return MenuSearchIndex(Catalog(ITEMS, version=1))
+
+def names(items):
+    return [item["name"] for item in items]
+
+def test_word_prefixes_of_name_and_category(index):
+    assert names(index.search("co")) == ["Cold Coffee", "Corn Pizza"]
+    assert names(index.search("drin")) == ["Cold Coffee"]
+
+def test_every_word_must_match(index):
+    assert names(index.search("pi co")) == ["Corn Pizza"]
+    assert index.search("corn coffee") == []
+
+def test_substring_inside_a_word(index):
+    assert names(index.search("lcan")) == ["Volcano Pizza"]
+
+def test_names_starting_with_the_query_rank_first(index):
+    assert names(index.search("pizza")) == ["Pizza Fries", "Corn Pizza", "Volcano Pizza"]
+
+def test_quick_code(index):
+    assert index.lookup_code(" 201 ")["name"] == "Cold Coffee"
+    assert names(index.search("10")) == ["Corn Pizza", "Volcano Pizza"]
+    assert names(index.search("102"))[0] == "Corn Pizza"
+
+def test_blank_query_and_limit(index):
+    assert index.search("  ") == []
+    assert len(index.search("pizza", limit=2)) == 2
+
+def test_update_reindexes_only_changed_categories(index):
+    items = [dict(item, name="Mango Shake", code="202") if item["id"] == "cold-coffee" else item for item in ITEMS]
+    catalog = Catalog(items, version=2)
+    index.update(catalog, index.catalog.changed_categories(catalog))
+    assert index.search("coffee") == []
+    assert index.lookup_code("201") is None
+    assert names(index.search("mango")) == ["Mango Shake"]
+    assert index.lookup_code("202")["name"] == "Mango Shake"
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from cafe_aura.catalog import Catalog
+from cafe_aura.server import MAX_BODY, OrderApi
+from cafe_aura.service import OrderService
+
+ITEMS = [{"id": "pizza", "code": "101", "name": "Volcano Pizza", "category": "Pizza", "price": 200}]
+
+@pytest.fixture
+def service(store):
+    return OrderService(store, catalog=Catalog(ITEMS, version=1))
+
+def exchange(service, *requests):
+    """Send raw requests over one connection each; [(status, payload)] back."""
+    async def run():
+        server = await asyncio.start_server(OrderApi(service).serve_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        responses = []
+        async with server:
+            for raw in requests:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(raw)
+                await writer.drain()
+                data = await asyncio.wait_for(reader.read(), 5)  # the server closes after answering
+                writer.close()
+                head, _, body = data.partition(b"\r\n\r\n")
+                responses.append((int(head.split()[1]), json.loads(body) if body else None))
+        return responses
+    return asyncio.run(run())
+
+def request(method, path, body=None):
+    data = b"" if body is None else json.dumps(body).encode()
+    return (f"{method} {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(data)}\r\n\r\n"
+            .encode() + data)
+
+def test_add_and_checkout(service):
+    order_id = service.create_cart()
+    (status, cart), (checkout_status, order) = exchange(
+        service, request("POST", f"/carts/{order_id}/items", {"item_id": "pizza", "qty": 2}),
+        request("POST", f"/carts/{order_id}/checkout", {"customer_name": "Riya"}))
+    assert status == 200 and cart["items"][0]["qty"] == 2
+    assert checkout_status == 200 and order["order_id"] == order_id and order["customer_name"] == "Riya"
+
+@pytest.mark.parametrize("body", [{"item_id": "pizza", "qty": 1.7}, {"item_id": "pizza", "qty": True},
+                                  {"item_id": "pizza", "qty": "2"}, {"item_id": ["pizza"]}, {"qty": 1}])
+def test_bad_item_bodies_are_400(service, body):
+    order_id = service.create_cart()
+    [(status, payload)] = exchange(service, request("POST", f"/carts/{order_id}/items", body))
+    assert status == 400 and "error" in payload
+    assert len(service.cart(order_id)) == 0
+
+@pytest.mark.parametrize("body", [{"customer_name": 1}, {"phone": ["98"]}, {"customer_name": None}])
+def test_bad_checkout_bodies_are_400(service, store, body):
+    order_id = service.create_cart()
+    service.add_item(order_id, "pizza")
+    [(status, _)] = exchange(service, request("POST", f"/carts/{order_id}/checkout", body))
+    assert status == 400
+    assert store.get(order_id) is None
+
+def test_orders_limit_is_clamped(service):
+    for _ in range(3):
+        order_id = service.create_cart()
+        service.add_item(order_id, "pizza")
+        service.checkout(order_id)
+    responses = exchange(service, request("GET", "/orders?limit=-1"), request("GET", "/orders?limit=2"),
+                         request("GET", "/orders?limit=x"))
+    assert [(status, len(payload) if status == 200 else None) for status, payload in responses] == [
+        (200, 1), (200, 2), (400, None)]
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"POST /carts HTTP/1.1\r\nContent-Length: x\r\n\r\n", 400),
+    (b"POST /carts HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+    (b"POST /carts HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1), 413),
+    (b"POST /carts HTTP/1.1\r\nConnection: close\r\nContent-Length: 5\r\n\r\n[1,2]", 400),
+    (b"POST /carts HTTP/1.1\r\nConnection: close\r\nContent-Length: 3\r\n\r\n{no", 400),
+])
+def test_malformed_requests(service, raw, status):
+    assert exchange(service, raw)[0][0] == status
+
+def test_unknown_cart_and_route(service):
+    responses = exchange(service, request("POST", "/carts/nope/items", {"item_id": "pizza"}), request("GET", "/nope"))
+    assert [status for status, _ in responses] == [404, 404]
@@ -0,0 +1,96 @@
+import datetime as dt
+
+import pytest
+
+from cafe_aura.catalog import Catalog
+from cafe_aura.pricing import TaxPolicy
+from cafe_aura.service import OrderConflict, OrderService
+
+ITEMS = [
+    {"id": "pizza", "code": "101", "name": "Volcano Pizza", "category": "Pizza", "price": 200,
+     "recipe": {"pizza-base": 1, "cheese": 0.5}},
+    {"id": "coffee", "code": "201", "name": "Cold Coffee", "category": "Drinks", "price": 120},
+]
+
+class Recorder:
+    """Stands in for the sync engine and the event publisher."""
+
+    def __init__(self):
+        self.events = []
+        self.wakeups = 0
+
+    def notify(self):
+        self.wakeups += 1
+
+    def publish(self, event):
+        self.events.append(event)
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+@pytest.fixture
+def service(store, recorder):
+    return OrderService(store, sync=recorder, tax=TaxPolicy(), catalog=Catalog(ITEMS, version=1), events=recorder)
+
+def open_cart(service, **lines):
+    order_id = service.create_cart()
+    for item_id, qty in lines.items():
+        service.add_item(order_id, item_id, qty)
+    return order_id
+
+def test_place_order_stores_once_and_records_stock_usage(service, store, recorder):
+    order_id = open_cart(service, pizza=2, coffee=1)
+    order = service.place_order(service.cart(order_id), order_id, "Riya", "98")
+    doc = store.get(order_id)
+    assert doc["bill"] == order.bill
+    assert doc["stock_usage"] == {"pizza-base": 2, "cheese": 1.0, "coffee": 1}
+    assert recorder.wakeups == 1
+    assert [e["order_id"] for e in recorder.events] == [order_id]
+
+def test_placing_the_same_order_again_returns_the_stored_one(service, store, recorder):
+    order_id = open_cart(service, pizza=1)
+    cart = service.cart(order_id)
+    first = service.place_order(cart, order_id, "Riya", "98")
+    again = service.place_order(cart, order_id, "Someone else", "-")
+    assert again.customer_name == "Riya"
+    assert again.datetime == first.datetime
+    assert again.bill == first.bill
+    assert store.unsynced_count() == 1
+    assert recorder.wakeups == 1 and len(recorder.events) == 1
+
+def test_a_changed_cart_under_a_placed_order_id_conflicts(service, store):
+    order_id = open_cart(service, pizza=1)
+    cart = service.cart(order_id)
+    service.place_order(cart, order_id)
+    service.add_item(order_id, "coffee", 1)
+    with pytest.raises(OrderConflict):
+        service.place_order(cart, order_id)
+    assert [i["item_id"] for i in store.get(order_id)["items"]] == ["pizza"]
+
+def test_checkout_retry_returns_the_placed_order(service):
+    order_id = open_cart(service, coffee=2)
+    first = service.checkout(order_id, "Riya", "98")
+    assert order_id not in service.carts
+    again = service.checkout(order_id)
+    assert again.order_id == order_id and again.bill == first.bill
+
+def test_checkout_of_an_unknown_cart(service):
+    with pytest.raises(KeyError):
+        service.checkout("no-such-order")
+
+def test_empty_cart_cannot_be_placed(service, store):
+    order_id = open_cart(service)
+    with pytest.raises(ValueError):
+        service.checkout(order_id)
+    assert store.get(order_id) is None
+
+def test_ids_resume_after_the_stored_orders(store, monkeypatch):
+    from cafe_aura import ids
+
+    newest = ids.encode_id(2 ** 47, 1, 7)  # far beyond any real clock
+    store.add({"order_id": newest, "datetime": dt.datetime.now(), "items": []})
+    monkeypatch.setattr(ids.new_order_id, "_last_ms", 0)  # restored, with _seq, after the test
+    monkeypatch.setattr(ids.new_order_id, "_seq", 0)
+    service = OrderService(store, catalog=Catalog(ITEMS, version=1))
+    assert service.create_cart() > newest
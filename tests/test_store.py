@@ -0,0 +1,47 @@
+import datetime as dt
+
+def order(order_id, **fields):
+    return {"order_id": order_id, "datetime": dt.datetime(2025, 8, 16, 13, 5), "items": [], **fields}
+
+def test_add_round_trips_the_doc(store):
+    assert store.add(order("A", grand_total=118.0))
+    assert store.get("A") == order("A", grand_total=118.0)
+    assert store.get("missing") is None
+
+def test_add_ignores_an_order_id_already_stored(store):
+    assert store.add(order("A", grand_total=118.0))
+    assert not store.add(order("A", grand_total=999.0))
+    assert store.get("A")["grand_total"] == 118.0
+    assert store.unsynced_count() == 1
+
+def test_unsynced_in_insertion_order_until_marked(store):
+    for order_id in ("C", "A", "B"):
+        store.add(order(order_id))
+    assert [d["order_id"] for d in store.unsynced(2)] == ["C", "A"]
+    store.mark_synced(["C", "A"])
+    assert [d["order_id"] for d in store.unsynced(10)] == ["B"]
+    assert [d["order_id"] for d in store.recent()] == ["B", "A", "C"]
+
+def test_stock_pending_only_after_sync(store):
+    store.add(order("A", stock_usage={"cheese": 1}))
+    store.add(order("B"))
+    assert store.stock_pending(10) == []
+    store.mark_synced(["A", "B"])
+    assert [d["order_id"] for d in store.stock_pending(10)] == ["A"]
+    store.mark_stock_applied(["A"])
+    assert store.stock_pending(10) == []
+
+def test_pending_stock_usage_counts_orders_not_yet_applied(store):
+    store.add(order("A", stock_usage={"cheese": 1, "base": 2}))
+    store.add(order("B", stock_usage={"cheese": 0.5}))
+    store.add(order("C"))
+    assert store.pending_stock_usage() == {"cheese": 1.5, "base": 2}
+    store.mark_synced(["A"])
+    store.mark_stock_applied(["A"])
+    assert store.pending_stock_usage() == {"cheese": 0.5}
+
+def test_last_order_id_skips_legacy_ids(store):
+    assert store.last_order_id() is None
+    for order_id in ("06GMQ6D0YKEJMV29", "06GMQ6D0YKEJMV2A", "ffffffff"):
+        store.add(order(order_id))
+    assert store.last_order_id() == "06GMQ6D0YKEJMV2A"